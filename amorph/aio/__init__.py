@@ -0,0 +1 @@
+from .combo import AsyncPatcher, find_closest, patch_with_sample, patch_with_closest
@@ -0,0 +1,243 @@
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from timeit import default_timer as timer
+
+from amorph.combo import Method, patch_with_sample as _patch_with_sample, patch_with_cheapest
+from amorph.exceptions import InvalidArgumentException
+from amorph.metrics import string_similarity
+from amorph.tracing import get_tracer, HTTP_TIME
+from amorph.utils import find_closest as _find_closest, find_top
+from .http import post_form
+
+
+# max count of calls of module functions running at once per event loop, as many as threads of default executor
+DEFAULT_MAX_CONCURRENCY = min(32, (os.cpu_count() or 1) + 4)
+
+# turn of the call running in current task, see `AsyncPatcher._limited`
+_current_slot = contextvars.ContextVar('amorph_aio_slot', default=None)
+
+
+class _Slot(object):
+    """Turn of call in concurrency limit, given back once the call and executor jobs it started are done"""
+
+    def __init__(self, semaphore):
+        self._semaphore = semaphore
+        self._holds = 1
+
+    def hold(self):
+        self._holds += 1
+
+    def release(self):
+        self._holds -= 1
+        if self._holds == 0:
+            self._semaphore.release()
+
+
+class _Job(object):
+    """
+    Function run on default executor of event loop holding slot of the call. Slot is given back when
+    function is done, or at once if call is cancelled before function has started, then function is skipped
+    """
+
+    def __init__(self, function, slot, loop):
+        self._function = function
+        self._slot = slot
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._state = None
+
+    def __call__(self, *args):
+        with self._lock:
+            if self._state is not None:
+                return None
+            self._state = 'started'
+        try:
+            return self._function(*args)
+        finally:
+            self._loop.call_soon_threadsafe(self._slot.release)
+
+    def done(self, future):
+        if not future.cancelled():
+            return
+        with self._lock:
+            if self._state is None:
+                self._state = 'skipped'
+                self._slot.release()
+
+
+def _patches(source, sample, method, key):
+    # generators can't be passed between processes
+    return list(_patch_with_sample(source, sample, method, key))
+
+
+def _closest_patches(source, samples, method, metric, key):
+    matched = _find_closest(source, samples, metric, key)
+    return matched, _patches(source, matched, method, key) if matched is not None else []
+
+
+class AsyncPatcher(object):
+    """
+    Runs patch methods without blocking event loop. Search and CPU-bound methods are run on executor,
+    `ast` method requests API server asynchronously
+    """
+
+    def __init__(self, executor=None, max_concurrency: int = None, timeout: float = None,
+                 api_endpoint: str = None):
+        """
+        :param executor: Executor to run computations on, default executor of event loop if not given. \
+                         Arguments must be picklable for process pool, so lambdas can't be used as keys
+        :param max_concurrency: Max count of calls running at once, others wait for their turn
+        :param timeout: Default deadline of call in seconds, including waiting for turn
+        :param api_endpoint: URL of API server for `ast` method
+        """
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.api_endpoint = api_endpoint
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def _call(self, start, timeout):
+        """
+        Awaits call within deadline and concurrency limit
+        :param start: Function without arguments starting the call, called when the turn comes
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        return await asyncio.wait_for(self._limited(start), timeout)
+
+    async def _limited(self, start):
+        if self._semaphore is None:
+            return await start()
+
+        await self._semaphore.acquire()
+        slot = _Slot(self._semaphore)
+
+        async def run():
+            # executor jobs started by the call hold the slot, as they keep running when call is cancelled
+            _current_slot.set(slot)
+            return await start()
+
+        task = asyncio.ensure_future(run())
+        task.add_done_callback(lambda _: slot.release())
+        return await task
+
+    def _run(self, function, *args):
+        """
+        Runs function on executor, cancelling the call cancels it if not started yet.
+        Slot of the call in concurrency limit is held till function is done
+        """
+        if not isinstance(self.executor, ProcessPoolExecutor):
+            # threads see tracer of the caller
+            function = partial(contextvars.copy_context().run, function)
+
+        loop = asyncio.get_running_loop()
+        slot = _current_slot.get()
+        if slot is None:
+            return loop.run_in_executor(self.executor, function, *args)
+
+        slot.hold()
+        if self.executor is None:
+            # jobs of default executor aren't exposed, so start of function is tracked by itself
+            job = _Job(function, slot, loop)
+            future = loop.run_in_executor(None, job, *args)
+            future.add_done_callback(job.done)
+            return future
+
+        job = self.executor.submit(function, *args)
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(slot.release))
+        return asyncio.wrap_future(job)
+
+    async def _ast_patches(self, source, sample, key):
+        from amorph.ast.patch import DEFAULT_ENDPOINT, parse_response
+
+        if key:
+            source, sample = key(source), key(sample)
+
+        tracer = get_tracer()
+        start = timer() if tracer is not None else None
+
+        status_code, text = await post_form(self.api_endpoint or DEFAULT_ENDPOINT, {'src': source, 'dst': sample})
+
+        if tracer is not None:
+            tracer.record(HTTP_TIME, timer() - start)
+        return parse_response(status_code, text)
+
+    async def find_closest(self, source, samples: list, metric=string_similarity, key=None, timeout: float = None):
+        """
+        Finds closest code to the source, see `amorph.utils.find_closest`
+        :param timeout: Deadline in seconds, default of patcher if not given
+        :raises asyncio.TimeoutError: Deadline passed
+        """
+        return await self._call(partial(self._run, _find_closest, source, samples, metric, key), timeout)
+
+    async def patch_with_sample(self, source, sample, method: Method = Method.DIFF, key=None,
+                                timeout: float = None):
+        """
+        Computes patches transforming source into sample
+        :param timeout: Deadline in seconds, default of patcher if not given
+        :return: List of patches
+        :raises asyncio.TimeoutError: Deadline passed
+        """
+        if not isinstance(method, Method):
+            raise InvalidArgumentException('Unknown method {!r}'.format(method))
+
+        if method == Method.AST:
+            return await self._call(partial(self._ast_patches, source, sample, key), timeout)
+        return await self._call(partial(self._run, _patches, source, sample, method, key), timeout)
+
+    async def patch_with_closest(self, source, samples: list, method: Method = Method.DIFF, metric=string_similarity,
+                                 key=None, candidates: int = 1, timeout: float = None):
+        """
+        Computes patches transforming source into the closest sample, see `amorph.patch_with_closest`
+        :param timeout: Deadline in seconds, default of patcher if not given
+        :return: List of patches
+        :raises asyncio.TimeoutError: Deadline passed
+        """
+        if not isinstance(method, Method):
+            raise InvalidArgumentException('Unknown method {!r}'.format(method))
+
+        if method == Method.AST:
+            start = partial(self._ast_with_closest, source, samples, metric, key, candidates)
+            return await self._call(start, timeout)
+
+        if candidates > 1:
+            start = partial(self._run, patch_with_cheapest, source, samples, candidates, method, metric, key)
+            return await self._call(start, timeout)
+
+        start = partial(self._run, _closest_patches, source, samples, method, metric, key)
+        _, patches = await self._call(start, timeout)
+        return patches
+
+    async def _ast_with_closest(self, source, samples, metric, key, candidates):
+        shortlist = await self._run(find_top, source, samples, candidates, metric, key)
+        # candidates are requested at once, the smallest patches win
+        results = await asyncio.gather(*(self._ast_patches(source, sample, key) for sample in shortlist))
+        return min(results, key=lambda patches: sum(patch.size for patch in patches), default=[])
+
+
+# patchers shared by module functions, one per event loop as semaphores are bound to loop
+_default_patchers = weakref.WeakKeyDictionary()
+
+
+def _default_patcher():
+    loop = asyncio.get_running_loop()
+    if loop not in _default_patchers:
+        _default_patchers[loop] = AsyncPatcher(max_concurrency=DEFAULT_MAX_CONCURRENCY)
+    return _default_patchers[loop]
+
+
+async def find_closest(source, samples: list, metric=string_similarity, key=None, timeout: float = None):
+    return await _default_patcher().find_closest(source, samples, metric, key, timeout)
+
+
+async def patch_with_sample(source, sample, method: Method = Method.DIFF, key=None, timeout: float = None):
+    return await _default_patcher().patch_with_sample(source, sample, method, key, timeout)
+
+
+async def patch_with_closest(source, samples: list, method: Method = Method.DIFF, metric=string_similarity,
+                             key=None, candidates: int = 1, timeout: float = None):
+    return await _default_patcher().patch_with_closest(source, samples, method, metric, key, candidates, timeout)
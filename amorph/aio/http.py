@@ -0,0 +1,81 @@
+import asyncio
+import ssl
+from urllib.parse import urlencode, urlsplit
+
+from amorph.exceptions import InvalidApiResponseException
+
+
+async def post_form(url: str, fields: dict):
+    """
+    Sends form with POST request without blocking event loop
+    :param url: URL of http or https endpoint
+    :param fields: Dict of form fields
+    :return: Tuple of status code and decoded body of response
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    body = urlencode(fields).encode()
+    request = '\r\n'.join([
+        'POST {} HTTP/1.1'.format(path),
+        'Host: {}'.format(parts.netloc),
+        'Content-Type: application/x-www-form-urlencoded',
+        'Content-Length: {}'.format(len(body)),
+        'Connection: close',
+        '', ''
+    ]).encode() + body
+
+    reader, writer = await asyncio.open_connection(parts.hostname, port,
+                                                   ssl=ssl.create_default_context() if secure else None)
+    try:
+        writer.write(request)
+        await writer.drain()
+        return await _read_response(reader)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            # connection is dropped anyway, error of response is more relevant
+            pass
+
+
+async def _read_response(reader):
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        raise InvalidApiResponseException('Connection closed before response')
+
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    try:
+        status_code = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise InvalidApiResponseException('Invalid status line {!r}'.format(status_line))
+
+    headers = {}
+    for line in header_lines:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = b''
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+    elif 'content-length' in headers:
+        try:
+            body = await reader.readexactly(int(headers['content-length']))
+        except asyncio.IncompleteReadError:
+            raise InvalidApiResponseException('Connection closed before end of response')
+    else:
+        body = await reader.read()
+
+    return status_code, body.decode('utf-8', errors='replace')
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from amorph import Method, patch_with_closest as sync_patch_with_closest
+from amorph.aio import AsyncPatcher, find_closest, patch_with_sample, patch_with_closest
+from amorph.ast.standin import StandInServer, MALFORMED
+from amorph.exceptions import InvalidApiResponseException
+from amorph.utils import apply_patches
+
+SAMPLES = ['a + b', '(a + b) * c', 'a + b * c']
+
+
+class TestAio(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = StandInServer().start()
+        self.endpoint = self.server.endpoint
+        self.addCleanup(self.server.close)
+
+    async def test_functions(self):
+        source = 'a + b + c'
+
+        self.assertEqual(await find_closest(source, SAMPLES), 'a + b * c')
+        patches = await patch_with_sample(source, 'a + b * c', Method.TOKENS)
+        self.assertEqual(apply_patches(source, patches), 'a + b * c')
+        patches = await patch_with_closest(source, SAMPLES)
+        self.assertEqual([patch.to_dict() for patch in patches],
+                         [patch.to_dict() for patch in sync_patch_with_closest(source, SAMPLES)])
+        self.assertEqual(await patch_with_closest(source, [], candidates=2), [])
+
+    async def test_ast(self):
+        patcher = AsyncPatcher(api_endpoint=self.endpoint)
+        source = 'a + b + c'
+
+        patches = await patcher.patch_with_sample(source, 'a + b * c', Method.AST)
+        self.assertEqual(apply_patches(source, patches), 'a + b * c')
+        patches = await patcher.patch_with_closest(source, SAMPLES, Method.AST, candidates=3)
+        self.assertEqual(apply_patches(source, patches), 'a + b * c')
+
+        self.server.error_rate = 1
+        with self.assertRaises(InvalidApiResponseException):
+            await patcher.patch_with_sample(source, 'a', Method.AST)
+
+        self.server.error_rate, self.server.malformed_rate = 0, 1
+        for _ in MALFORMED:
+            with self.assertRaises(InvalidApiResponseException):
+                await patcher.patch_with_sample(source, 'a', Method.AST)
+
+    async def test_deadline(self):
+        self.server.delay = 0.3
+        patcher = AsyncPatcher(api_endpoint=self.endpoint, timeout=0.05)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await patcher.patch_with_sample('a + b', 'a * b', Method.AST)
+        with self.assertRaises(asyncio.TimeoutError):
+            await patcher.find_closest('a + b + c', ['a + b + c + d'] * 200000)
+
+    async def test_concurrency(self):
+        self.server.delay = 0.1
+        patcher = AsyncPatcher(ThreadPoolExecutor(4), max_concurrency=2, api_endpoint=self.endpoint)
+        self.addCleanup(patcher.executor.shutdown)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(patcher.patch_with_sample('a + b', 'a * b', Method.AST) for _ in range(4)))
+
+        self.assertEqual(len(results), 4)
+        # at most two requests are sent at once
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    async def test_cancellation(self):
+        self.server.delay = 0.3
+        patcher = AsyncPatcher(max_concurrency=1, api_endpoint=self.endpoint)
+
+        task = asyncio.ensure_future(patcher.patch_with_sample('a + b', 'a * b', Method.AST))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        # slot of cancelled call is released
+        self.server.delay = 0
+        self.assertEqual(len(await patcher.patch_with_sample('a + b', 'a * b', Method.AST, timeout=1)), 1)
+
+    async def test_slot_held_by_running_job(self):
+        def slow(code):
+            time.sleep(0.1)
+            return code
+
+        for executor in [None, ThreadPoolExecutor(2)]:
+            patcher = AsyncPatcher(executor, max_concurrency=1)
+            with self.assertRaises(asyncio.TimeoutError):
+                await patcher.find_closest('a + b + c', SAMPLES, key=slow, timeout=0.05)
+
+            # the next call waits till search of timed out one is done
+            start = time.perf_counter()
+            self.assertEqual(await patcher.find_closest('a + b + c', SAMPLES, timeout=1), 'a + b * c')
+            self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+            if executor is not None:
+                executor.shutdown()
+
+    async def test_shared_limit(self):
+        from amorph.aio import combo
+
+        # module functions share the limit of concurrency of event loop
+        self.assertIs(combo._default_patcher(), combo._default_patcher())
+        self.assertEqual(combo._default_patcher().max_concurrency, combo.DEFAULT_MAX_CONCURRENCY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
+import json
+from timeit import default_timer as timer
+
 import requests
 from schema import Schema, Use, SchemaError
 
 from amorph.models import Patch
 from amorph.exceptions import InvalidApiResponseException
+from amorph.tracing import get_tracer, HTTP_TIME
 
 
 def PositiveInt():
@@ -26,20 +30,39 @@ raw_patches_schema = Schema([
 ])
 
 
-def get_patches(source: str, target: str, api_endpoint: str = 'http://localhost:4567/api/diff'):
-    result = requests.post(api_endpoint, {
-        'src': source,
-        'dst': target
-    })
+DEFAULT_ENDPOINT = 'http://localhost:4567/api/diff'
+
+
+def get_patches(source: str, target: str, api_endpoint: str = DEFAULT_ENDPOINT):
+    tracer = get_tracer()
+    start = timer() if tracer is not None else None
+
+    try:
+        result = requests.post(api_endpoint, {
+            'src': source,
+            'dst': target
+        })
+    except requests.exceptions.ChunkedEncodingError:
+        raise InvalidApiResponseException('Connection closed before end of response')
+
+    if tracer is not None:
+        tracer.record(HTTP_TIME, timer() - start)
+
+    return parse_response(result.status_code, result.text)
+
 
-    if result.status_code != 200:
-        raise InvalidApiResponseException('Http code {}. Response: "{}"'.format(
-            result.status_code,
-            result.text
-        ))
+def parse_response(status_code: int, text: str):
+    """
+    Validates response of API server
+    :param status_code: HTTP status code
+    :param text: Body of response
+    :return: List of patches
+    """
+    if status_code != 200:
+        raise InvalidApiResponseException('Http code {}. Response: "{}"'.format(status_code, text))
 
     try:
-        raw_patches = result.json()
+        raw_patches = json.loads(text)
     except ValueError:
         raise InvalidApiResponseException('Invalid JSON given')
 
@@ -0,0 +1,173 @@
+import json
+import random
+import threading
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from amorph.diff import get_patches
+
+# kinds of malformed responses: body isn't JSON, JSON doesn't match `raw_patches_schema`, body is cut short
+MALFORMED = ['json', 'schema', 'truncated']
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Speaks the API of AST server:
+        POST /api/diff    <- form with `src` and `dst` fields
+                          -> [{"type": "insert", "pos": ..., "text": ...}, ...]
+    Patches are computed with diff method, faults are injected as configured by server
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server.stand_in
+        # body is read anyway, so kept alive connection stays usable
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode(), keep_blank_values=True)
+        if self.path != '/api/diff':
+            return self._send(404, b'Not found')
+        if 'src' not in form or 'dst' not in form:
+            return self._send(400, b'Fields src and dst expected')
+
+        outcome = server.outcome()
+        delay = server.delay + (server.jitter * server.random() if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if outcome == 'error':
+            return self._send(500, b'Internal error')
+        if outcome == 'json':
+            return self._send(200, b'[{"type": "insert", ')
+        if outcome == 'schema':
+            return self._send(200, json.dumps([{'type': 'move', 'start': 'a'}]).encode())
+
+        patches = get_patches(form['src'][0], form['dst'][0])
+        body = json.dumps([patch.to_dict() for patch in patches]).encode()
+        if outcome == 'truncated':
+            # promised length is never sent, connection is closed instead
+            self.close_connection = True
+            return self._send(200, body[:len(body) // 2], len(body) + 1)
+        self._send(200, body)
+
+    def _send(self, status, body, length=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json' if status == 200 else 'text/plain')
+        self.send_header('Content-Length', str(len(body) if length is None else length))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(object):
+    """
+    Local stand-in of AST API server with artificial latency and faults. Settings can be
+    changed while server is running, e.g. to slow down responses in the middle of a test
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 0, delay: float = 0, jitter: float = 0,
+                 error_rate: float = 0, malformed_rate: float = 0, malformed=None, seed: int = None):
+        """
+        :param host: Host to listen on
+        :param port: Port to listen on, any free port if 0
+        :param delay: Delay of every response in seconds
+        :param jitter: Max extra delay in seconds, uniformly distributed
+        :param error_rate: Share of requests answered with HTTP 500
+        :param malformed_rate: Share of requests answered with malformed body
+        :param malformed: Kinds of malformed responses chosen from in turn, see `MALFORMED`
+        :param seed: Seed of random choices of faults and delays
+        """
+        self.delay = delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.malformed = list(malformed or MALFORMED)
+        self.served = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._server = ThreadingHTTPServer((host, port), StandInHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    @property
+    def endpoint(self):
+        return 'http://{}:{}/api/diff'.format(*self.address)
+
+    def random(self):
+        with self._lock:
+            return self._random.random()
+
+    def outcome(self):
+        """
+        Chooses how to answer the next request
+        :return: `ok`, `error` or one of `MALFORMED`
+        """
+        with self._lock:
+            value = self._random.random()
+            if value < self.error_rate:
+                outcome = 'error'
+            elif value < self.error_rate + self.malformed_rate:
+                outcome = self.malformed[sum(self.served[kind] for kind in self.malformed) % len(self.malformed)]
+            else:
+                outcome = 'ok'
+            self.served[outcome] += 1
+        return outcome
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self._server.serve_forever(poll_interval)
+
+    def start(self):
+        """Serves requests on background thread"""
+        # frequent polls make closing fast, as fixture is closed after every test
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m amorph.ast.standin')
+    parser.add_argument('--host', help='Host to listen on', default='localhost')
+    parser.add_argument('--port', help='Port to listen on', type=int, default=4567)
+    parser.add_argument('--delay', help='Delay of every response in seconds', type=float, default=0)
+    parser.add_argument('--jitter', help='Max extra random delay in seconds', type=float, default=0)
+    parser.add_argument('--error-rate', help='Share of requests answered with HTTP 500', type=float, default=0)
+    parser.add_argument('--malformed-rate', help='Share of requests answered with malformed body', type=float,
+                        default=0)
+    parser.add_argument('--malformed', help='Kind of malformed responses, can be repeated', choices=MALFORMED,
+                        action='append')
+    parser.add_argument('--seed', help='Random seed', type=int)
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.delay, args.jitter, args.error_rate, args.malformed_rate,
+                           args.malformed, args.seed)
+    print('Serving on {}'.format(server.endpoint))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
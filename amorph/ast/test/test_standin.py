@@ -0,0 +1,72 @@
+import time
+import unittest
+
+import requests
+
+from amorph.ast import get_patches
+from amorph.ast.standin import StandInServer
+from amorph.exceptions import InvalidApiResponseException
+from amorph.utils import apply_patches
+
+
+class TestStandIn(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInServer(seed=0).start()
+        self.addCleanup(self.server.close)
+
+    def test_patches(self):
+        source, target = 'a + b\nprint(a)', 'a * b\nprint(a, b)'
+
+        patches = get_patches(source, target, self.server.endpoint)
+
+        self.assertEqual(apply_patches(source, patches), target)
+        self.assertEqual(get_patches(source, source, self.server.endpoint), [])
+        self.assertEqual(self.server.served['ok'], 2)
+
+    def test_bad_requests(self):
+        response = requests.post(self.server.endpoint, {'src': 'a'})
+        self.assertEqual(response.status_code, 400)
+        response = requests.post(self.server.endpoint.replace('/api/diff', '/api/other'), {'src': 'a', 'dst': 'b'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_delay(self):
+        self.server.delay = 0.2
+
+        start = time.perf_counter()
+        get_patches('a', 'b', self.server.endpoint)
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.2)
+
+    def test_errors(self):
+        self.server.error_rate = 1
+
+        with self.assertRaisesRegex(InvalidApiResponseException, 'Http code 500'):
+            get_patches('a', 'b', self.server.endpoint)
+
+    def test_malformed(self):
+        self.server.malformed_rate = 1
+
+        # kinds of malformed responses are taken in turn
+        for message in ['Invalid JSON given', 'Invalid raw patches schema', 'before end of response']:
+            with self.assertRaisesRegex(InvalidApiResponseException, message):
+                get_patches('a + b', 'a * b', self.server.endpoint)
+        self.assertEqual(self.server.served['truncated'], 1)
+
+    def test_rates(self):
+        self.server.error_rate = 0.25
+        self.server.malformed_rate = 0.25
+        self.server.malformed = ['json']
+
+        for _ in range(200):
+            try:
+                get_patches('a', 'b', self.server.endpoint)
+            except InvalidApiResponseException:
+                pass
+
+        self.assertEqual(sum(self.server.served.values()), 200)
+        for outcome in ['ok', 'error', 'json']:
+            self.assertGreater(self.server.served[outcome], 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
-from . import diff, tokens, ast
-from .utils import find_closest, empty_generator
+from collections import Counter
+from importlib import import_module
+
+from .utils import find_closest, find_top, empty_generator
 from .metrics import string_similarity
 from .exceptions import InvalidArgumentException
 from enum import Enum
@@ -11,7 +13,22 @@ class Method(Enum):
     AST = 'ast'
 
 
-def patch_with_closest(source, samples: list, method: Method = Method.DIFF, metric=string_similarity, key=None):
+def get_engine(method: Method):
+    """
+    Imports package implementing method on first use, so heavy dependencies
+    of unused methods are never loaded
+    :param method: Patch method
+    :return: Module providing `get_patches` function
+    """
+    return import_module('.' + method.value, __package__)
+
+
+def patch_with_closest(source, samples: list, method: Method = Method.DIFF, metric=string_similarity, key=None,
+                       candidates: int = 1):
+    if candidates > 1:
+        # generator either way, as with a single candidate
+        return (patch for patch in patch_with_cheapest(source, samples, candidates, method, metric, key))
+
     matched_sample = find_closest(source, samples, metric, key)
 
     # no close sample found
@@ -29,9 +46,57 @@ def patch_with_sample(source, sample, method: Method = Method.DIFF, key=None):
     if not isinstance(method, Method):
         raise InvalidArgumentException('Unknown method {!r}'.format(method))
 
-    if method == Method.DIFF:
-        return diff.get_patches(source, sample)
-    elif method == Method.TOKENS:
-        return tokens.get_patches(source, sample)
-    elif method == Method.AST:
-        return ast.get_patches(source, sample)
+    return get_engine(method).get_patches(source, sample)
+
+
+def patch_size_bound(source: str, sample: str):
+    """
+    Lower bound of total size of patches transforming source into sample char by char.
+    Every char is either kept or deleted from source and either kept or inserted into sample,
+    so at least chars not common to both strings are changed
+    :param source: Source code
+    :param sample: Sample code
+    :return: Min total size of patches
+    """
+    common = sum((Counter(source) & Counter(sample)).values())
+    return len(source) + len(sample) - 2 * common
+
+
+def patch_with_cheapest(source, samples: list, candidates: int, method: Method = Method.DIFF,
+                        metric=string_similarity, key=None, timeout=None):
+    """
+    Chooses patches of the smallest total size among several closest samples.
+    Computation of patches for a sample is aborted as soon as it can't beat the best one found
+    :param source: Source code
+    :param samples: Iterable of samples to search in
+    :param candidates: Count of closest samples to compute patches for
+    :param method: Patch method
+    :param metric: Two string arguments function measuring similarity between two codes
+    :param key: Single argument function to get code from source and samples
+    :param timeout: Max time in seconds to search closest samples, see `amorph.utils.find_top`
+    :return: List of patches
+    """
+    shortlist = find_top(source, samples, candidates, metric, key, timeout)
+
+    # tokens method ignores formatting, so its patches can be smaller than char bound
+    bounds = [0] * len(shortlist)
+    if method != Method.TOKENS:
+        code = key(source) if key else source
+        bounds = [patch_size_bound(code, key(sample) if key else sample) for sample in shortlist]
+
+    best_patches, best_size = [], None
+    # most promising samples go first to abort the rest earlier
+    for bound, _, sample in sorted(zip(bounds, range(len(shortlist)), shortlist), key=lambda item: item[:2]):
+        if best_size is not None and bound >= best_size:
+            break
+
+        patches, size = [], 0
+        for patch in patch_with_sample(source, sample, method, key):
+            size += patch.size
+            if best_size is not None and size >= best_size:
+                break
+            patches.append(patch)
+        else:
+            best_patches, best_size = patches, size
+
+    return best_patches
@@ -0,0 +1,3 @@
+from .sources import Source, CsvSource, JsonLinesSource, DirectorySource, open_source
+from .shared import SharedCorpus
+from .registry import PreparedCorpus, CorpusRegistry, approximate_size
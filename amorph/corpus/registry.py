@@ -0,0 +1,222 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from amorph.exceptions import UnknownProblemException
+
+
+def approximate_size(obj, seen=None):
+    """
+    Estimates memory taken by object and objects it contains
+    :param obj: Object, containers and objects with `__dict__` or `__slots__` are traversed
+    :return: Size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+
+    if isinstance(obj, dict):
+        size += sum(approximate_size(key, seen) + approximate_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += approximate_size(vars(obj), seen)
+    return size
+
+
+class PreparedCorpus(object):
+    """Samples of problem along with data derived from them once, e.g. tokenizations or search indices"""
+
+    def __init__(self, samples, key=None):
+        """
+        :param samples: Iterable of samples
+        :param key: Single argument function to get code from sample
+        """
+        self.samples = list(samples)
+        self.codes = [key(sample) for sample in self.samples] if key else self.samples
+        self._derived = {}
+        self._size = None
+        self._listener = None
+
+    def derived(self, name: str, build):
+        """
+        Returns derived data, building it on first request
+        :param name: Name of data
+        :param build: Single argument function building data from list of codes
+        :return: Derived data
+        """
+        if name not in self._derived:
+            self._derived[name] = build(self.codes)
+            self._size = None
+            if self._listener is not None:
+                self._listener(self)
+        return self._derived[name]
+
+    @property
+    def nbytes(self):
+        if self._size is None:
+            seen = set()
+            self._size = approximate_size(self.samples, seen) + approximate_size(self.codes, seen) + \
+                approximate_size(self._derived, seen)
+        return self._size
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __iter__(self):
+        return iter(self.samples)
+
+    def __getitem__(self, idx):
+        return self.samples[idx]
+
+
+class CorpusRegistry(object):
+    """
+    Maps problem ids to corpora, keeping total memory of them within budget.
+    Least recently used corpora are evicted and loaded again on demand
+    """
+
+    def __init__(self, loader=None, budget: int = None, on_evict=None):
+        """
+        :param loader: Single argument function loading corpus of problem by its id. \\
+                       Should raise `UnknownProblemException` for unknown problems
+        :param budget: Max total size of corpora in bytes, unlimited if not given
+        :param on_evict: Function called with problem id and corpus removed from registry. \\
+                         Corpora having `close` method are closed if not given
+        """
+        self.loader = loader
+        self.budget = budget
+        self.on_evict = on_evict
+
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._size = 0
+        self.lock = threading.RLock()
+
+    @property
+    def size(self):
+        """Total size of stored corpora in bytes"""
+        return self._size
+
+    def get(self, problem_id):
+        """
+        Returns corpus of problem, loading it if needed
+        :param problem_id: Id of problem
+        :return: Corpus
+        """
+        with self.lock:
+            if problem_id in self._entries:
+                self._entries.move_to_end(problem_id)
+                return self._entries[problem_id]
+
+        if self.loader is None:
+            raise UnknownProblemException('Unknown problem {!r}'.format(problem_id))
+
+        # loading may be slow, so it's done without lock
+        corpus = self.loader(problem_id)
+        with self.lock:
+            if problem_id in self._entries:
+                # loaded concurrently
+                self._release(problem_id, corpus)
+                return self.get(problem_id)
+            self._store(problem_id, corpus)
+        return corpus
+
+    def put(self, problem_id, corpus):
+        """
+        Stores corpus of problem, replacing previous one
+        :param problem_id: Id of problem
+        :param corpus: Corpus, its size is taken from `nbytes` attribute or estimated
+        """
+        with self.lock:
+            self.discard(problem_id)
+            self._store(problem_id, corpus)
+
+    def discard(self, problem_id):
+        """
+        Removes corpus of problem
+        :param problem_id: Id of problem
+        :return: Whether corpus was stored
+        """
+        with self.lock:
+            if problem_id not in self._entries:
+                return False
+            self._release(problem_id, self._pop(problem_id))
+            return True
+
+    def peek(self, problem_id):
+        """
+        Returns stored corpus of problem without loading it or marking it as recently used
+        :param problem_id: Id of problem
+        :return: Corpus or None
+        """
+        return self._entries.get(problem_id)
+
+    def problems(self):
+        """
+        :return: List of ids of stored problems from the least recently used
+        """
+        with self.lock:
+            return list(self._entries)
+
+    def __contains__(self, problem_id):
+        return problem_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self.lock:
+            for problem_id in list(self._entries):
+                self.discard(problem_id)
+
+    def _store(self, problem_id, corpus):
+        self._entries[problem_id] = corpus
+        self._sizes[problem_id] = 0
+        self._resize(problem_id, corpus)
+
+        if isinstance(corpus, PreparedCorpus):
+            corpus._listener = lambda changed: self._resized(problem_id, changed)
+
+    def _resized(self, problem_id, corpus):
+        with self.lock:
+            if self._entries.get(problem_id) is corpus:
+                self._resize(problem_id, corpus)
+
+    def _resize(self, problem_id, corpus):
+        size = getattr(corpus, 'nbytes', None)
+        if size is None:
+            size = approximate_size(corpus)
+        self._size += size - self._sizes[problem_id]
+        self._sizes[problem_id] = size
+        self._evict(keep=problem_id)
+
+    def _evict(self, keep):
+        if self.budget is None:
+            return
+
+        for problem_id in list(self._entries):
+            if self._size <= self.budget:
+                break
+            # the most recently requested corpus is kept even if it doesn't fit alone
+            if problem_id != keep:
+                self._release(problem_id, self._pop(problem_id))
+
+    def _pop(self, problem_id):
+        corpus = self._entries.pop(problem_id)
+        self._size -= self._sizes.pop(problem_id)
+        if isinstance(corpus, PreparedCorpus):
+            corpus._listener = None
+        return corpus
+
+    def _release(self, problem_id, corpus):
+        if self.on_evict is not None:
+            self.on_evict(problem_id, corpus)
+        elif hasattr(corpus, 'close'):
+            corpus.close()
@@ -0,0 +1,187 @@
+import json
+import multiprocessing
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+from amorph.exceptions import InvalidArgumentException
+
+# size of header length prefix
+PREFIX = struct.Struct('<Q')
+ALIGNMENT = 8
+
+
+def _align(pos):
+    return (pos + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _open_segment(name):
+    try:
+        # python 3.13+: attached segment is not removed when this process exits
+        return shared_memory.SharedMemory(name, track=False), False
+    except TypeError:
+        # older versions register attached segment in resource tracker, see `SharedCorpus.attach`
+        return shared_memory.SharedMemory(name), True
+
+
+def _shares_tracker(creator):
+    """
+    Whether this process reports to resource tracker of creator of segment. Children started
+    by multiprocessing inherit tracker of their parent, other processes start their own one
+    """
+    if creator == os.getpid():
+        return True
+    parent = multiprocessing.parent_process()
+    return parent is not None and parent.pid == creator
+
+
+class SharedCorpus(object):
+    """
+    Samples stored in shared memory as one UTF-8 buffer and array of offsets.
+    Corpus is created once and attached by name in other processes without copying.
+    Segment layout: header length, JSON header, offsets, samples buffer, feature arrays
+    """
+
+    def __init__(self, segment, owner=False):
+        self._segment = segment
+        self._owner = owner
+        # forked children inherit the owner, but only the creator removes the segment when collected
+        self._pid = os.getpid()
+
+        buf = segment.buf
+        header_len, = PREFIX.unpack_from(buf, 0)
+        header = json.loads(bytes(buf[PREFIX.size:PREFIX.size + header_len]).decode())
+
+        self._creator = header.get('creator')
+        self._count = header['count']
+        self._offsets = buf[header['offsets']:header['offsets'] + 8 * (self._count + 1)].cast('q')
+        self._data = buf[header['data']:header['data'] + header['data_size']]
+        self._features = {}
+        for name, pos in header['features'].items():
+            self._features[name] = buf[pos:pos + 8 * self._count].cast('d')
+
+    @classmethod
+    def create(cls, samples, features: dict = None, name: str = None):
+        """
+        Copies samples into new shared memory segment
+        :param samples: Iterable of strings
+        :param features: Dict mapping feature name to sequence of numbers, one per sample
+        :param name: Name of segment, chosen randomly if not given
+        :return: Corpus owning the segment
+        """
+        encoded = [sample.encode() for sample in samples]
+        features = features or {}
+
+        offsets = [0]
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+
+        header = {'count': len(encoded), 'data_size': offsets[-1], 'features': {}, 'creator': os.getpid()}
+        # positions depend on header size, so header is laid out twice at most
+        header_len = 0
+        while True:
+            pos = _align(PREFIX.size + header_len)
+            header['offsets'] = pos
+            pos = header['data'] = pos + 8 * len(offsets)
+            pos = _align(pos + offsets[-1])
+            for feature in sorted(features):
+                if len(features[feature]) != len(encoded):
+                    raise InvalidArgumentException('Feature {!r} has wrong length'.format(feature))
+                header['features'][feature] = pos
+                pos += 8 * len(encoded)
+
+            raw_header = json.dumps(header).encode()
+            if len(raw_header) <= header_len:
+                break
+            header_len = len(raw_header)
+        raw_header = raw_header.ljust(header_len)
+
+        segment = shared_memory.SharedMemory(name, create=True, size=max(pos, 1))
+        buf = segment.buf
+        PREFIX.pack_into(buf, 0, header_len)
+        buf[PREFIX.size:PREFIX.size + header_len] = raw_header
+        buf[header['offsets']:header['data']] = memoryview(struct.pack('<{}q'.format(len(offsets)), *offsets))
+        buf[header['data']:header['data'] + offsets[-1]] = b''.join(encoded)
+        for feature, pos in header['features'].items():
+            values = struct.pack('<{}d'.format(len(encoded)), *features[feature])
+            buf[pos:pos + len(values)] = values
+
+        return cls(segment, owner=True)
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Attaches to corpus created in another process
+        :param name: Name of segment
+        :return: Corpus not owning the segment
+        """
+        segment, registered = _open_segment(name)
+        corpus = cls(segment)
+        # segment is owned by the creator, so tracker of another process must not remove it on exit.
+        # Shared tracker keeps a set of names, unregistering would drop registration of the creator instead
+        if registered and not _shares_tracker(corpus._creator):
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return corpus
+
+    @property
+    def name(self):
+        return self._segment.name
+
+    def feature(self, name: str):
+        """
+        Returns precomputed feature values of samples
+        :param name: Name of feature
+        :return: Memoryview of floats, one per sample
+        """
+        return self._features[name]
+
+    @property
+    def features(self):
+        return list(self._features)
+
+    @property
+    def nbytes(self):
+        """Size of shared memory segment"""
+        return self._segment.size if self._segment is not None else 0
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._count
+        if not 0 <= idx < self._count:
+            raise IndexError('corpus index out of range')
+
+        return str(self._data[self._offsets[idx]:self._offsets[idx + 1]], 'utf-8')
+
+    def __iter__(self):
+        for idx in range(self._count):
+            yield self[idx]
+
+    def close(self):
+        """Detaches from segment. Segment is removed if corpus owns it"""
+        if self._segment is None:
+            return
+
+        # segment can't be closed while views of it exist
+        for view in list(self._features.values()) + [self._offsets, self._data]:
+            view.release()
+        self._features = {}
+        self._segment.close()
+
+        if self._owner:
+            self._segment.unlink()
+        self._segment = None
+
+    def __del__(self):
+        if getattr(self, '_segment', None) is not None:
+            if self._pid != os.getpid():
+                self._owner = False
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
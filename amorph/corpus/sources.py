@@ -0,0 +1,133 @@
+import abc
+import csv
+import json
+import os
+from glob import glob
+from itertools import islice
+
+from amorph.exceptions import InvalidArgumentException
+
+
+class Source(abc.ABC):
+    """Lazy re-iterable collection of samples read from disk"""
+
+    def __init__(self, limit: int = None):
+        """
+        :param limit: Max count of samples to read
+        """
+        self.limit = limit
+
+    @abc.abstractmethod
+    def _read(self):
+        """Generates all samples of source"""
+        pass
+
+    def __iter__(self):
+        return islice(self._read(), self.limit)
+
+    def count(self):
+        """
+        Counts samples by reading the whole source
+        :return: Count of samples
+        """
+        return sum(1 for _ in self)
+
+
+# codes are often longer than default limit of field size
+FIELD_SIZE_LIMIT = 2 ** 31 - 1
+
+
+def _matches(record, where):
+    return all(record.get(field) == value for field, value in where.items())
+
+
+class CsvSource(Source):
+    """Reads samples from column of CSV file"""
+
+    def __init__(self, path: str, column: str = 'code', where: dict = None, limit: int = None):
+        """
+        :param path: Path to CSV file with header
+        :param column: Column containing samples
+        :param where: Dict of column values rows should have to be read
+        :param limit: Max count of samples to read
+        """
+        super().__init__(limit)
+        self.path = path
+        self.column = column
+        self.where = where or {}
+
+    def _read(self):
+        # limit is global, so it is raised once on open and never lowered,
+        # as toggling it would race with CSV files read on other threads
+        if csv.field_size_limit() < FIELD_SIZE_LIMIT:
+            csv.field_size_limit(FIELD_SIZE_LIMIT)
+
+        with open(self.path, newline='') as f:
+            for row in csv.DictReader(f):
+                if _matches(row, self.where):
+                    yield row[self.column]
+
+
+class JsonLinesSource(Source):
+    """Reads samples from file containing JSON object per line"""
+
+    def __init__(self, path: str, field: str = 'code', where: dict = None, limit: int = None):
+        """
+        :param path: Path to JSON Lines file
+        :param field: Field containing samples. If None, whole objects are read
+        :param where: Dict of field values objects should have to be read
+        :param limit: Max count of samples to read
+        """
+        super().__init__(limit)
+        self.path = path
+        self.field = field
+        self.where = where or {}
+
+    def _read(self):
+        with open(self.path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+
+                record = json.loads(line)
+                if _matches(record, self.where):
+                    yield record if self.field is None else record[self.field]
+
+
+class DirectorySource(Source):
+    """Reads every file of directory matching pattern as sample"""
+
+    def __init__(self, path: str, pattern: str = '*.py', limit: int = None):
+        """
+        :param path: Path to directory
+        :param pattern: Glob pattern of sample files
+        :param limit: Max count of samples to read
+        """
+        super().__init__(limit)
+        self.path = path
+        self.pattern = pattern
+
+    def _read(self):
+        for file_path in sorted(glob(os.path.join(self.path, self.pattern))):
+            with open(file_path) as f:
+                yield f.read()
+
+
+def open_source(path: str, limit: int = None, **kwargs):
+    """
+    Chooses source by path: directory, `.csv` or `.jsonl` file
+    :param path: Path to samples
+    :param limit: Max count of samples to read
+    :param kwargs: Arguments of chosen source
+    :return: Source
+    """
+    if os.path.isdir(path):
+        return DirectorySource(path, limit=limit, **kwargs)
+
+    _, ext = os.path.splitext(path)
+    if ext == '.csv':
+        return CsvSource(path, limit=limit, **kwargs)
+    elif ext in ('.jsonl', '.ndjson'):
+        return JsonLinesSource(path, limit=limit, **kwargs)
+
+    raise InvalidArgumentException('Unknown type of samples source {!r}'.format(path))
@@ -0,0 +1,89 @@
+import unittest
+
+from amorph.corpus import CorpusRegistry, PreparedCorpus, SharedCorpus, approximate_size
+from amorph.exceptions import UnknownProblemException
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.loaded = []
+        self.evicted = []
+
+    def loader(self, problem_id):
+        if problem_id == 'unknown':
+            raise UnknownProblemException(problem_id)
+        self.loaded.append(problem_id)
+        return PreparedCorpus(['{} = {}'.format(problem_id, idx) * 10 for idx in range(10)])
+
+    def registry(self, budget):
+        return CorpusRegistry(self.loader, budget, lambda problem_id, corpus: self.evicted.append(problem_id))
+
+    def test_load_on_demand(self):
+        registry = self.registry(None)
+
+        self.assertIs(registry.get('a'), registry.get('a'))
+        self.assertEqual(self.loaded, ['a'])
+        self.assertEqual(registry.size, registry.get('a').nbytes)
+        with self.assertRaises(UnknownProblemException):
+            registry.get('unknown')
+
+    def test_eviction(self):
+        size = self.loader('a').nbytes
+        registry = self.registry(2 * size + size // 2)
+
+        registry.get('a')
+        registry.get('b')
+        registry.get('a')
+        registry.get('c')
+
+        # 'b' is the least recently used
+        self.assertEqual(self.evicted, ['b'])
+        self.assertEqual(registry.problems(), ['a', 'c'])
+        self.assertLessEqual(registry.size, registry.budget)
+
+        registry.get('b')
+        self.assertEqual(self.loaded.count('b'), 2)
+        self.assertEqual(self.evicted, ['b', 'a'])
+
+    def test_derived_data(self):
+        registry = self.registry(None)
+        corpus = registry.get('a')
+        size = registry.size
+
+        tokens = corpus.derived('tokens', lambda codes: [code.split() for code in codes])
+
+        self.assertIs(corpus.derived('tokens', None), tokens)
+        self.assertGreater(registry.size, size)
+        self.assertEqual(registry.size, corpus.nbytes)
+
+    def test_derived_data_exceeds_budget(self):
+        registry = self.registry(2 * self.loader('a').nbytes)
+        registry.get('a')
+        registry.get('b').derived('tokens', lambda codes: [code.split() for code in codes])
+
+        self.assertEqual(registry.problems(), ['b'])
+
+    def test_put_and_discard(self):
+        registry = CorpusRegistry()
+        corpus = SharedCorpus.create(['a', 'b'])
+        registry.put('a', corpus)
+
+        self.assertEqual(registry.size, corpus.nbytes)
+        self.assertTrue(registry.discard('a'))
+        self.assertFalse(registry.discard('a'))
+        self.assertEqual(registry.size, 0)
+        # corpora are closed by default
+        self.assertEqual(corpus.nbytes, 0)
+        with self.assertRaises(UnknownProblemException):
+            registry.get('a')
+
+    def test_approximate_size(self):
+        text = 'x' * 1000
+
+        self.assertGreater(approximate_size([text]), 1000)
+        self.assertEqual(approximate_size([text, text]) - approximate_size([text]),
+                         approximate_size([None, None]) - approximate_size([None]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+from multiprocessing import get_context
+
+from amorph.corpus.shared import SharedCorpus
+from amorph.exceptions import InvalidArgumentException
+from amorph.utils import find_closest
+
+
+def closest_in_worker(args):
+    name, source = args
+    with SharedCorpus.attach(name) as corpus:
+        return find_closest(source, corpus)
+
+
+# creates corpus, lets worker attach it and then closes it or crashes without closing
+OWNER_SCRIPT = '''
+import os, sys
+from multiprocessing import get_context
+from amorph.corpus.shared import SharedCorpus
+from amorph.corpus.test.test_shared import closest_in_worker
+
+corpus = SharedCorpus.create(['a + b', 'a * b'])
+print(corpus.name, flush=True)
+with get_context(sys.argv[1]).Pool(1) as pool:
+    pool.map(closest_in_worker, [(corpus.name, 'a + c')])
+if sys.argv[2] == 'crash':
+    os._exit(1)
+corpus.close()
+'''
+
+
+class TestShared(unittest.TestCase):
+    samples = ['a + b', '(a + b) * c', 'a + b * c', 'print("Привет")', '']
+
+    def test_create(self):
+        with SharedCorpus.create(self.samples, features={'len': [len(s) for s in self.samples]}) as corpus:
+            self.assertEqual(len(corpus), len(self.samples))
+            self.assertEqual(list(corpus), self.samples)
+            self.assertEqual(corpus[-2], self.samples[-2])
+            self.assertEqual(list(corpus.feature('len')), [len(s) for s in self.samples])
+            self.assertEqual(corpus.features, ['len'])
+
+            with self.assertRaises(IndexError):
+                corpus[len(self.samples)]
+
+    def test_empty(self):
+        with SharedCorpus.create([]) as corpus:
+            self.assertEqual(list(corpus), [])
+
+    def test_wrong_feature(self):
+        with self.assertRaises(InvalidArgumentException):
+            SharedCorpus.create(self.samples, features={'len': [1]})
+
+    def test_attach(self):
+        with SharedCorpus.create(self.samples) as corpus:
+            for method in ['fork', 'spawn']:
+                with get_context(method).Pool(2) as pool:
+                    results = pool.map(closest_in_worker, [(corpus.name, 'a + b + c')] * 2)
+                self.assertEqual(results, ['a + b * c'] * 2)
+
+            # segment is still available to its owner
+            self.assertEqual(corpus[0], 'a + b')
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'segments are not files')
+    def test_collected(self):
+        corpus = SharedCorpus.create(self.samples)
+        name = corpus.name
+
+        # child collecting inherited owner keeps the segment
+        pid = os.fork()
+        if pid == 0:
+            del corpus
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertTrue(os.path.exists(os.path.join('/dev/shm', name)))
+
+        del corpus
+        self.assertFalse(os.path.exists(os.path.join('/dev/shm', name)))
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'segments are not files')
+    def test_unrelated_process(self):
+        with SharedCorpus.create(self.samples) as corpus:
+            # process with its own resource tracker doesn't remove segment on exit
+            script = 'import sys\nfrom amorph.corpus.shared import SharedCorpus\n' \
+                     'print(SharedCorpus.attach(sys.argv[1])[0])'
+            result = subprocess.run([sys.executable, '-c', script, corpus.name],
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+            self.assertEqual(result.stdout.strip(), self.samples[0])
+            self.assertNotIn('leaked', result.stderr)
+            self.assertTrue(os.path.exists(os.path.join('/dev/shm', corpus.name)))
+
+    @unittest.skipUnless(os.path.isdir('/dev/shm'), 'segments are not files')
+    def test_resource_tracker(self):
+        for method in ['fork', 'spawn']:
+            for ending in ['close', 'crash']:
+                # output of resource tracker is read till it exits along with owner
+                result = subprocess.run([sys.executable, '-c', OWNER_SCRIPT, method, ending],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                name = result.stdout.split()[0]
+
+                self.assertNotIn('KeyError', result.stderr)
+                # segment of crashed owner is removed by its resource tracker
+                for _ in range(50):
+                    if not os.path.exists(os.path.join('/dev/shm', name)):
+                        break
+                    time.sleep(0.1)
+                self.assertFalse(os.path.exists(os.path.join('/dev/shm', name)), (method, ending))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from amorph.corpus import CsvSource, JsonLinesSource, DirectorySource, open_source
+from amorph.exceptions import InvalidArgumentException
+from amorph.utils import find_closest
+
+
+class TestSources(unittest.TestCase):
+    rows = [
+        {'status': 'correct', 'code': 'a + b\n'},
+        {'status': 'wrong', 'code': 'a - b\n'},
+        {'status': 'correct', 'code': 'def f(a, b):\n    return a * b\n'},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_csv(self):
+        with open(self.path('data.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, ['status', 'code'])
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+        source = CsvSource(self.path('data.csv'), where={'status': 'correct'})
+
+        self.assertEqual(list(source), [self.rows[0]['code'], self.rows[2]['code']])
+        # sources are re-iterable
+        self.assertEqual(source.count(), 2)
+        self.assertEqual(find_closest('a * b\n', source), self.rows[0]['code'])
+
+    def test_csv_long_field(self):
+        code = 'x = 1\n' * 50000
+        with open(self.path('data.csv'), 'w', newline='') as f:
+            writer = csv.DictWriter(f, ['status', 'code'])
+            writer.writeheader()
+            writer.writerow({'status': 'correct', 'code': code})
+
+        limit = csv.field_size_limit()
+        self.assertEqual(list(CsvSource(self.path('data.csv'))), [code])
+        # global limit of csv module is never lowered
+        self.assertGreaterEqual(csv.field_size_limit(), limit)
+
+    def test_jsonl(self):
+        with open(self.path('data.jsonl'), 'w') as f:
+            for row in self.rows:
+                f.write(json.dumps(row) + '\n')
+
+        source = JsonLinesSource(self.path('data.jsonl'), limit=2)
+        self.assertEqual(list(source), [self.rows[0]['code'], self.rows[1]['code']])
+
+        source = open_source(self.path('data.jsonl'), field=None, where={'status': 'wrong'})
+        self.assertEqual(list(source), [self.rows[1]])
+
+    def test_directory(self):
+        for idx, row in enumerate(self.rows):
+            with open(self.path('{}.py'.format(idx)), 'w') as f:
+                f.write(row['code'])
+
+        source = open_source(self.tmp.name)
+        self.assertIsInstance(source, DirectorySource)
+        self.assertEqual(list(source), [row['code'] for row in self.rows])
+
+    def test_unknown(self):
+        with self.assertRaises(InvalidArgumentException):
+            open_source(self.path('data.txt'))
+
+if __name__ == '__main__':
+    unittest.main()
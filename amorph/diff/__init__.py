@@ -1 +1,2 @@
 from .patch import DiffPatcher, get_patches
+from .incremental import DiffSession
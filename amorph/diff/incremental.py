@@ -0,0 +1,138 @@
+from difflib import SequenceMatcher
+from timeit import default_timer as timer
+
+from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.tracing import get_tracer, ALIGNMENT_TIME
+from .patch import DiffPatcher, Index
+
+
+def _shift(patch, offset):
+    if isinstance(patch, InsertPatch):
+        return InsertPatch(patch.pos + offset, patch.text)
+    elif isinstance(patch, DeletePatch):
+        return DeletePatch(patch.start + offset, patch.stop + offset)
+    return ReplacePatch(patch.start + offset, patch.stop + offset, patch.text)
+
+
+def _common_affixes(old, new):
+    """
+    Counts equal lines at the start and at the end of two lists, not overlapping
+    :return: Tuple of prefix and suffix lengths
+    """
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while suffix < limit - prefix and old[-suffix - 1] == new[-suffix - 1]:
+        suffix += 1
+    return prefix, suffix
+
+
+class DiffSession(object):
+    """
+    Computes patches for successive versions of source transformed into the same target.
+    Line alignment and patches of blocks outside of changed lines are kept from previous version,
+    only the changed region is aligned again
+    """
+
+    def __init__(self, target: str, is_line_junk=None, is_char_junk=None):
+        """
+        :param target: Target code for transformation
+        :param is_line_junk: Single string argument function that \
+                             returns True if line should be ignored
+        :param is_char_junk: Single string argument function that \
+                             returns True if character should be ignored
+        """
+        self.patcher = DiffPatcher(is_line_junk, is_char_junk)
+        self.target = Index(target)
+
+        self._lines = None
+        # line alignment opcodes and their patches relative to the first line of block
+        self._blocks = None
+
+    def reset(self):
+        """Forgets previous version of source"""
+        self._lines, self._blocks = None, None
+
+    def get_patches(self, source: str):
+        """
+        Returns list of patches for transforming source to target
+        :param source: Source code, usually slightly edited previous one
+        :return: List of patches
+        """
+        index = Index(source)
+        if self._lines is None:
+            blocks = self._align(index.lines, 0, len(index), 0, len(self.target))
+        else:
+            blocks = self._realign(index.lines)
+
+        patches = []
+        for block in blocks:
+            opcode, relative = block
+            start = index.line_start(opcode[1])
+            if relative is None:
+                absolute = list(self.patcher.get_block_patches(index, self.target, opcode))
+                block[1] = [_shift(patch, -start) for patch in absolute]
+                patches.extend(absolute)
+            else:
+                patches.extend(_shift(patch, start) for patch in relative)
+
+        self._lines, self._blocks = index.lines, blocks
+        return patches
+
+    def _align(self, lines, src_start, src_end, tgt_start, tgt_end):
+        """
+        Aligns lines of source and target in given bounds
+        :return: List of blocks with patches to be computed
+        """
+        tracer = get_tracer()
+        start = timer() if tracer is not None else None
+
+        cruncher = SequenceMatcher(self.patcher.is_line_junk,
+                                   lines[src_start:src_end],
+                                   self.target.lines[tgt_start:tgt_end])
+        blocks = [[(tag, start1 + src_start, end1 + src_start, start2 + tgt_start, end2 + tgt_start), None]
+                  for tag, start1, end1, start2, end2 in cruncher.get_opcodes()]
+
+        if tracer is not None:
+            tracer.record(ALIGNMENT_TIME, timer() - start)
+        return blocks
+
+    def _realign(self, lines):
+        """
+        Aligns again region of blocks touched by lines changed since previous version
+        :return: List of blocks
+        """
+        prefix, suffix = _common_affixes(self._lines, lines)
+        changed_end = len(self._lines) - suffix
+        delta = len(lines) - len(self._lines)
+
+        before, after = [], []
+        # bounds of region to align in previous source and target lines
+        src_start, tgt_start = 0, 0
+        src_end, tgt_end = len(self._lines), len(self.target)
+        for block in self._blocks:
+            (tag, start1, end1, start2, end2), _ = block
+            if tag == 'equal':
+                # equal blocks are cut by bounds of changed lines
+                if start1 < prefix:
+                    cut = min(end1, prefix)
+                    before.append([(tag, start1, cut, start2, start2 + cut - start1), []])
+                    src_start, tgt_start = cut, start2 + cut - start1
+                if end1 > changed_end:
+                    cut = max(start1, changed_end)
+                    after.append([(tag, cut + delta, end1 + delta, end2 - end1 + cut, end2), []])
+                    if len(after) == 1:
+                        src_end, tgt_end = cut, end2 - end1 + cut
+            # changed blocks adjacent to changed lines are aligned again to be merged with them
+            elif end1 < prefix:
+                before.append(block)
+                src_start, tgt_start = end1, end2
+            elif start1 > changed_end:
+                after.append([(tag, start1 + delta, end1 + delta, start2, end2), block[1]])
+                if len(after) == 1:
+                    src_end, tgt_end = start1, start2
+
+        return before + self._align(lines, src_start, src_end + delta, tgt_start, tgt_end) + after
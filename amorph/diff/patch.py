@@ -1,14 +1,21 @@
 from difflib import SequenceMatcher
+from timeit import default_timer as timer
+
 from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.tracing import get_tracer, ALIGNMENT_TIME, REPLACE_BLOCKS, PAIRWISE_RATIOS
 
 
 class Index(object):
     def __init__(self, text):
         self.lines = text.splitlines(keepends=True)
         self.lens = [len(line) for line in self.lines]
+        # offsets of line starts, the last one is length of text
+        self.starts = [0]
+        for length in self.lens:
+            self.starts.append(self.starts[-1] + length)
 
     def map(self, line, char):
-        return sum(self.lens[:line]) + char
+        return self.starts[line] + char
 
     def line_start(self, line):
         return self.map(line, 0)
@@ -52,16 +59,35 @@ class DiffPatcher(object):
         :param target: Lines of target string for transformation
         :return: List of patches
         """
+        tracer = get_tracer()
+        start = timer() if tracer is not None else None
+
         cruncher = SequenceMatcher(self.is_line_junk, source, target)
-        for tag, start1, end1, start2, end2 in cruncher.get_opcodes():
-            if tag == 'replace':
-                yield from self._replace_with_matches(source, (start1, end1), target, (start2, end2))
+        opcodes = cruncher.get_opcodes()
+
+        if tracer is not None:
+            tracer.record(ALIGNMENT_TIME, timer() - start)
+
+        for opcode in opcodes:
+            yield from self.get_block_patches(source, target, opcode)
+
+    def get_block_patches(self, source: Index, target: Index, opcode: tuple):
+        """
+        Returns patches of single block of line alignment
+        :param source: Lines of source string to transform
+        :param target: Lines of target string for transformation
+        :param opcode: Tuple of tag and line bounds as returned by `SequenceMatcher.get_opcodes`
+        :return: List of patches
+        """
+        tag, start1, end1, start2, end2 = opcode
+        if tag == 'replace':
+            yield from self._replace_with_matches(source, (start1, end1), target, (start2, end2))
 
-            elif tag == 'delete':
-                yield DeletePatch(source.line_start(start1), source.line_end(end1-1))
+        elif tag == 'delete':
+            yield DeletePatch(source.line_start(start1), source.line_end(end1-1))
 
-            elif tag == 'insert':
-                yield InsertPatch(source.line_start(start1), target.subtext(start2, end2))
+        elif tag == 'insert':
+            yield InsertPatch(source.line_start(start1), target.subtext(start2, end2))
 
     def _replace_with_matches(self,
                               source: Index,
@@ -89,6 +115,9 @@ class DiffPatcher(object):
         # pair of best matching strings and their ratio
         best_ratio, src_best, tgt_best = self.CUTOFF - 0.01, None, None
 
+        # count of compared pairs
+        compared = 0
+
         # search for best matching pair in source and target texts
         for j in range(tgt_start, tgt_end):
             tgt_current = target[j]
@@ -103,6 +132,7 @@ class DiffPatcher(object):
 
                 cruncher.set_seq1(src_current)
                 cruncher.set_seq2(tgt_current)
+                compared += 1
 
                 # ratio function can be slow so should be
                 # executed only if upper bounds are satisfactory
@@ -111,6 +141,11 @@ class DiffPatcher(object):
                       cruncher.ratio() > best_ratio:
                     best_ratio, src_best, tgt_best = cruncher.ratio(), i, j
 
+        tracer = get_tracer()
+        if tracer is not None:
+            tracer.record(REPLACE_BLOCKS, 1)
+            tracer.record(PAIRWISE_RATIOS, compared)
+
         if best_ratio < self.CUTOFF:
             if src_equal is None:
                 # no close matches or equal strings, plain replace
@@ -0,0 +1,91 @@
+import random
+import textwrap
+import unittest
+
+from amorph.diff import DiffSession, get_patches
+from amorph.tracing import CollectingTracer, tracing, REPLACE_BLOCKS
+from amorph.utils import apply_patches
+
+TARGET = textwrap.dedent('''
+    def f(a, b):
+        for i in range(b):
+            print(a, i)
+        return a + b
+
+    def g(n):
+        result = 1
+        for i in range(1, n + 1):
+            result *= i
+        return result
+
+    print(f(1, 2), g(5))
+    ''')
+
+
+class TestIncremental(unittest.TestCase):
+    def test_first_version(self):
+        source = TARGET.replace('a + b', 'a - b').replace('result *= i', 'result += i')
+
+        patches = DiffSession(TARGET).get_patches(source)
+
+        self.assertEqual(apply_patches(source, patches), TARGET)
+        self.assertEqual([patch.to_dict() for patch in patches],
+                         [patch.to_dict() for patch in get_patches(source, TARGET)])
+
+    def test_resubmissions(self):
+        session = DiffSession(TARGET)
+        versions = [
+            TARGET.replace('a + b', 'a - b').replace('result *= i', 'result += i'),
+            TARGET.replace('result *= i', 'result += i'),
+            TARGET.replace('result *= i', 'result += i').replace('print(a, i)', 'print(a)\n        pass'),
+            'import sys\n' + TARGET.replace('print(a, i)', 'print(a)\n        pass'),
+            TARGET[:-1],
+            TARGET,
+            '',
+            TARGET,
+        ]
+
+        for source in versions:
+            self.assertEqual(apply_patches(source, session.get_patches(source)), TARGET)
+
+    def test_unchanged_blocks_reused(self):
+        session = DiffSession(TARGET)
+        source = TARGET.replace('a + b', 'a - b').replace('result *= i', 'result += i')
+        session.get_patches(source)
+
+        tracer = CollectingTracer()
+        with tracing(tracer):
+            source = source.replace('result += i', 'result -= i')
+            self.assertEqual(apply_patches(source, session.get_patches(source)), TARGET)
+            source = 'import sys\n' + source
+            self.assertEqual(apply_patches(source, session.get_patches(source)), TARGET)
+
+        # only the edited block is diffed again, unchanged and shifted ones are reused
+        self.assertEqual(tracer[REPLACE_BLOCKS], 1)
+
+    def test_random_edits(self):
+        rnd = random.Random(0)
+        lines = TARGET.splitlines(keepends=True)
+        pool = ['x = 1\n', '    pass\n', '        print(a)\n', 'return\n']
+        session = DiffSession(TARGET)
+        source = lines
+
+        for _ in range(200):
+            source = list(source)
+            pos = rnd.randint(0, len(source))
+            action = rnd.choice(['insert', 'delete', 'replace', 'restore'])
+            if action == 'insert':
+                source.insert(pos, rnd.choice(pool))
+            elif action == 'delete' and pos < len(source):
+                del source[pos]
+            elif action == 'replace' and pos < len(source):
+                source[pos] = source[pos].replace('a', 'b')
+            elif action == 'restore':
+                source = lines
+
+            code = ''.join(source)
+            self.assertEqual(apply_patches(code, session.get_patches(code)), TARGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,3 +10,19 @@ class InvalidArgumentException(AmorphException):
 
 class InvalidApiResponseException(AmorphException):
     pass
+
+
+class InvalidPatchException(AmorphException):
+    pass
+
+
+class PatchVerificationException(AmorphException):
+    pass
+
+
+class UnknownProblemException(AmorphException):
+    pass
+
+
+class OverloadedException(AmorphException):
+    pass
@@ -1 +1,3 @@
 from .string import string_similarity
+from .edit import edit_distance, line_edit_distance, edit_similarity, line_edit_similarity
+from .utils import metric_with_key, prepared_metric, bounded_metric, prepare_metric
@@ -0,0 +1,123 @@
+from collections import Counter
+from math import floor
+
+from .utils import bounded_metric
+
+
+def _match_vectors(pattern):
+    """Maps every item of pattern to bit mask of its positions"""
+    vectors = {}
+    bit = 1
+    for item in pattern:
+        vectors[item] = vectors.get(item, 0) | bit
+        bit <<= 1
+    return vectors
+
+
+def _distance(vectors, pattern_len, text, max_distance=None):
+    """
+    Computes Levenshtein distance with Myers' bit-parallel algorithm, \
+    one column of distance matrix per big integer operations
+    :param vectors: Match vectors of pattern
+    :param pattern_len: Length of pattern
+    :param text: Sequence to compare pattern with
+    :param max_distance: Distance to stop computation after
+    :return: Distance or None if it exceeds max distance
+    """
+    text_len = len(text)
+    if max_distance is not None and abs(pattern_len - text_len) > max_distance:
+        return None
+
+    if not pattern_len:
+        return text_len
+
+    mask = (1 << pattern_len) - 1
+    last = 1 << (pattern_len - 1)
+
+    # vertical positive and negative deltas of current column
+    vp, vn = mask, 0
+    # distance between whole pattern and current prefix of text
+    score = pattern_len
+    for idx, item in enumerate(text, 1):
+        eq = vectors.get(item, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | ~(xh | vp)
+        hn = vp & xh
+
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+
+        hp = (hp << 1) | 1
+        hn <<= 1
+        vp = (hn | ~(xv | hp)) & mask
+        vn = hp & xv & mask
+
+        # every remaining item decreases distance by one at most
+        if max_distance is not None and score - (text_len - idx) > max_distance:
+            return None
+
+    return score
+
+
+def edit_distance(source, sample, max_distance: int = None):
+    """
+    Computes Levenshtein distance between two sequences
+    :param source: Source string or sequence of hashable items
+    :param sample: Sample string or sequence of hashable items
+    :param max_distance: Distance to stop computation after
+    :return: Distance or None if it exceeds max distance
+    """
+    return _distance(_match_vectors(source), len(source), sample, max_distance)
+
+
+def line_edit_distance(source: str, sample: str, max_distance: int = None):
+    """
+    Computes count of inserted, deleted and replaced lines to transform source into sample
+    :param source: Source code
+    :param sample: Sample code
+    :param max_distance: Distance to stop computation after
+    :return: Distance or None if it exceeds max distance
+    """
+    return edit_distance(source.splitlines(), sample.splitlines(), max_distance)
+
+
+def _prepare_similarity(source, count_bound):
+    vectors = _match_vectors(source)
+    source_len = len(source)
+    source_counts = Counter(source) if count_bound else None
+
+    def compare(sample, best=None):
+        length = max(source_len, len(sample))
+        if not length:
+            return 1.0
+
+        max_distance = None
+        if best is not None:
+            # sample should have distance less than this to be closer
+            max_distance = floor((1 - best) * length)
+            # every item not common to both sequences has to be changed
+            if count_bound and length - sum((source_counts & Counter(sample)).values()) > max_distance:
+                return None
+
+        distance = _distance(vectors, source_len, sample, max_distance)
+        if distance is None:
+            return None
+        return 1 - distance / length
+
+    return compare
+
+
+@bounded_metric
+def edit_similarity(source: str):
+    """Levenshtein distance normalized to [0, 1] range, where 1 means equal strings"""
+    return _prepare_similarity(source, count_bound=True)
+
+
+@bounded_metric
+def line_edit_similarity(source: str):
+    """Line edit distance normalized to [0, 1] range, where 1 means equal codes"""
+    compare = _prepare_similarity(source.splitlines(), count_bound=False)
+    return lambda sample, best=None: compare(sample.splitlines(), best)
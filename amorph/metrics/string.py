@@ -1,9 +1,19 @@
-from difflib import SequenceMatcher
-from .utils import metric_with_key
+from collections import Counter
+from .utils import prepared_metric
 
 
-@metric_with_key
-def string_similarity(source: str, sample: str):
-    matcher = SequenceMatcher(None, source, sample)
+@prepared_metric
+def string_similarity(source: str):
+    """Same as `SequenceMatcher.quick_ratio` with source chars counted once"""
+    source_counts = Counter(source)
+    source_len = len(source)
 
-    return matcher.quick_ratio()
+    def compare(sample: str):
+        length = source_len + len(sample)
+        if not length:
+            return 1.0
+
+        matches = sum((source_counts & Counter(sample)).values())
+        return 2.0 * matches / length
+
+    return compare
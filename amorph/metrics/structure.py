@@ -0,0 +1,259 @@
+import ast
+import io
+import keyword
+import token
+import tokenize
+
+try:
+    import numpy as np
+except ImportError:
+    raise ImportError('numpy is required for structural fingerprints, install amorph[structure]')
+
+from ..exceptions import InvalidArgumentException
+from ..utils.search import find_closest
+from .string import string_similarity
+from .utils import prepared_metric
+
+# concrete node types of the running python, in stable order
+# abstract node types are lowercase, e.g. `ast.stmt`
+NODE_TYPES = sorted(name for name, value in vars(ast).items()
+                    if isinstance(value, type) and issubclass(value, ast.AST) and value is not ast.AST and
+                    name[0].isupper())
+NODE_INDEX = {name: idx for idx, name in enumerate(NODE_TYPES)}
+
+SHAPE_FEATURES = ['depth', 'nested_loops', 'loops_in_functions', 'branches_in_loops', 'statements']
+
+TOKEN_KINDS = sorted(keyword.kwlist) + ['NAME', 'NUMBER', 'STRING', 'OP', 'NEWLINE', 'INDENT']
+TOKEN_INDEX = {kind: idx for idx, kind in enumerate(TOKEN_KINDS)}
+
+FEATURES = ['node:' + name for name in NODE_TYPES] + \
+           ['shape:' + name for name in SHAPE_FEATURES] + \
+           ['token:' + kind for kind in TOKEN_KINDS]
+
+_SHAPE_OFFSET = len(NODE_TYPES)
+_TOKEN_OFFSET = _SHAPE_OFFSET + len(SHAPE_FEATURES)
+
+# node types guessed from tokens of code failed to parse
+KEYWORD_NODES = {
+    'for': ['For'], 'while': ['While'], 'if': ['If'], 'elif': ['If'], 'def': ['FunctionDef'],
+    'class': ['ClassDef'], 'return': ['Return'], 'import': ['Import'], 'try': ['Try'], 'with': ['With'],
+    'lambda': ['Lambda'], 'yield': ['Yield'], 'break': ['Break'], 'continue': ['Continue'], 'pass': ['Pass'],
+    'assert': ['Assert'], 'del': ['Delete'], 'global': ['Global'], 'raise': ['Raise'],
+    'and': ['BoolOp', 'And'], 'or': ['BoolOp', 'Or'], 'not': ['UnaryOp', 'Not'],
+    'True': ['Constant'], 'False': ['Constant'], 'None': ['Constant'],
+}
+OPERATOR_NODES = {
+    '=': ['Assign'], '+': ['BinOp', 'Add'], '-': ['BinOp', 'Sub'], '*': ['BinOp', 'Mult'], '/': ['BinOp', 'Div'],
+    '//': ['BinOp', 'FloorDiv'], '%': ['BinOp', 'Mod'], '**': ['BinOp', 'Pow'],
+    '<': ['Compare', 'Lt'], '>': ['Compare', 'Gt'], '==': ['Compare', 'Eq'], '!=': ['Compare', 'NotEq'],
+    '<=': ['Compare', 'LtE'], '>=': ['Compare', 'GtE'], '[': ['Subscript'],
+    '+=': ['AugAssign', 'Add'], '-=': ['AugAssign', 'Sub'], '*=': ['AugAssign', 'Mult'],
+}
+
+LOOPS = (ast.For, ast.While, ast.AsyncFor)
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+BRANCHES = (ast.If, ast.IfExp, ast.Try)
+
+
+def _node_features(tree, vector):
+    """Counts node types and measures nesting of control flow"""
+    max_depth = 0
+    # nodes along with count of enclosing blocks, loops and functions
+    stack = [(tree, 0, 0, 0)]
+    while stack:
+        node, depth, loops, functions = stack.pop()
+        idx = NODE_INDEX.get(type(node).__name__)
+        if idx is not None:
+            vector[idx] += 1
+        max_depth = max(max_depth, depth)
+
+        if isinstance(node, ast.stmt):
+            vector[_SHAPE_OFFSET + 4] += 1
+        if isinstance(node, LOOPS):
+            if loops:
+                vector[_SHAPE_OFFSET + 1] += 1
+            if functions:
+                vector[_SHAPE_OFFSET + 2] += 1
+        if isinstance(node, BRANCHES) and loops:
+            vector[_SHAPE_OFFSET + 3] += 1
+
+        block = isinstance(node, (ast.stmt, ast.Lambda)) and hasattr(node, 'body')
+        for child in ast.iter_child_nodes(node):
+            stack.append((child,
+                          depth + block,
+                          loops + isinstance(node, LOOPS),
+                          functions + isinstance(node, FUNCTIONS)))
+    vector[_SHAPE_OFFSET] = max_depth
+
+
+def _token_features(code, vector, guess_nodes):
+    """
+    Counts keywords and kinds of tokens, stops at the first tokenization error.
+    Node types and nesting are roughly guessed from tokens if asked
+    """
+    guessed = ['Module']
+    depth, previous = 0, None
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == token.NAME and keyword.iskeyword(tok.string):
+                vector[_TOKEN_OFFSET + TOKEN_INDEX[tok.string]] += 1
+                guessed.extend(KEYWORD_NODES.get(tok.string, []))
+            elif tok.type == token.NAME:
+                vector[_TOKEN_OFFSET + TOKEN_INDEX['NAME']] += 1
+                guessed.extend(['Name', 'Load'])
+            elif tok.type in (token.NUMBER, token.STRING):
+                vector[_TOKEN_OFFSET + TOKEN_INDEX[token.tok_name[tok.type]]] += 1
+                guessed.append('Constant')
+            elif tok.type == token.OP:
+                vector[_TOKEN_OFFSET + TOKEN_INDEX['OP']] += 1
+                guessed.extend(OPERATOR_NODES.get(tok.string, []))
+                if tok.string == '(' and previous is not None and \
+                        (previous.type == token.NAME and not keyword.iskeyword(previous.string) or
+                         previous.string in ')]'):
+                    guessed.append('Call')
+            elif tok.type == token.INDENT:
+                depth += 1
+                vector[_TOKEN_OFFSET + TOKEN_INDEX['INDENT']] += 1
+                if guess_nodes:
+                    vector[_SHAPE_OFFSET] = max(vector[_SHAPE_OFFSET], depth)
+            elif tok.type == token.DEDENT:
+                depth -= 1
+            elif tok.type == token.NEWLINE:
+                vector[_TOKEN_OFFSET + TOKEN_INDEX['NEWLINE']] += 1
+                if guess_nodes:
+                    vector[_SHAPE_OFFSET + 4] += 1
+            previous = tok
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+
+    if guess_nodes:
+        for name in guessed:
+            if name in NODE_INDEX:
+                vector[NODE_INDEX[name]] += 1
+
+
+def fingerprint(code: str):
+    """
+    Describes structure of code as fixed-length vector of counts, see `FEATURES`.
+    Node counts of code failed to parse are guessed from its tokens
+    :param code: Source code
+    :return: Float vector
+    """
+    vector = np.zeros(len(FEATURES))
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        tree = None
+
+    if tree is not None:
+        _node_features(tree, vector)
+    _token_features(code, vector, guess_nodes=tree is None)
+    return vector
+
+
+def fingerprints(codes):
+    """
+    :param codes: Iterable of codes
+    :return: Matrix of fingerprints, one row per code
+    """
+    rows = [fingerprint(code) for code in codes]
+    return np.vstack(rows) if rows else np.zeros((0, len(FEATURES)))
+
+
+def _scale(vectors):
+    # frequent nodes like names shouldn't outweigh rare control flow ones
+    return np.log1p(vectors)
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+DISTANCES = ['cosine', 'l1']
+
+
+class StructureIndex(object):
+    """
+    Fingerprints of corpus stored as matrix. Samples are ranked against source
+    by vectorized distance, as cheap first stage before string level search
+    """
+
+    def __init__(self, samples, key=None, distance: str = 'cosine', matrix=None, features: list = None):
+        """
+        :param samples: Iterable of samples
+        :param key: Single argument function to get code from sample
+        :param distance: `cosine` or `l1`
+        :param matrix: Precomputed fingerprints of samples, e.g. loaded with `numpy.load`. \
+                       Node types are taken from `ast` of running python, so fingerprints \
+                       computed by another version of python can't be used
+        :param features: `FEATURES` saved along with matrix, checked to be the same as current ones
+        """
+        if distance not in DISTANCES:
+            raise InvalidArgumentException('Unknown distance {!r}'.format(distance))
+
+        self.samples = list(samples)
+        self.key = key
+        self.distance = distance
+        self.matrix = matrix if matrix is not None else \
+            fingerprints(key(sample) if key else sample for sample in self.samples)
+        if len(self.matrix) != len(self.samples):
+            raise InvalidArgumentException('Matrix has {} rows for {} samples'.format(
+                len(self.matrix), len(self.samples)))
+        if self.matrix.ndim != 2 or self.matrix.shape[1] != len(FEATURES):
+            raise InvalidArgumentException('Matrix has {} columns for {} features, it was computed by another '
+                                           'version of python'.format(self.matrix.shape[1:], len(FEATURES)))
+        if features is not None and list(features) != FEATURES:
+            raise InvalidArgumentException('Matrix was computed for other features by another version of python')
+
+        self._scaled = _scale(self.matrix)
+        if distance == 'cosine':
+            self._scaled = _normalize(self._scaled)
+
+    def similarities(self, source):
+        """
+        :param source: Source code or object, see `key`
+        :return: Array of similarities of samples to source, greater is closer
+        """
+        vector = _scale(fingerprint(self.key(source) if self.key else source))
+        if self.distance == 'cosine':
+            return self._scaled @ _normalize(vector)
+        return -np.abs(self._scaled - vector).sum(axis=1)
+
+    def rank(self, source, count: int = None):
+        """
+        :param source: Source code or object, see `key`
+        :param count: Max count of indices to return, all if not given
+        :return: Indices of samples from the closest one
+        """
+        scores = self.similarities(source)
+        if count is not None and count < len(scores):
+            top = np.argpartition(-scores, count)[:count]
+            # stable order among equal scores, as in `find_top`
+            return top[np.lexsort((top, -scores[top]))]
+        return np.argsort(-scores, kind='stable')
+
+    def candidates(self, source, count: int):
+        return [self.samples[idx] for idx in self.rank(source, count)]
+
+    def find_closest(self, source, count: int = 100, metric=string_similarity, timeout=None):
+        """
+        Finds closest code among structurally closest samples
+        :param source: Source code or object, see `key`
+        :param count: Count of structurally closest samples scored with metric
+        :param metric: Two string arguments function measuring similarity between two codes
+        :param timeout: Max time in seconds to search among candidates
+        :return: Closest to source sample
+        """
+        return find_closest(source, self.candidates(source, count), metric, self.key, timeout)
+
+
+@prepared_metric
+def structure_similarity(source: str):
+    """Cosine similarity of scaled fingerprints"""
+    vector = _normalize(_scale(fingerprint(source)))
+
+    def compare(sample: str):
+        return float(vector @ _normalize(_scale(fingerprint(sample))))
+
+    return compare
@@ -0,0 +1,49 @@
+import unittest
+
+from amorph.metrics import edit_distance, line_edit_distance, edit_similarity, line_edit_similarity, prepare_metric
+from amorph.tracing import CollectingTracer, tracing, SAMPLES_SCORED, SAMPLES_PRUNED
+from amorph.utils import find_closest
+
+
+class TestEdit(unittest.TestCase):
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('kitten', 'sitting'), 3)
+        self.assertEqual(edit_distance('', 'abc'), 3)
+        self.assertEqual(edit_distance('abc', ''), 3)
+        self.assertEqual(edit_distance('a + b', 'a + b'), 0)
+        self.assertEqual(edit_distance('a' * 100 + 'b', 'b' + 'a' * 100), 2)
+
+    def test_max_distance(self):
+        self.assertEqual(edit_distance('kitten', 'sitting', max_distance=3), 3)
+        self.assertIsNone(edit_distance('kitten', 'sitting', max_distance=2))
+        self.assertIsNone(edit_distance('a', 'abcd', max_distance=2))
+
+    def test_line_edit_distance(self):
+        source = 'a = 1\nb = 2\nprint(a + b)\n'
+        sample = 'a = 1\nb = 3\nc = 4\nprint(a + b)\n'
+
+        self.assertEqual(line_edit_distance(source, sample), 2)
+
+    def test_similarity(self):
+        self.assertEqual(edit_similarity('', ''), 1.0)
+        self.assertEqual(edit_similarity('abcd', 'abce'), 0.75)
+        self.assertEqual(line_edit_similarity('a\nb\n', 'a\nc\n'), 0.5)
+
+        compare = prepare_metric(edit_similarity, 'abcd')
+        self.assertIsNone(compare('xyzw', 0.5))
+        self.assertEqual(compare('abcx', 0.5), 0.75)
+
+    def test_find_closest(self):
+        source = 'a + b + c'
+        samples = ['a + b', '(a + b) * c', 'x * y * z * w', 'a + b * c']
+
+        tracer = CollectingTracer()
+        with tracing(tracer):
+            sample = find_closest(source, samples, edit_similarity)
+
+        self.assertEqual(sample, samples[3])
+        self.assertEqual(tracer[SAMPLES_SCORED] + tracer[SAMPLES_PRUNED], len(samples))
+        self.assertGreater(tracer[SAMPLES_PRUNED], 0)
+
+if __name__ == '__main__':
+    unittest.main()
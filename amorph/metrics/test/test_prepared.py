@@ -0,0 +1,48 @@
+import unittest
+from difflib import SequenceMatcher
+from operator import itemgetter
+
+from amorph.metrics import string_similarity, prepared_metric, prepare_metric
+from amorph.utils import find_closest
+
+
+class TestPrepared(unittest.TestCase):
+    def test_quick_ratio(self):
+        source = 'def f(a, b):\n    return a + b\n'
+        samples = ['', 'a + b', 'def f(a, b):\n    return a * b\n', 'print(input())']
+
+        compare = prepare_metric(string_similarity, source)
+        for sample in samples:
+            expected = SequenceMatcher(None, source, sample).quick_ratio()
+            self.assertEqual(compare(sample), expected)
+            self.assertEqual(string_similarity(source, sample), expected)
+
+        self.assertEqual(string_similarity('', ''), 1.0)
+
+    def test_key(self):
+        compare = prepare_metric(string_similarity, {'code': 'a + b'}, itemgetter('code'))
+
+        self.assertEqual(compare({'code': 'a + b'}), 1.0)
+
+    def test_plain_metric(self):
+        def length_metric(source, sample, key=None):
+            return -abs(len(source) - len(sample))
+
+        compare = prepare_metric(length_metric, 'a + b')
+        self.assertEqual(compare('a+b'), -2)
+
+    def test_custom_prepared(self):
+        prepared = []
+
+        @prepared_metric
+        def length_metric(source):
+            prepared.append(source)
+            return lambda sample: -abs(len(source) - len(sample))
+
+        sample = find_closest('a + b', ['a', 'a + c', 'a + b + c'], length_metric)
+
+        self.assertEqual(sample, 'a + c')
+        self.assertEqual(prepared, ['a + b'])
+
+if __name__ == '__main__':
+    unittest.main()
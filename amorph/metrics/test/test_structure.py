@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from amorph.metrics.structure import FEATURES, StructureIndex, fingerprint, fingerprints, structure_similarity
+except ImportError:
+    np = None
+
+from amorph.exceptions import InvalidArgumentException
+
+LOOP = 'n = int(input())\nfor i in range(n):\n    if i % 2:\n        print(i)\n'
+BROKEN_LOOP = 'n = int(input())\nfor i in range(n)\n    if i % 2:\n        print(i)\n'
+FUNCTION = 'def f(a, b):\n    return a + b\n\nprint(f(1, 2))\n'
+SAMPLES = [
+    'print(sum(map(int, input().split())))\n',
+    'a = int(input())\nb = int(input())\nprint(a * b)\n',
+    'n = int(input())\ni = 0\nwhile i < n:\n    if i % 2:\n        print(i)\n    i += 1\n',
+    'n = int(input())\nfor j in range(n):\n    if j % 3:\n        print(j)\n',
+    FUNCTION,
+]
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestStructure(unittest.TestCase):
+    def feature(self, vector, name):
+        return vector[FEATURES.index(name)]
+
+    def test_fingerprint(self):
+        vector = fingerprint(LOOP)
+
+        self.assertEqual(vector.shape, (len(FEATURES),))
+        self.assertEqual(self.feature(vector, 'node:For'), 1)
+        self.assertEqual(self.feature(vector, 'node:If'), 1)
+        self.assertEqual(self.feature(vector, 'shape:depth'), 2)
+        self.assertEqual(self.feature(vector, 'shape:branches_in_loops'), 1)
+        self.assertEqual(self.feature(fingerprint(FUNCTION), 'node:FunctionDef'), 1)
+
+    def test_unparsable(self):
+        vector = fingerprint(BROKEN_LOOP)
+
+        # nodes are guessed from tokens
+        self.assertEqual(self.feature(vector, 'node:For'), 1)
+        self.assertEqual(self.feature(vector, 'shape:depth'), 2)
+        self.assertGreater(structure_similarity(LOOP, BROKEN_LOOP), structure_similarity(LOOP, FUNCTION))
+        self.assertEqual(fingerprint('print((').shape, (len(FEATURES),))
+
+    def test_rank(self):
+        for distance in ['cosine', 'l1']:
+            index = StructureIndex(SAMPLES, distance=distance)
+
+            self.assertEqual(list(index.rank(LOOP, 2)), [3, 2])
+            self.assertEqual(list(index.rank(BROKEN_LOOP))[0], 3)
+            self.assertEqual(len(index.rank(LOOP)), len(SAMPLES))
+
+        with self.assertRaises(InvalidArgumentException):
+            StructureIndex(SAMPLES, distance='l2')
+
+    def test_find_closest(self):
+        samples = [{'code': code} for code in SAMPLES]
+        index = StructureIndex(samples, key=lambda sample: sample['code'])
+
+        self.assertIs(index.find_closest({'code': LOOP}, count=2), samples[3])
+
+    def test_precomputed_matrix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fingerprints.npy')
+            np.save(path, fingerprints(SAMPLES))
+            index = StructureIndex(SAMPLES, matrix=np.load(path))
+
+            self.assertEqual(list(index.rank(LOOP, 1)), [3])
+            with self.assertRaises(InvalidArgumentException):
+                StructureIndex(SAMPLES[1:], matrix=np.load(path))
+
+            # fingerprints of another version of python have other node types
+            self.assertEqual(list(StructureIndex(SAMPLES, matrix=np.load(path), features=FEATURES).rank(LOOP, 1)),
+                             [3])
+            with self.assertRaises(InvalidArgumentException):
+                StructureIndex(SAMPLES, matrix=np.load(path)[:, 1:])
+            with self.assertRaises(InvalidArgumentException):
+                StructureIndex(SAMPLES, matrix=np.load(path), features=FEATURES[1:] + ['node:Unknown'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,6 @@
+from functools import wraps
+
+
 def metric_with_key(metric):
     def new_metric(source, sample, key=None):
         if key:
@@ -5,3 +8,56 @@ def metric_with_key(metric):
             sample = key(sample)
         return metric(source, sample)
     return new_metric
+
+
+def prepared_metric(prepare):
+    """
+    Makes metric from function analyzing source once for comparison with many samples.
+    Resulting metric can be called as usual and has `prepare(source, key=None)` attribute
+    returning single argument function comparing prepared source with sample
+    :param prepare: Single argument function taking source and returning \
+                    single argument function measuring similarity of sample to it
+    :return: Metric
+    """
+    def prepare_with_key(source, key=None):
+        if not key:
+            return prepare(source)
+
+        compare = prepare(key(source))
+        return lambda sample, *args: compare(key(sample), *args)
+
+    @wraps(prepare)
+    def new_metric(source, sample, key=None):
+        return prepare_with_key(source, key)(sample)
+
+    new_metric.prepare = prepare_with_key
+    return new_metric
+
+
+def bounded_metric(prepare):
+    """
+    Same as `prepared_metric` for metrics able to stop comparison early. Compare function \
+    takes best metric value found so far as optional second argument and returns None \
+    if sample is known not to exceed it
+    :param prepare: Single argument function taking source and returning \
+                    function of sample and best value measuring similarity of sample to source
+    :return: Metric
+    """
+    new_metric = prepared_metric(prepare)
+    new_metric.bounded = True
+    return new_metric
+
+
+def prepare_metric(metric, source, key=None):
+    """
+    Prepares source for comparison with many samples if metric supports it
+    :param metric: Metric, optionally having `prepare(source, key=None)` attribute
+    :param source: Source code
+    :param key: Single argument function to get value for metric computing
+    :return: Single argument function measuring similarity of sample to the source
+    """
+    prepare = getattr(metric, 'prepare', None)
+    if prepare is not None:
+        return prepare(source, key)
+
+    return lambda sample: metric(source, sample, key)
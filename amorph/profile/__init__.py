@@ -0,0 +1 @@
+from .profiler import profile_stage, profile_methods, load_submissions, format_table
@@ -0,0 +1,32 @@
+import json
+import sys
+from argparse import ArgumentParser
+
+from amorph.combo import Method
+from amorph.profile import profile_methods, load_submissions, format_table
+from amorph.profile.profiler import SORT_KEYS
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m amorph.profile')
+    parser.add_argument('data', help='Path to CSV file of submissions with code and status columns')
+    parser.add_argument('--limit', help='Number of wrong submissions to patch', type=int, default=10)
+    parser.add_argument('--correct-limit', help='Number of correct submissions to search in', type=int)
+    parser.add_argument('--method', help='Method to profile, all methods if not given', type=Method,
+                        action='append')
+    parser.add_argument('--top', help='Number of the most expensive functions to show', type=int, default=20)
+    parser.add_argument('--sort', help='Order of functions', choices=SORT_KEYS, default='tottime')
+    parser.add_argument('--no-memory', help='Skip tracing of memory allocations', action='store_true')
+    parser.add_argument('--json', help='Path to save JSON report in, - for stdout instead of table')
+    args = parser.parse_args()
+
+    wrong, correct = load_submissions(args.data, args.limit, args.correct_limit)
+    report = profile_methods(wrong, correct, args.method, args.top, args.sort, not args.no_memory)
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_table(report))
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,178 @@
+import cProfile
+import os
+import pstats
+import tracemalloc
+from timeit import default_timer as timer
+
+import amorph
+from amorph.combo import Method, patch_with_sample
+from amorph.corpus import CsvSource
+from amorph.utils import find_closest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(amorph.__file__)))
+
+SORT_KEYS = ['tottime', 'cumtime', 'calls']
+
+
+def _short_path(filename):
+    if filename.startswith(PACKAGE_DIR + os.sep):
+        return os.path.relpath(filename, PACKAGE_DIR)
+    if os.path.basename(filename) == '__init__.py':
+        # package name tells more than file name
+        return os.path.join(*os.path.normpath(filename).split(os.sep)[-2:])
+    return os.path.basename(filename)
+
+
+def _location(filename, line, name):
+    """Short readable name of profiled function"""
+    if filename == '~':
+        # built-in functions have no file
+        return name
+    return '{}:{}({})'.format(_short_path(filename), line, name)
+
+
+def _functions(profiler, top, sort):
+    stats = pstats.Stats(profiler)
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        functions.append({
+            'function': _location(filename, line, name),
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime
+        })
+    functions.sort(key=lambda function: function[sort], reverse=True)
+    return functions[:top]
+
+
+def profile_stage(func, top: int = 20, sort: str = 'tottime', memory: bool = True):
+    """
+    Runs function three times: timed, under cProfile and under tracemalloc
+    :param func: Function without arguments returning list of results, e.g. lists of patches
+    :param top: Count of the most expensive functions to report
+    :param sort: Key to order functions by, one of `SORT_KEYS`
+    :param memory: Whether to trace memory allocations
+    :return: Tuple of results of the first run and dict of stats
+    """
+    start = timer()
+    results = func()
+    stats = {'time': timer() - start}
+
+    profiler = cProfile.Profile()
+    profiler.runcall(func)
+    stats['functions'] = _functions(profiler, top, sort)
+
+    if memory:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        # results are kept to find memory retained by them
+        retained = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        # snapshots themselves are allocated by tracemalloc
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        diff = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), 'lineno')
+        stats['memory'] = {
+            'peak_bytes': peak,
+            'retained_bytes': sum(stat.size_diff for stat in diff),
+            'retained_blocks': sum(stat.count_diff for stat in diff),
+            'top': [{
+                'location': '{}:{}'.format(_short_path(frame.filename), frame.lineno),
+                'bytes': stat.size_diff,
+                'blocks': stat.count_diff
+            } for stat in diff[:5] for frame in [stat.traceback[0]]]
+        }
+        del retained
+
+    return results, stats
+
+
+def load_submissions(path: str, limit: int = None, correct_limit: int = None):
+    """
+    Reads submissions CSV with `code` and `status` columns
+    :return: Tuple of lists of wrong and correct codes
+    """
+    wrong = list(CsvSource(path, where={'status': 'wrong'}, limit=limit))
+    correct = list(CsvSource(path, where={'status': 'correct'}, limit=correct_limit))
+    return wrong, correct
+
+
+def profile_methods(wrong: list, correct: list, methods=None, top: int = 20, sort: str = 'tottime',
+                    memory: bool = True):
+    """
+    Profiles search of closest samples and every patch method
+    :param wrong: List of codes to patch
+    :param correct: List of correct codes to search in
+    :param methods: List of patch methods, all methods if not given
+    :return: Dict mapping stage name to its stats, failed stages have error instead
+    """
+    matched, stats = profile_stage(lambda: [find_closest(source, correct) for source in wrong], top, sort, memory)
+    stats['samples'] = len(wrong)
+    report = {'search': stats}
+
+    pairs = [(source, sample) for source, sample in zip(wrong, matched) if sample is not None]
+    for method in methods or list(Method):
+        def patch_all():
+            return [list(patch_with_sample(source, sample, method)) for source, sample in pairs]
+
+        try:
+            patches, stats = profile_stage(patch_all, top, sort, memory)
+        except Exception as e:
+            report[method.value] = {'error': '{}: {}'.format(type(e).__name__, e)}
+            continue
+
+        stats['samples'] = len(pairs)
+        stats['patches'] = sum(map(len, patches))
+        if memory:
+            # freed temporaries aren't seen by snapshots, so only blocks still alive are counted
+            stats['memory']['retained_blocks_per_patch'] = \
+                stats['memory']['retained_blocks'] / max(stats['patches'], 1)
+        report[method.value] = stats
+    return report
+
+
+def _format_bytes(size):
+    for unit in ['B', 'KB', 'MB']:
+        if abs(size) < 1024:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1024
+    return '{:.1f} GB'.format(size)
+
+
+def format_table(report):
+    """
+    Formats profile report as readable text
+    :param report: Report returned by `profile_methods`
+    :return: String
+    """
+    lines = []
+    for stage, stats in report.items():
+        if 'error' in stats:
+            lines.append('== {}: failed, {}'.format(stage, stats['error']))
+            lines.append('')
+            continue
+
+        summary = ['{:.3f}s'.format(stats['time']), '{} samples'.format(stats['samples'])]
+        if 'patches' in stats:
+            summary.append('{} patches'.format(stats['patches']))
+        if 'memory' in stats:
+            memory = stats['memory']
+            summary.append('peak {}'.format(_format_bytes(memory['peak_bytes'])))
+            summary.append('retained {}'.format(_format_bytes(memory['retained_bytes'])))
+            if 'retained_blocks_per_patch' in memory:
+                summary.append('{:.1f} retained blocks per patch'.format(memory['retained_blocks_per_patch']))
+        lines.append('== {}: {}'.format(stage, ', '.join(summary)))
+
+        lines.append('{:>10} {:>10} {:>10}  {}'.format('calls', 'tottime', 'cumtime', 'function'))
+        for function in stats['functions']:
+            lines.append('{calls:>10} {tottime:>10.4f} {cumtime:>10.4f}  {function}'.format(**function))
+
+        if 'memory' in stats:
+            lines.append('{:>10} {:>10}  {}'.format('retained', 'blocks', 'allocated at'))
+            for site in stats['memory']['top']:
+                lines.append('{:>10} {:>10}  {}'.format(_format_bytes(site['bytes']), site['blocks'],
+                                                        site['location']))
+        lines.append('')
+    return '\n'.join(lines)
@@ -0,0 +1,59 @@
+import csv
+import os
+import tempfile
+import unittest
+from functools import partial
+from unittest import mock
+
+import amorph.ast
+from amorph import Method
+from amorph.ast.standin import StandInServer
+from amorph.profile import profile_stage, profile_methods, load_submissions, format_table
+
+CORRECT = ['a + b', '(a + b) * c', 'a + b * c']
+WRONG = ['a + b + c', 'a - b']
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage(self):
+        results, stats = profile_stage(lambda: [list(range(1000)) for _ in range(10)], top=3)
+
+        self.assertEqual(len(results), 10)
+        self.assertLessEqual(len(stats['functions']), 3)
+        self.assertGreater(stats['memory']['retained_bytes'], 0)
+        self.assertGreaterEqual(stats['memory']['peak_bytes'], stats['memory']['retained_bytes'])
+
+    def test_methods(self):
+        report = profile_methods(WRONG, CORRECT, [Method.DIFF, Method.TOKENS], top=5)
+
+        self.assertEqual(list(report), ['search', 'diff', 'tokens'])
+        self.assertEqual(report['diff']['samples'], 2)
+        self.assertGreater(report['diff']['patches'], 0)
+        self.assertTrue(any('diff/patch.py' in function['function']
+                            for function in profile_methods(WRONG, CORRECT, [Method.DIFF], 50)['diff']['functions']))
+        self.assertIn('== tokens:', format_table(report))
+
+    def test_failed_method(self):
+        with StandInServer(error_rate=1) as server, \
+                mock.patch.object(amorph.ast, 'get_patches', partial(amorph.ast.get_patches,
+                                                                     api_endpoint=server.endpoint)):
+            report = profile_methods(WRONG, CORRECT, [Method.AST], memory=False)
+
+        # method is failed when API server responds with errors
+        self.assertIn('error', report['ast'])
+        self.assertNotIn('memory', report['search'])
+        self.assertIn('failed', format_table(report))
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'data.csv')
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['code', 'status'])
+                writer.writerows([[code, 'correct'] for code in CORRECT] + [[code, 'wrong'] for code in WRONG])
+
+            self.assertEqual(load_submissions(path, limit=1), (WRONG[:1], CORRECT))
+
+
+if __name__ == '__main__':
+    unittest.main()
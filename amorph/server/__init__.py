@@ -0,0 +1,2 @@
+from .service import FeedbackService
+from .http import make_server
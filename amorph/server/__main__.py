@@ -0,0 +1,62 @@
+import logging as log
+import os
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from glob import glob
+
+from amorph.corpus import open_source
+from amorph.exceptions import UnknownProblemException
+from amorph.server import FeedbackService, make_server
+
+log.basicConfig(level=log.INFO)
+
+EXTENSIONS = ['.csv', '.jsonl']
+
+
+def problem_loader(directory):
+    def load(problem_id):
+        for extension in EXTENSIONS:
+            path = os.path.join(directory, problem_id + extension)
+            if os.path.isfile(path):
+                log.info('problem "{}" loaded'.format(problem_id))
+                return open_source(path)
+        raise UnknownProblemException('Unknown problem {!r}'.format(problem_id))
+    return load
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(prog='python -m amorph.server')
+    parser.add_argument('--host', help='Host to listen on', default='localhost')
+    parser.add_argument('--port', help='Port to listen on', type=int, default=8080)
+    parser.add_argument('--unix', help='Path to unix socket to listen on instead of TCP port')
+    parser.add_argument('--workers', help='Number of worker processes', type=int, default=os.cpu_count())
+    parser.add_argument('--threads', help='Compute feedback on threads instead of processes', action='store_true')
+    parser.add_argument('--max-pending', help='Max number of queued computations', type=int, default=256)
+    parser.add_argument('--timeout', help='Default request deadline in seconds', type=float)
+    parser.add_argument('--problems', help='Directory with <problem id>.csv or <problem id>.jsonl files of '
+                                           'correct samples to load on start')
+    parser.add_argument('--lazy', help='Load problems on first request instead of on start', action='store_true')
+    parser.add_argument('--memory-budget', help='Max total size of loaded corpora in megabytes, least recently '
+                                                'used ones are evicted and reloaded on demand', type=float)
+    parser.add_argument('--verbose', help='Log every request', action='store_true')
+    args = parser.parse_args()
+
+    executor_class = ThreadPoolExecutor if args.threads else ProcessPoolExecutor
+    budget = int(args.memory_budget * 2 ** 20) if args.memory_budget is not None else None
+    loader = problem_loader(args.problems) if args.problems else None
+    service = FeedbackService(executor_class(args.workers), args.max_pending, args.timeout, loader, budget)
+
+    if args.problems and not args.lazy:
+        for path in sorted(glob(os.path.join(args.problems, '*.csv')) + glob(os.path.join(args.problems, '*.jsonl'))):
+            problem_id, _ = os.path.splitext(os.path.basename(path))
+            service.registry.get(problem_id)
+
+    server = make_server(service, args.host, args.port, args.unix, args.verbose)
+    log.info('listening on {}'.format(args.unix or '{}:{}'.format(*server.server_address[:2])))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
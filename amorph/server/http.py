@@ -0,0 +1,186 @@
+import json
+import os
+import re
+import socketserver
+from concurrent.futures import TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from amorph.combo import Method
+from amorph.exceptions import (AmorphException, InvalidArgumentException, OverloadedException,
+                               UnknownProblemException)
+
+ROUTES = [
+    ('GET', re.compile(r'^/health$'), 'health'),
+    ('GET', re.compile(r'^/problems$'), 'list_problems'),
+    ('PUT', re.compile(r'^/problems/(?P<problem_id>[^/]+)$'), 'load_problem'),
+    ('DELETE', re.compile(r'^/problems/(?P<problem_id>[^/]+)$'), 'unload_problem'),
+    ('POST', re.compile(r'^/problems/(?P<problem_id>[^/]+)/feedback$'), 'feedback'),
+    ('POST', re.compile(r'^/problems/(?P<problem_id>[^/]+)/feedback/batch$'), 'feedback_batch'),
+]
+
+ERRORS = [
+    (UnknownProblemException, 404),
+    (InvalidArgumentException, 400),
+    (ValueError, 400),
+    (OverloadedException, 503),
+    (TimeoutError, 504),
+    (AmorphException, 500),
+]
+
+
+class FeedbackHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of feedback service:
+        GET    /health
+        GET    /problems                           -> {"problems": {problem_id: count of samples}}
+        PUT    /problems/<id>                      <- {"samples": [code, ...]}
+        DELETE /problems/<id>
+        POST   /problems/<id>/feedback             <- {"source": code, "method": "diff", "candidates": 1,
+                                                       "timeout": seconds}
+                                                   -> {"matched": code, "patches": [patch, ...]}
+        POST   /problems/<id>/feedback/batch       <- {"sources": [code, ...], ...}
+                                                   -> {"results": [{"matched": ..., "patches": ...}, ...]}
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _dispatch(self, verb):
+        for route_verb, pattern, handler in ROUTES:
+            match = pattern.match(self.path)
+            if match and route_verb == verb:
+                break
+        else:
+            return self._send(404, {'error': 'Not found'})
+
+        try:
+            status, body = getattr(self, handler)(**match.groupdict())
+        except Exception as e:
+            for error, status in ERRORS:
+                if isinstance(e, error):
+                    break
+            else:
+                status = 500
+            body = {'error': str(e) or type(e).__name__}
+        self._send(status, body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length).decode() or '{}')
+        except ValueError:
+            raise InvalidArgumentException('Invalid JSON given')
+        if not isinstance(body, dict):
+            raise InvalidArgumentException('JSON object expected')
+        return body
+
+    def _send(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _options(self, body):
+        try:
+            method = Method(body.get('method', Method.DIFF.value))
+        except ValueError:
+            raise InvalidArgumentException('Unknown method {!r}'.format(body.get('method')))
+
+        candidates = body.get('candidates', 1)
+        # bool is int as well, but isn't a count
+        if not isinstance(candidates, int) or isinstance(candidates, bool) or candidates < 1:
+            raise InvalidArgumentException('Positive integer count of candidates expected')
+
+        timeout = body.get('timeout')
+        if timeout is not None and (not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or
+                                    not timeout > 0):
+            raise InvalidArgumentException('Positive number of seconds of timeout expected')
+
+        return {
+            'method': method,
+            'candidates': candidates,
+            'timeout': timeout
+        }
+
+    def health(self):
+        return 200, {'status': 'ok'}
+
+    def list_problems(self):
+        return 200, {'problems': self.service.problems()}
+
+    def load_problem(self, problem_id):
+        samples = self._read_json().get('samples')
+        if not isinstance(samples, list):
+            raise InvalidArgumentException('List of samples expected')
+        self.service.load(problem_id, samples)
+        return 200, {'samples': len(samples)}
+
+    def unload_problem(self, problem_id):
+        self.service.unload(problem_id)
+        return 200, {}
+
+    def feedback(self, problem_id):
+        body = self._read_json()
+        if not isinstance(body.get('source'), str):
+            raise InvalidArgumentException('Source code expected')
+        return 200, self.service.feedback(problem_id, body['source'], **self._options(body))
+
+    def feedback_batch(self, problem_id):
+        body = self._read_json()
+        sources = body.get('sources')
+        if not isinstance(sources, list) or not all(isinstance(source, str) for source in sources):
+            raise InvalidArgumentException('List of source codes expected')
+        return 200, {'results': self.service.feedback_batch(problem_id, sources, **self._options(body))}
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def address_string(self):
+        # unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+
+def make_server(service, host: str = 'localhost', port: int = 8080, unix_socket: str = None, verbose=False):
+    """
+    Creates HTTP server of feedback service
+    :param service: Feedback service
+    :param host: Host to listen on
+    :param port: Port to listen on, 0 to choose free one
+    :param unix_socket: Path to unix socket to listen on instead of TCP port
+    :param verbose: Whether to log requests
+    :return: Server, call `serve_forever` to run it
+    """
+    if unix_socket:
+        server = UnixHTTPServer(unix_socket, FeedbackHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), FeedbackHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
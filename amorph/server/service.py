@@ -0,0 +1,267 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+
+from amorph.combo import Method, patch_with_sample, patch_with_cheapest
+from amorph.corpus import CorpusRegistry, SharedCorpus
+from amorph.exceptions import InvalidArgumentException, OverloadedException, UnknownProblemException
+from amorph.utils import find_closest
+
+# corpora attached by the worker process, by name of shared memory segment
+_attached = OrderedDict()
+_attached_lock = threading.Lock()
+# count of corpora removed by every service, as last told to the worker
+_generations = {}
+
+# max count of corpora kept attached by worker
+MAX_ATTACHED = 64
+
+
+def _attach(name):
+    with _attached_lock:
+        corpus = _attached.pop(name, None)
+        if corpus is None:
+            corpus = SharedCorpus.attach(name)
+        _attached[name] = corpus
+
+        # detach rarely used corpora, so memory of removed ones is freed
+        while len(_attached) > MAX_ATTACHED:
+            _, stale = _attached.popitem(last=False)
+            stale.close()
+        return corpus
+
+
+def _detach_removed(service_id, generation, removed):
+    """
+    Detaches corpora removed by service since the previous computation of the worker,
+    so their memory is freed right away
+    :param service_id: Id of service, workers of thread pool may serve several ones
+    :param generation: Count of corpora removed by service
+    :param removed: Names of the latest removed corpora
+    """
+    with _attached_lock:
+        seen = _generations.get(service_id, 0)
+        if generation <= seen:
+            return
+        # worker missed names of some removed corpora, so every corpus is detached
+        missed = generation - seen > len(removed)
+        for name in [name for name in _attached if missed or name in removed]:
+            _attached.pop(name).close()
+        _generations[service_id] = generation
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.time() >= deadline:
+        raise TimeoutError('Deadline exceeded')
+
+
+def compute_feedback(corpus_name: str, source: str, method: str, candidates: int = 1, service_id: str = None,
+                     generation: int = 0, removed=(), deadline: float = None):
+    """
+    Computes patches for source with samples of shared corpus. Runs in worker
+    :param corpus_name: Name of shared corpus
+    :param source: Source code
+    :param method: Value of patch method
+    :param candidates: Count of closest samples to choose the smallest patches from
+    :param service_id: Id of service, see `_detach_removed`
+    :param generation: Count of corpora removed by service
+    :param removed: Names of the latest removed corpora
+    :param deadline: Time by `time.time` the result is useless after, search is cut short by it
+    :return: Dict with closest sample, if single candidate is used, and list of patches as dicts
+    :raises TimeoutError: Deadline passed before search or patching started
+    """
+    _detach_removed(service_id, generation, removed)
+    corpus = _attach(corpus_name)
+    method = Method(method)
+
+    _check_deadline(deadline)
+    timeout = deadline - time.time() if deadline is not None else None
+    if candidates > 1:
+        matched = None
+        patches = patch_with_cheapest(source, corpus, candidates, method, timeout=timeout)
+    else:
+        matched = find_closest(source, corpus, timeout=timeout)
+        _check_deadline(deadline)
+        patches = patch_with_sample(source, matched, method) if matched is not None else []
+
+    return {
+        'matched': matched,
+        'patches': [patch.to_dict() for patch in patches]
+    }
+
+
+class FeedbackService(object):
+    """Keeps corpora of problems in shared memory and computes feedback on pool of workers"""
+
+    def __init__(self, executor=None, max_pending: int = 256, timeout: float = None, loader=None,
+                 budget: int = None):
+        """
+        :param executor: Executor to run computations on, process pool by default
+        :param max_pending: Max count of submitted and not finished computations
+        :param timeout: Default deadline of request in seconds
+        :param loader: Single argument function returning samples of problem by its id, \
+                       used to load problems on demand and reload evicted ones
+        :param budget: Max total size of corpora in bytes, least recently used ones are evicted
+        """
+        self.executor = executor or ProcessPoolExecutor()
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self.registry = CorpusRegistry(self._load_samples if loader else None, budget, self._retire)
+        self._samples_loader = loader
+        self._pending = 0
+        # computations using corpus and corpora removed while being used, by name of segment
+        self._using = Counter()
+        self._retired = {}
+        # removed corpora are detached by workers on their next computation
+        self._id = uuid.uuid4().hex
+        self._generation = 0
+        self._removed = deque(maxlen=MAX_ATTACHED)
+        self._lock = threading.Lock()
+
+    def _load_samples(self, problem_id):
+        return SharedCorpus.create(self._samples_loader(problem_id))
+
+    def load(self, problem_id: str, samples):
+        """
+        Stores samples of problem, replacing previous ones
+        :param problem_id: Id of problem
+        :param samples: Iterable of correct codes
+        """
+        self.registry.put(problem_id, SharedCorpus.create(samples))
+
+    def unload(self, problem_id: str):
+        if not self.registry.discard(problem_id):
+            raise UnknownProblemException('Unknown problem {!r}'.format(problem_id))
+
+    def problems(self):
+        """
+        :return: Dict mapping ids of loaded problems to count of samples
+        """
+        with self.registry.lock:
+            return {problem_id: len(self.registry.peek(problem_id)) for problem_id in self.registry.problems()}
+
+    def _acquire(self, problem_id, count):
+        # corpus is kept until computations using it finish, even if evicted meanwhile
+        while True:
+            corpus = self.registry.get(problem_id)
+            with self.registry.lock:
+                # corpus may be evicted by concurrent request right after loading
+                if self.registry.peek(problem_id) is corpus:
+                    if count:
+                        with self._lock:
+                            self._using[corpus.name] += count
+                    return corpus
+
+    def _retire(self, problem_id, corpus):
+        with self._lock:
+            if self._using[corpus.name]:
+                self._retired[corpus.name] = corpus
+                return
+        self._remove(corpus)
+
+    def _unuse(self, name, count=1):
+        with self._lock:
+            self._using[name] -= count
+            if self._using[name] > 0:
+                return
+            del self._using[name]
+            corpus = self._retired.pop(name, None)
+        if corpus is not None:
+            self._remove(corpus)
+
+    def _remove(self, corpus):
+        with self._lock:
+            self._generation += 1
+            self._removed.append(corpus.name)
+        corpus.close()
+
+    def _reserve(self, count):
+        with self._lock:
+            if self._pending + count > self.max_pending:
+                raise OverloadedException('Too many pending requests')
+            self._pending += count
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+        self._unuse(future.corpus_name)
+
+    def submit(self, problem_id: str, source: str, method: Method = Method.DIFF, candidates: int = 1,
+               deadline: float = None):
+        return self.submit_batch(problem_id, [source], method, candidates, deadline)[0]
+
+    def submit_batch(self, problem_id: str, sources: list, method: Method = Method.DIFF, candidates: int = 1,
+                     deadline: float = None):
+        """
+        Submits computations of feedback
+        :param deadline: Time by `time.time` workers stop searching at, see `compute_feedback`
+        :return: List of futures
+        """
+        if not isinstance(method, Method):
+            raise InvalidArgumentException('Unknown method {!r}'.format(method))
+
+        self._reserve(len(sources))
+
+        futures = []
+        corpus = None
+        try:
+            corpus = self._acquire(problem_id, len(sources))
+            with self._lock:
+                generation, removed = self._generation, tuple(self._removed)
+            for source in sources:
+                future = self.executor.submit(compute_feedback, corpus.name, source, method.value, candidates,
+                                              self._id, generation, removed, deadline)
+                future.corpus_name = corpus.name
+                future.add_done_callback(self._release)
+                futures.append(future)
+        finally:
+            # release slots of sources failed to be submitted
+            with self._lock:
+                self._pending -= len(sources) - len(futures)
+            if corpus is not None and len(futures) < len(sources):
+                self._unuse(corpus.name, len(sources) - len(futures))
+        return futures
+
+    def feedback(self, problem_id: str, source: str, method: Method = Method.DIFF, candidates: int = 1,
+                 timeout: float = None):
+        """
+        Computes feedback for source
+        :param problem_id: Id of problem
+        :param source: Source code
+        :param method: Patch method
+        :param candidates: Count of closest samples to choose the smallest patches from
+        :param timeout: Deadline in seconds, service default if not given
+        :return: Dict with closest sample and list of patches as dicts
+        """
+        return self.feedback_batch(problem_id, [source], method, candidates, timeout)[0]
+
+    def feedback_batch(self, problem_id: str, sources: list, method: Method = Method.DIFF, candidates: int = 1,
+                       timeout: float = None):
+        """
+        Computes feedback for several sources of one problem in parallel
+        :return: List of results, see `feedback`
+        :raises TimeoutError: Deadline passed. Queued computations are cancelled, running ones stop
+                              searching at the deadline, though patching already started is finished
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = time.time() + timeout if timeout is not None else None
+        futures = self.submit_batch(problem_id, sources, method, candidates, deadline)
+
+        _, not_done = wait(futures, timeout)
+        if not_done:
+            for future in not_done:
+                future.cancel()
+            raise TimeoutError('Deadline exceeded')
+
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.registry.clear()
+        with self._lock:
+            retired, self._retired = self._retired, {}
+        for corpus in retired.values():
+            corpus.close()
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError, wait
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from amorph.exceptions import OverloadedException, UnknownProblemException
+from amorph.models import Patch
+from amorph.server import FeedbackService, make_server
+from amorph.utils import apply_patches
+
+SAMPLES = ['a + b', '(a + b) * c', 'a + b * c']
+
+
+def attached_segments():
+    """Names of segments attached by worker and ones still mapped into its memory"""
+    from amorph.server import service
+
+    mapped = []
+    if os.path.exists('/proc/self/maps'):
+        with open('/proc/self/maps') as f:
+            mapped = sorted({line.split('/dev/shm/')[1].strip() for line in f if '/dev/shm/' in line})
+    return list(service._attached), mapped
+
+
+class TestService(unittest.TestCase):
+    def setUp(self):
+        self.service = FeedbackService(ThreadPoolExecutor(2), max_pending=4)
+        self.addCleanup(self.service.close)
+        self.service.load('sum', SAMPLES)
+
+    def test_feedback(self):
+        result = self.service.feedback('sum', 'a + b + c')
+
+        self.assertEqual(result['matched'], 'a + b * c')
+        self.assertEqual(len(result['patches']), 1)
+
+    def test_batch(self):
+        results = self.service.feedback_batch('sum', ['a + b + c', '(a + b) + c'])
+
+        self.assertEqual([result['matched'] for result in results], ['a + b * c', '(a + b) * c'])
+
+    def test_unknown_problem(self):
+        with self.assertRaises(UnknownProblemException):
+            self.service.feedback('product', 'a * b')
+
+        self.service.unload('sum')
+        with self.assertRaises(UnknownProblemException):
+            self.service.feedback('sum', 'a + b')
+
+    def test_back_pressure(self):
+        with self.assertRaises(OverloadedException):
+            self.service.feedback_batch('sum', ['a + b'] * 5)
+
+        # rejected batch releases all its slots
+        self.assertEqual(len(self.service.feedback_batch('sum', ['a + b'] * 4)), 4)
+
+    def test_deadline(self):
+        self.service.load('large', ['a + b + c + d'] * 200000)
+
+        with self.assertRaises(TimeoutError):
+            self.service.feedback('large', 'a + b + c', timeout=0.01)
+
+    def test_deadline_frees_workers(self):
+        self.service.load('large', ['a + b + c + d'] * 200000)
+
+        with self.assertRaises(TimeoutError):
+            self.service.feedback_batch('large', ['a + b + c'] * 2, timeout=0.01)
+
+        # search for several candidates is cut short as well, several times faster than the whole one
+        start = time.time()
+        futures = self.service.submit_batch('large', ['a + b + c'] * 2, candidates=2, deadline=start + 0.01)
+        wait(futures)
+        self.assertLess(time.time() - start, 0.3)
+
+        # running searches stop at the deadline instead of holding workers till they are done
+        futures = self.service.submit_batch('sum', ['a + b + c'] * 2)
+        results = [future.result(timeout=1) for future in futures]
+        self.assertEqual([result['matched'] for result in results], ['a + b * c'] * 2)
+
+    def test_eviction(self):
+        loaded = []
+
+        def loader(problem_id):
+            loaded.append(problem_id)
+            return SAMPLES
+        service = FeedbackService(ThreadPoolExecutor(2), loader=loader, budget=1)
+        self.addCleanup(service.close)
+
+        self.assertEqual(service.feedback('sum', 'a + b + c')['matched'], 'a + b * c')
+        service.feedback('product', 'a * b')
+        self.assertEqual(service.problems(), {'product': 3})
+
+        service.feedback('sum', 'a + b + c')
+        self.assertEqual(loaded, ['sum', 'product', 'sum'])
+
+    def test_eviction_while_computing(self):
+        service = FeedbackService(ThreadPoolExecutor(1), budget=1)
+        self.addCleanup(service.close)
+        service.load('large', ['a + b + c + d'] * 20000)
+
+        futures = service.submit_batch('large', ['a + b + c'] * 2)
+        service.load('sum', SAMPLES)
+
+        # evicted corpus stays available to submitted computations
+        self.assertEqual(service.problems(), {'sum': 3})
+        self.assertEqual([future.result()['matched'] for future in futures], ['a + b + c + d'] * 2)
+
+    def test_eviction_detaches_workers(self):
+        service = FeedbackService(ProcessPoolExecutor(1), budget=1)
+        self.addCleanup(service.close)
+        service.load('sum', SAMPLES)
+        service.feedback('sum', 'a + b + c')
+        evicted = service.registry.peek('sum').name
+        # forked worker may inherit attachments of other tests, so only these two are checked
+        self.assertIn(evicted, service.executor.submit(attached_segments).result()[0])
+
+        service.load('product', SAMPLES)
+        service.feedback('product', 'a * b')
+
+        kept = service.registry.peek('product').name
+        attached, mapped = service.executor.submit(attached_segments).result()
+        self.assertIn(kept, attached)
+        self.assertNotIn(evicted, attached)
+        self.assertNotIn(evicted, mapped)
+        self.assertFalse(os.path.exists(os.path.join('/dev/shm', evicted)))
+
+    def test_processes(self):
+        service = FeedbackService(ProcessPoolExecutor(2))
+        self.addCleanup(service.close)
+        service.load('sum', SAMPLES)
+
+        self.assertEqual(service.feedback('sum', 'a + b + c')['matched'], 'a + b * c')
+
+
+class TestHttp(unittest.TestCase):
+    def setUp(self):
+        self.service = FeedbackService(ThreadPoolExecutor(2))
+        self.server = make_server(self.service, port=0)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+
+        def shutdown():
+            self.server.shutdown()
+            self.server.server_close()
+            thread.join()
+            self.service.close()
+        self.addCleanup(shutdown)
+
+    def request(self, verb, path, body=None):
+        url = 'http://{}:{}{}'.format(*self.server.server_address[:2], path)
+        data = json.dumps(body).encode() if body is not None else None
+        try:
+            with urlopen(Request(url, data, method=verb)) as response:
+                return response.status, json.loads(response.read().decode())
+        except HTTPError as e:
+            return e.code, json.loads(e.read().decode())
+
+    def test_api(self):
+        self.assertEqual(self.request('PUT', '/problems/sum', {'samples': SAMPLES}), (200, {'samples': 3}))
+        self.assertEqual(self.request('GET', '/problems'), (200, {'problems': {'sum': 3}}))
+
+        source = 'a + b + c'
+        status, result = self.request('POST', '/problems/sum/feedback', {'source': source, 'method': 'diff'})
+        self.assertEqual(status, 200)
+        self.assertEqual(apply_patches(source, map(Patch.from_dict, result['patches'])), result['matched'])
+
+        status, result = self.request('POST', '/problems/sum/feedback/batch', {'sources': [source] * 3})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result['results']), 3)
+
+        self.assertEqual(self.request('DELETE', '/problems/sum')[0], 200)
+        self.assertEqual(self.request('POST', '/problems/sum/feedback', {'source': source})[0], 404)
+
+    def test_bad_request(self):
+        self.request('PUT', '/problems/sum', {'samples': SAMPLES})
+
+        self.assertEqual(self.request('POST', '/problems/sum/feedback', {'code': 'a'})[0], 400)
+        self.assertEqual(self.request('POST', '/problems/sum/feedback', {'source': 'a', 'method': 'x'})[0], 400)
+        for options in [{'candidates': 0}, {'candidates': -3}, {'candidates': 'x'}, {'timeout': 'x'},
+                        {'timeout': 0}, {'timeout': -1}]:
+            self.assertEqual(self.request('POST', '/problems/sum/feedback', dict(options, source='a'))[0], 400,
+                             options)
+        self.assertEqual(self.request('GET', '/unknown')[0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
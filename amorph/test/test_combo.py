@@ -0,0 +1,62 @@
+import inspect
+import unittest
+import textwrap
+
+from amorph import patch_with_closest, Method
+from amorph.combo import patch_size_bound
+from amorph.utils import apply_patches
+
+
+class TestCombo(unittest.TestCase):
+    source = textwrap.dedent('''
+             def f(a, b):
+                 s = 0
+                 for i in range(b):
+                     s += a
+                 return s
+             ''')
+    samples = [
+        # closest by chars but needs larger patch
+        textwrap.dedent('''
+        def f(a, b):
+            return s
+            for i in range(b):
+                s += a
+            s = 0
+        '''),
+        textwrap.dedent('''
+        def f(a, b):
+            s = 0
+            for i in range(b):
+                s += a
+            return s * 2
+        '''),
+    ]
+
+    def test_empty_samples(self):
+        self.assertEqual(list(patch_with_closest(self.source, [])), [])
+
+    def test_cheapest(self):
+        closest = list(patch_with_closest(self.source, self.samples))
+        cheapest = list(patch_with_closest(self.source, self.samples, candidates=2))
+
+        self.assertLess(sum(patch.size for patch in cheapest), sum(patch.size for patch in closest))
+        self.assertEqual(apply_patches(self.source, cheapest), self.samples[1])
+
+    def test_same_type(self):
+        for candidates in [1, 2]:
+            self.assertTrue(inspect.isgenerator(patch_with_closest(self.source, self.samples, candidates=candidates)))
+
+    def test_cheapest_tokens(self):
+        patches = list(patch_with_closest(self.source, self.samples, Method.TOKENS, candidates=2))
+
+        self.assertEqual(len(patches), 1)
+        self.assertEqual(patches[0].text, '* 2')
+
+    def test_patch_size_bound(self):
+        for sample in self.samples:
+            size = sum(patch.size for patch in patch_with_closest(self.source, [sample]))
+            self.assertLessEqual(patch_size_bound(self.source, sample), size)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = ['requests', 'schema', 'asttokens', 'numpy']
+
+
+def imported_modules(statement):
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        '{}\nimport sys\nprint("\\n".join(sys.modules))'.format(statement)
+    ])
+    return set(output.decode().split())
+
+
+class TestImports(unittest.TestCase):
+    def test_lazy_import(self):
+        modules = imported_modules('import amorph')
+
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_diff_method(self):
+        modules = imported_modules('from amorph import patch_with_sample, Method\n'
+                                   'list(patch_with_sample("a + b", "a * b", Method.DIFF))')
+
+        self.assertIn('amorph.diff', modules)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_tokens_method(self):
+        modules = imported_modules('from amorph import patch_with_sample, Method\n'
+                                   'list(patch_with_sample("a + b", "a * b", Method.TOKENS))')
+
+        self.assertIn('asttokens', modules)
+        self.assertNotIn('requests', modules)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,13 @@
 import token
 import tokenize
 from difflib import SequenceMatcher
+from timeit import default_timer as timer
 
 from asttokens import ASTTokens
 from asttokens.util import Token
 
 from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.tracing import get_tracer, TOKENIZATION_TIME, ALIGNMENT_TIME
 
 
 class ComparableToken(Token):
@@ -54,12 +56,24 @@ def not_junk(tok):
 
 
 def get_patches(source: str, target: str):
+    tracer = get_tracer()
+    start = timer() if tracer is not None else None
+
     src_tokens = get_tokens(source)
     src_len = len(src_tokens)
     tgt_tokens = get_tokens(target)
 
+    if tracer is not None:
+        tokenized = timer()
+        tracer.record(TOKENIZATION_TIME, tokenized - start)
+
     cruncher = SequenceMatcher(None, src_tokens, tgt_tokens)
-    for type, start1, end1, start2, end2 in cruncher.get_opcodes():
+    opcodes = cruncher.get_opcodes()
+
+    if tracer is not None:
+        tracer.record(ALIGNMENT_TIME, timer() - tokenized)
+
+    for type, start1, end1, start2, end2 in opcodes:
         if type == 'equal':
             continue
 
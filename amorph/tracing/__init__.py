@@ -0,0 +1,3 @@
+from .tracer import Tracer, CallbackTracer, CollectingTracer, get_tracer, tracing
+from .events import (SEARCH_TIME, SAMPLES_SCORED, SAMPLES_PRUNED, CLOSEST_SCORE, TOKENIZATION_TIME,
+                     ALIGNMENT_TIME, REPLACE_BLOCKS, PAIRWISE_RATIOS, HTTP_TIME)
@@ -0,0 +1,28 @@
+"""Names of events reported to tracer"""
+
+"""Time in seconds spent in `find_closest`"""
+SEARCH_TIME = 'search_time'
+
+"""Count of samples metric was computed for"""
+SAMPLES_SCORED = 'samples_scored'
+
+"""Count of samples skipped or abandoned during search"""
+SAMPLES_PRUNED = 'samples_pruned'
+
+"""Metric value of the closest sample found"""
+CLOSEST_SCORE = 'closest_score'
+
+"""Time in seconds spent on splitting code into tokens"""
+TOKENIZATION_TIME = 'tokenization_time'
+
+"""Time in seconds spent on aligning sequences of lines or tokens"""
+ALIGNMENT_TIME = 'alignment_time'
+
+"""Count of replaced line blocks processed by `DiffPatcher`, including blocks split by matched lines"""
+REPLACE_BLOCKS = 'replace_blocks'
+
+"""Count of line pairs compared by `DiffPatcher` while matching replaced blocks"""
+PAIRWISE_RATIOS = 'pairwise_ratios'
+
+"""Time in seconds spent on requests to AST diff server"""
+HTTP_TIME = 'http_time'
@@ -0,0 +1,58 @@
+import unittest
+import textwrap
+
+from amorph import patch_with_closest, Method
+from amorph.tracing import (CallbackTracer, CollectingTracer, get_tracer, tracing, SEARCH_TIME, SAMPLES_SCORED,
+                            SAMPLES_PRUNED, CLOSEST_SCORE, TOKENIZATION_TIME, ALIGNMENT_TIME, REPLACE_BLOCKS,
+                            PAIRWISE_RATIOS)
+
+
+class TestTracer(unittest.TestCase):
+    source = textwrap.dedent('''
+             def f(a, b):
+                 for i in range(b):
+                     print(a)
+                 return a + b
+             ''')
+    samples = [
+        'print(input())',
+        textwrap.dedent('''
+        def f(a, b):
+            for j in range(b):
+                print(a, b)
+            return a * b
+        ''')
+    ]
+
+    def test_disabled(self):
+        self.assertIsNone(get_tracer())
+
+    def test_context(self):
+        tracer = CollectingTracer()
+        with tracing(tracer):
+            self.assertIs(get_tracer(), tracer)
+        self.assertIsNone(get_tracer())
+
+    def test_diff(self):
+        tracer = CollectingTracer()
+        with tracing(tracer):
+            list(patch_with_closest(self.source, self.samples, Method.DIFF))
+
+        self.assertEqual(tracer[SAMPLES_SCORED], 2)
+        self.assertEqual(tracer[SAMPLES_PRUNED], 0)
+        self.assertGreater(tracer[CLOSEST_SCORE], 0)
+        self.assertGreater(tracer[SEARCH_TIME], 0)
+        self.assertGreater(tracer[ALIGNMENT_TIME], 0)
+        self.assertEqual(tracer[REPLACE_BLOCKS], 3)
+        self.assertEqual(tracer[PAIRWISE_RATIOS], 14)
+
+    def test_tokens(self):
+        events = []
+        with tracing(CallbackTracer(lambda event, value: events.append(event))):
+            list(patch_with_closest(self.source, self.samples, Method.TOKENS))
+
+        self.assertIn(TOKENIZATION_TIME, events)
+        self.assertIn(ALIGNMENT_TIME, events)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import abc
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current_tracer = ContextVar('amorph_tracer', default=None)
+
+
+class Tracer(abc.ABC):
+    """Receives events reported while searching samples and computing patches"""
+
+    @abc.abstractmethod
+    def record(self, event: str, value):
+        """
+        Handles reported event
+        :param event: Name of event, see `amorph.tracing.events`
+        :param value: Measured value
+        """
+        pass
+
+
+class CallbackTracer(Tracer):
+    """Passes every event to given function"""
+
+    def __init__(self, callback):
+        """
+        :param callback: Two arguments function accepting event name and value
+        """
+        self.callback = callback
+
+    def record(self, event, value):
+        self.callback(event, value)
+
+
+class CollectingTracer(Tracer):
+    """Sums up values of events"""
+
+    def __init__(self):
+        self.values = defaultdict(int)
+
+    def record(self, event, value):
+        self.values[event] += value
+
+    def __getitem__(self, event):
+        return self.values[event]
+
+
+def get_tracer():
+    """
+    Returns tracer of current context
+    :return: Tracer or None if tracing is disabled
+    """
+    return _current_tracer.get()
+
+
+@contextmanager
+def tracing(tracer: Tracer):
+    """
+    Enables tracing of amorph calls made inside the context. Patches are computed lazily,
+    so they should be consumed inside the context as well
+    :param tracer: Tracer to report events to
+    """
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
@@ -1,2 +1,4 @@
-from .search import find_closest
+from .search import find_closest, find_top
 from .generators import empty_generator
+from .apply import apply_patches
+from .cluster import ClusterIndex
@@ -0,0 +1,53 @@
+from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.exceptions import InvalidPatchException, PatchVerificationException
+
+
+def patch_bounds(patch):
+    """
+    Returns range of source replaced by patch and text it is replaced with
+    :param patch: Patch to get bounds of
+    :return: Tuple in format (start, stop, text) where range is [start, stop)
+    """
+    if isinstance(patch, InsertPatch):
+        return patch.pos, patch.pos, patch.text
+    elif isinstance(patch, DeletePatch):
+        return patch.start, patch.stop, ''
+    elif isinstance(patch, ReplacePatch):
+        return patch.start, patch.stop, patch.text
+
+    raise InvalidPatchException('Unknown patch {!r}'.format(patch))
+
+
+def _order(bounds):
+    start, stop, _ = bounds
+    # insertion at position goes before any change starting there
+    return start, start != stop
+
+
+def apply_patches(source: str, patches, sample: str = None):
+    """
+    Applies patches to the source in a single pass
+    :param source: Source code patches were computed for
+    :param patches: Iterable of patches with positions relative to the original source
+    :param sample: Expected result. If given, patched code is verified to be equal to it
+    :return: Patched source code
+    """
+    bounds = sorted(map(patch_bounds, patches), key=_order)
+
+    pieces = []
+    cursor = 0
+    for start, stop, text in bounds:
+        if start < cursor or stop < start or stop > len(source):
+            raise InvalidPatchException('Patch [{}, {}) overlaps or is out of source range'.format(start, stop))
+
+        pieces.append(source[cursor:start])
+        pieces.append(text)
+        cursor = stop
+    pieces.append(source[cursor:])
+
+    result = ''.join(pieces)
+
+    if sample is not None and result != sample:
+        raise PatchVerificationException('Patched source differs from sample')
+
+    return result
@@ -0,0 +1,192 @@
+import json
+import math
+import random
+from heapq import nlargest
+
+from ..exceptions import InvalidArgumentException
+from ..metrics import string_similarity, prepare_metric
+from .search import find_closest
+
+
+class ClusterIndex(object):
+    """
+    Two-level search index. Samples are grouped around medoids, representative samples
+    of clusters. Query is compared with medoids only and then with every sample
+    of a few closest clusters, so about `2 * sqrt(n)` samples are compared instead of `n`
+    """
+
+    def __init__(self, samples, metric=string_similarity, key=None, probes: int = 1):
+        """
+        Creates index without clusters, see `build` and `load`
+        :param samples: Iterable of samples
+        :param metric: Two string arguments function measuring similarity between two codes
+        :param key: Single argument function to get value for metric computing
+        :param probes: Default count of closest clusters searched in, more probes give better recall
+        """
+        self.samples = list(samples)
+        self.metric = metric
+        self.key = key
+        self.probes = probes
+
+        # indices of medoid samples and cluster of every sample
+        self.medoids = []
+        self.assignments = []
+        self._members = []
+
+    @classmethod
+    def build(cls, samples, metric=string_similarity, key=None, clusters: int = None, probes: int = 1,
+              iterations: int = 1, seed: int = 0):
+        """
+        Clusters samples around medoids. Takes `O(clusters * n)` comparisons per iteration
+        :param samples: Iterable of samples
+        :param metric: Two string arguments function measuring similarity between two codes
+        :param key: Single argument function to get value for metric computing
+        :param clusters: Count of clusters, square root of count of samples by default
+        :param probes: Default count of closest clusters searched in
+        :param iterations: Count of medoid refinements after initial clustering
+        :param seed: Seed of random choices
+        :return: Index
+        """
+        index = cls(samples, metric, key, probes)
+        if not index.samples:
+            return index
+
+        rng = random.Random(seed)
+        count = len(index.samples)
+        clusters = min(count, clusters or max(1, int(math.sqrt(count))))
+        index._seed_medoids(rng, clusters)
+        for _ in range(iterations):
+            index._refine_medoids(rng)
+        return index
+
+    def _similarities(self, medoid):
+        compare = prepare_metric(self.metric, self.samples[medoid], self.key)
+        return [compare(sample) for sample in self.samples]
+
+    def _seed_medoids(self, rng, clusters):
+        """Chooses distant samples as medoids like k-means++ and assigns samples to them"""
+        count = len(self.samples)
+        best = [None] * count
+        self.assignments = [0] * count
+
+        medoids = [rng.randrange(count)]
+        while True:
+            cluster, medoid = len(medoids) - 1, medoids[-1]
+            for idx, similarity in enumerate(self._similarities(medoid)):
+                if best[idx] is None or similarity > best[idx]:
+                    best[idx], self.assignments[idx] = similarity, cluster
+
+            if len(medoids) == clusters:
+                break
+            # samples far from chosen medoids are likely to become next ones
+            chosen = set(medoids)
+            weights = [0.0 if idx in chosen else max(1.0 - similarity, 0.0) + 1e-9
+                       for idx, similarity in enumerate(best)]
+            medoids.append(rng.choices(range(count), weights)[0])
+        self.medoids = medoids
+        self._group()
+
+    def _assign(self, medoids):
+        """Assigns every sample to the most similar medoid"""
+        best = [None] * len(self.samples)
+        for cluster, medoid in enumerate(medoids):
+            for idx, similarity in enumerate(self._similarities(medoid)):
+                if best[idx] is None or similarity > best[idx]:
+                    best[idx], self.assignments[idx] = similarity, cluster
+        self.medoids = medoids
+        self._group()
+
+    def _refine_medoids(self, rng, candidates: int = 16, references: int = 64):
+        """Replaces every medoid with member most similar to others and reassigns samples"""
+        groups = [[] for _ in self.medoids]
+        for idx, cluster in enumerate(self.assignments):
+            groups[cluster].append(idx)
+
+        medoids = []
+        for indices in groups:
+            shortlist = rng.sample(indices, min(candidates, len(indices)))
+            sample = rng.sample(indices, min(references, len(indices)))
+
+            def centrality(idx):
+                compare = prepare_metric(self.metric, self.samples[idx], self.key)
+                return sum(compare(self.samples[other]) for other in sample)
+            medoids.append(max(shortlist, key=centrality))
+        self._assign(medoids)
+
+    def _group(self):
+        # medoid is always a member of its cluster, so no cluster is empty
+        for cluster, medoid in enumerate(self.medoids):
+            self.assignments[medoid] = cluster
+        self._members = [[] for _ in self.medoids]
+        for idx, cluster in enumerate(self.assignments):
+            self._members[cluster].append(self.samples[idx])
+
+    def _closest_clusters(self, source, probes):
+        compare = prepare_metric(self.metric, source, self.key)
+        scores = ((compare(self.samples[medoid]), -cluster) for cluster, medoid in enumerate(self.medoids))
+        return [-cluster for _, cluster in nlargest(probes, scores)]
+
+    def add(self, sample):
+        """
+        Assigns new sample to cluster of the closest medoid
+        :param sample: Sample
+        """
+        self.samples.append(sample)
+        if not self.medoids:
+            # the first sample starts its own cluster
+            self.medoids.append(len(self.samples) - 1)
+            self._members.append([])
+            cluster = 0
+        else:
+            cluster, = self._closest_clusters(sample, 1)
+        self.assignments.append(cluster)
+        self._members[cluster].append(sample)
+
+    def find_closest(self, source, probes: int = None, timeout=None):
+        """
+        Finds closest code to the source among samples of the closest clusters
+        :param source: Source code
+        :param probes: Count of clusters to search in, default of index if not given
+        :param timeout: Max time in seconds to search in clusters
+        :return: Closest to source sample
+        """
+        probes = self.probes if probes is None else probes
+        if probes < 1:
+            raise InvalidArgumentException('Count of probes must be positive, {} given'.format(probes))
+
+        clusters = self._closest_clusters(source, probes)
+        candidates = [sample for cluster in clusters for sample in self._members[cluster]]
+        return find_closest(source, candidates, self.metric, self.key, timeout)
+
+    def cluster_sizes(self):
+        return [len(members) for members in self._members]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def save(self, path: str):
+        """
+        Saves clusters to JSON file, samples are not saved
+        :param path: Path to file
+        """
+        with open(path, 'w') as f:
+            json.dump({'medoids': self.medoids, 'assignments': self.assignments}, f)
+
+    @classmethod
+    def load(cls, path: str, samples, metric=string_similarity, key=None, probes: int = 1):
+        """
+        Loads clusters saved by `save`
+        :param path: Path to file
+        :param samples: Iterable of the same samples in the same order as in saved index
+        :return: Index
+        """
+        with open(path) as f:
+            raw = json.load(f)
+
+        index = cls(samples, metric, key, probes)
+        if len(raw['assignments']) != len(index.samples):
+            raise InvalidArgumentException('Index was saved for {} samples, {} given'.format(
+                len(raw['assignments']), len(index.samples)))
+        index.medoids, index.assignments = raw['medoids'], raw['assignments']
+        index._group()
+        return index
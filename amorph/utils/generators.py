@@ -1,5 +1,5 @@
 
 
 def empty_generator():
-    raise StopIteration
+    return
     yield
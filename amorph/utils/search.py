@@ -1,6 +1,8 @@
 import time
+from heapq import nlargest
 
-from ..metrics import string_similarity
+from ..metrics import string_similarity, prepare_metric
+from ..tracing import get_tracer, SEARCH_TIME, SAMPLES_SCORED, SAMPLES_PRUNED, CLOSEST_SCORE
 
 
 def find_closest(source, samples: list, metric=string_similarity, key=None, timeout=None):
@@ -8,21 +10,68 @@ def find_closest(source, samples: list, metric=string_similarity, key=None, time
     Finds closest code to the source by finding minimum of metric
     :param source: Source code
     :param samples: Iterable of samples to search in
-    :param metric: Two string arguments function measuring similarity between two codes
+    :param metric: Two string arguments function measuring similarity between two codes. \
+                   Source is analyzed once if metric supports preparation, see `prepared_metric`. \
+                   Samples are abandoned early if metric is bounded, see `bounded_metric`
     :param key: Single argument function to get value for metric computing
     :param timeout: Max time in seconds to find closest code
     :return: Closest to source sample
     """
+    tracer = get_tracer()
+
     max_metric = None
     closest_sample = None
-    start_time = time.time() if timeout is not None else None
+    scored, abandoned = 0, 0
+    start_time = time.time() if timeout is not None or tracer is not None else None
+    compare = prepare_metric(metric, source, key)
+    bounded = getattr(metric, 'bounded', False)
     for sample in samples:
-        current_metric = metric(source, sample, key)
-        if max_metric is None or current_metric > max_metric:
+        current_metric = compare(sample, max_metric) if bounded else compare(sample)
+        scored += 1
+        if current_metric is None:
+            abandoned += 1
+        elif max_metric is None or current_metric > max_metric:
             max_metric = current_metric
             closest_sample = sample
 
         if timeout is not None and time.time() - start_time >= timeout:
             break
 
+    if tracer is not None:
+        tracer.record(SEARCH_TIME, time.time() - start_time)
+        tracer.record(SAMPLES_SCORED, scored - abandoned)
+        # samples left unscored because of timeout are pruned as well
+        skipped = len(samples) - scored if hasattr(samples, '__len__') else 0
+        tracer.record(SAMPLES_PRUNED, abandoned + skipped)
+        if max_metric is not None:
+            tracer.record(CLOSEST_SCORE, max_metric)
+
     return closest_sample
+
+
+def _within(samples, timeout):
+    """Yields samples till timeout is over, as in `find_closest` at least one sample is yielded"""
+    start_time = time.time()
+    for sample in samples:
+        yield sample
+        if time.time() - start_time >= timeout:
+            return
+
+
+def find_top(source, samples: list, count: int, metric=string_similarity, key=None, timeout=None):
+    """
+    Finds several closest codes to the source
+    :param source: Source code
+    :param samples: Iterable of samples to search in
+    :param count: Max count of samples to find
+    :param metric: Two string arguments function measuring similarity between two codes
+    :param key: Single argument function to get value for metric computing
+    :param timeout: Max time in seconds to find closest codes, they are chosen among samples scored till then
+    :return: List of closest samples ordered from the closest one
+    """
+    compare = prepare_metric(metric, source, key)
+    if timeout is not None:
+        samples = _within(samples, timeout)
+    scored = ((compare(sample), -idx, sample) for idx, sample in enumerate(samples))
+    # earlier sample wins among equally close ones, as in `find_closest`
+    return [sample for _, _, sample in nlargest(count, scored, key=lambda item: item[:2])]
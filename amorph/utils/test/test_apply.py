@@ -0,0 +1,58 @@
+import unittest
+import textwrap
+
+from amorph.diff import get_patches
+from amorph.exceptions import InvalidPatchException, PatchVerificationException
+from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.utils import apply_patches
+
+
+class TestApply(unittest.TestCase):
+    def test_apply(self):
+        source = 'a + b'
+        patches = [ReplacePatch(2, 3, '*'), InsertPatch(0, '('), InsertPatch(5, ') * c')]
+        result = apply_patches(source, patches)
+
+        self.assertEqual(result, '(a * b) * c')
+
+    def test_apply_insert_before_delete(self):
+        source = 'abc'
+        patches = [DeletePatch(1, 2), InsertPatch(1, 'x')]
+        result = apply_patches(source, patches)
+
+        self.assertEqual(result, 'axc')
+
+    def test_apply_diff(self):
+        source = textwrap.dedent('''
+                 def f(a, b):
+                     for i in range(b):
+                         print(a)
+                     return a + b
+                 ''')
+        sample = textwrap.dedent('''
+                 def f(a, c):
+                     f = open('output.txt', 'r')
+                     f.write(a * c)
+                     return a + c
+                 ''')
+        result = apply_patches(source, get_patches(source, sample), sample)
+
+        self.assertEqual(result, sample)
+
+    def test_overlapping(self):
+        source = 'a + b'
+        patches = [DeletePatch(0, 3), ReplacePatch(2, 4, '-')]
+
+        with self.assertRaises(InvalidPatchException):
+            apply_patches(source, patches)
+
+    def test_out_of_range(self):
+        with self.assertRaises(InvalidPatchException):
+            apply_patches('a + b', [DeletePatch(3, 10)])
+
+    def test_verify(self):
+        with self.assertRaises(PatchVerificationException):
+            apply_patches('a + b', [ReplacePatch(2, 3, '-')], 'a * b')
+
+if __name__ == '__main__':
+    unittest.main()
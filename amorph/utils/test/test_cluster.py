@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+import unittest
+
+from amorph.exceptions import InvalidArgumentException
+from amorph.metrics import edit_similarity, string_similarity
+from amorph.utils import ClusterIndex, find_closest
+
+FAMILIES = [
+    'a, b = map(int, input().split())\nprint(a + b)\n',
+    'n = int(input())\nfor i in range(n):\n    print(i * i)\n',
+    'def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n',
+    'words = input().split()\nprint(" ".join(reversed(words)))\n',
+]
+
+
+def variants(count, seed=0):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        code = list(rng.choice(FAMILIES))
+        for _ in range(3):
+            code.insert(rng.randrange(len(code)), rng.choice('xyz '))
+        result.append(''.join(code))
+    return result
+
+
+def score(query, sample, metric=string_similarity):
+    return metric(query, sample)
+
+
+class TestCluster(unittest.TestCase):
+    def setUp(self):
+        self.samples = variants(100)
+        self.index = ClusterIndex.build(self.samples)
+
+    def test_clusters(self):
+        self.assertEqual(len(self.index.medoids), 10)
+        self.assertEqual(sum(self.index.cluster_sizes()), 100)
+        self.assertTrue(all(self.index.cluster_sizes()))
+
+    def test_search(self):
+        queries = variants(30, seed=1)
+
+        # all clusters searched give exhaustive search, equally close samples may differ
+        for query in queries:
+            self.assertEqual(score(query, self.index.find_closest(query, probes=10)),
+                             score(query, find_closest(query, self.samples)))
+
+        found = sum(score(query, self.index.find_closest(query, probes=3)) ==
+                    score(query, find_closest(query, self.samples)) for query in queries)
+        self.assertGreaterEqual(found, 25)
+
+    def test_wrong_probes(self):
+        with self.assertRaises(InvalidArgumentException):
+            self.index.find_closest(self.samples[0], probes=0)
+
+    def test_other_metric(self):
+        index = ClusterIndex.build(self.samples, metric=edit_similarity, clusters=4, probes=4)
+        query = variants(1, seed=2)[0]
+
+        self.assertEqual(score(query, index.find_closest(query), edit_similarity),
+                         score(query, find_closest(query, self.samples, edit_similarity), edit_similarity))
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.json')
+            self.index.save(path)
+            loaded = ClusterIndex.load(path, self.samples)
+
+            self.assertEqual(loaded.medoids, self.index.medoids)
+            self.assertEqual(loaded.cluster_sizes(), self.index.cluster_sizes())
+            with self.assertRaises(InvalidArgumentException):
+                ClusterIndex.load(path, self.samples[1:])
+
+    def test_add(self):
+        index = ClusterIndex([])
+        for sample in self.samples[:10]:
+            index.add(sample)
+        self.assertEqual(index.cluster_sizes(), [10])
+
+        sample = variants(1, seed=3)[0]
+        self.index.add(sample)
+        self.assertEqual(len(self.index), 101)
+        self.assertEqual(score(sample, self.index.find_closest(sample)), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
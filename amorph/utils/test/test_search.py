@@ -3,7 +3,7 @@ import unittest
 import time
 
 from amorph.metrics import string_similarity
-from amorph.utils import find_closest
+from amorph.utils import find_closest, find_top
 
 
 class TestSearch(unittest.TestCase):
@@ -25,6 +25,17 @@ class TestSearch(unittest.TestCase):
         real_time = time.time() - start_time
         self.assertAlmostEqual(real_time, timeout, delta=timeout * 0.1)
 
+    def test_find_top_timeout(self):
+        source = 'a + b + c'
+        samples = ['a + b + c + d + e + f'] * 50000
+        samples.append('a + b * c')
+
+        start_time = time.time()
+        top = find_top(source, samples, 2, string_similarity, timeout=0.05)
+        # samples left unscored are not chosen
+        self.assertLess(time.time() - start_time, 0.25)
+        self.assertEqual(top, samples[:2])
+
 
 if __name__ == '__main__':
     unittest.main()
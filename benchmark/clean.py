@@ -1,7 +1,11 @@
 from argparse import ArgumentParser
-from benchmark.validators import existing_dir
+from benchmark.validators import existing_dir, positive_int
+from hashlib import blake2b
+from multiprocessing import Pool
+from os import cpu_count
 from os.path import join, split
 from glob import glob
+from timeit import default_timer as timer
 import pandas as pd
 import ast
 import logging as log
@@ -9,13 +13,60 @@ import logging as log
 log.basicConfig(level=log.INFO)
 
 
-def runnable(row):
+def runnable(code):
     try:
-        ast.parse(row['code'])
+        ast.parse(code)
         return True
     except Exception:
         return False
 
+
+def code_hash(code):
+    return blake2b(str(code).encode(), digest_size=16).digest()
+
+
+def clean_file(file_path, result_path, pool, chunksize, keep_duplicates=False):
+    """
+    Filters out unparsable submissions chunk by chunk. Each unique code is parsed once
+    :param file_path: Path to CSV dump of submissions
+    :param result_path: Path to save cleaned dump in
+    :param pool: Pool of workers to parse codes on
+    :param chunksize: Number of rows processed at once
+    :param keep_duplicates: Whether to keep repeated submissions in result, \
+                            the same code with another status isn't a repeated one
+    :return: Tuple in format (count of rows read, count of rows written, count of unique codes)
+    """
+    # validity of every code seen so far by its hash
+    valid = {}
+    written = set()
+    total, kept = 0, 0
+
+    with open(result_path, 'w') as f:
+        for chunk in pd.read_csv(file_path, usecols=['status', 'code'], chunksize=chunksize):
+            hashes = [code_hash(code) for code in chunk.code]
+
+            unseen = {}
+            for h, code in zip(hashes, chunk.code):
+                if h not in valid and h not in unseen:
+                    unseen[h] = code
+            parsed = pool.map(runnable, unseen.values())
+            valid.update(zip(unseen.keys(), parsed))
+
+            mask = []
+            for h, status in zip(hashes, chunk.status):
+                keep = valid[h] and (keep_duplicates or (status, h) not in written)
+                if keep:
+                    written.add((status, h))
+                mask.append(keep)
+
+            cleaned = chunk[mask]
+            cleaned.to_csv(f, header=(total == 0))
+
+            total += chunk.shape[0]
+            kept += cleaned.shape[0]
+
+    return total, kept, len(valid)
+
 if __name__ == '__main__':
     parser = ArgumentParser()
     parser.add_argument('source',
@@ -24,17 +75,28 @@ if __name__ == '__main__':
     parser.add_argument('result',
                         help='Directory to store results',
                         type=existing_dir)
+    parser.add_argument('--chunksize',
+                        help='Number of rows processed at once',
+                        type=positive_int,
+                        default=10000)
+    parser.add_argument('--workers',
+                        help='Number of worker processes',
+                        type=positive_int,
+                        default=cpu_count())
+    parser.add_argument('--keep-duplicates',
+                        help='Keep repeated submissions of the same status in results',
+                        action='store_true')
     args = parser.parse_args()
 
     mask = join(args.source, '*.csv')
-    for file_path in glob(mask):
-        _, filename = split(file_path)
-
-        df = pd.read_csv(file_path).loc[:, ['status', 'code']]
-        valid = df.apply(runnable, axis=1)
-        cleaned = df[valid]
+    with Pool(args.workers) as pool:
+        for file_path in glob(mask):
+            _, filename = split(file_path)
 
-        log.info('file "{}"... filtered {} item(s)'.format(filename,
-                                                           df.shape[0]-cleaned.shape[0]))
+            start = timer()
+            total, kept, unique = clean_file(file_path, join(args.result, filename), pool,
+                                             args.chunksize, args.keep_duplicates)
+            elapsed = timer() - start
 
-        cleaned.to_csv(join(args.result, filename))
+            log.info('file "{}"... filtered {} item(s), {} unique code(s), {:.0f} rows/sec'.format(
+                filename, total - kept, unique, total / elapsed if elapsed else 0))
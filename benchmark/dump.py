@@ -1,46 +1,168 @@
 import json
+import os
 from argparse import ArgumentParser
+from itertools import islice
+from multiprocessing import Pool
 from operator import methodcaller
 
 import pandas as pd
 from tqdm import tqdm
 
 from amorph import patch_with_sample, Method
+from amorph.corpus import CsvSource, SharedCorpus
 from amorph.utils import find_closest
 from benchmark.utils import cut_data
-from benchmark.validators import csv_file, existing_place, method, positive_int
+from benchmark.validators import corpus_source, existing_file, existing_place, method, positive_int
+
+# correct samples of the worker process, loaded once by `init_worker`
+worker_correct = None
+
+
+def init_worker(correct):
+    """
+    :param correct: Source of correct samples or name of shared corpus
+    """
+    global worker_correct
+    worker_correct = SharedCorpus.attach(correct) if isinstance(correct, str) else correct
+
+
+def dump_one(source, correct, method, format):
+    matched = find_closest(source, correct)
+    patches = patch_with_sample(source, matched, method)
+
+    patches_data = None
+    if format == 'csv':
+        patches_data = '\n'.join(map(str, patches))
+    elif format == 'json':
+        patches_data = list(map(methodcaller('to_dict'), patches))
+
+    return {
+        'code': source,
+        'matched': matched,
+        'feedback': patches_data
+    }
+
+
+def dump_in_worker(task):
+    source, method, format = task
+    return dump_one(source, worker_correct, method, format)
+
+
+def read_checkpoint(path):
+    """
+    Reads checkpoint of streaming dump
+    :param path: Path to checkpoint file
+    :return: Tuple in format (count of dumped submissions, size of dump in bytes)
+    """
+    if not os.path.exists(path):
+        return 0, 0
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return checkpoint['done'], checkpoint['offset']
+
+
+def write_checkpoint(path, done, offset):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'done': done, 'offset': offset}, f)
+    os.replace(tmp_path, path)
+
+
+def write_records(f, records, start, format):
+    if format == 'csv':
+        df = pd.DataFrame(records, index=range(start, start + len(records)))
+        df.to_csv(f, header=(start == 0))
+    elif format == 'json':
+        for record in records:
+            f.write(json.dumps(record))
+            f.write('\n')
+
+
+def dump_stream(data_path, save_path, method, limit, format, chunksize, workers, resume,
+                correct=None, lazy=False):
+    """
+    Dumps patches chunk by chunk, appending results to disk as they are computed.
+    Progress is saved to `<save_path>.checkpoint` after every chunk so an interrupted
+    dump can be resumed. JSON dump is written in JSON Lines format
+    :param correct: Source of correct samples, correct submissions of data file by default
+    :param lazy: Whether to read correct samples from source on every search instead of loading them
+                 into memory shared by workers
+    """
+    checkpoint_path = save_path + '.checkpoint'
+    done, offset = read_checkpoint(checkpoint_path) if resume else (0, 0)
+
+    if correct is None:
+        correct = CsvSource(data_path, where={'status': 'correct'})
+    wrong = islice(CsvSource(data_path, where={'status': 'wrong'}), done, limit)
+
+    shared = None
+    if not lazy:
+        shared = SharedCorpus.create(correct)
+        correct = shared.name
+
+    try:
+        with open(save_path, 'a' if resume else 'w') as f, \
+                Pool(workers, initializer=init_worker, initargs=(correct,)) as pool, \
+                tqdm(total=limit, initial=done) as progress:
+            # drop records written after the last checkpoint
+            f.truncate(offset)
+            f.seek(offset)
+
+            while True:
+                chunk = list(islice(wrong, chunksize))
+                if not chunk:
+                    break
+
+                tasks = [(source, method, format) for source in chunk]
+                records = pool.map(dump_in_worker, tasks)
+
+                write_records(f, records, done, format)
+                f.flush()
+
+                done += len(records)
+                write_checkpoint(checkpoint_path, done, f.tell())
+                progress.update(len(records))
+    finally:
+        if shared is not None:
+            shared.close()
+
 
 if __name__ == '__main__':
     parser = ArgumentParser()
-    parser.add_argument('data', help='Path to CSV data file', type=csv_file)
+    parser.add_argument('data', help='Path to CSV data file', type=existing_file)
     parser.add_argument('save', help='Path to save dump in', type=existing_place)
     parser.add_argument('--method', help='Method for patching', type=method, default=Method.DIFF)
     parser.add_argument('--limit', help='Number of samples to process', type=positive_int, default=10)
     parser.add_argument('--format', help='Dump format', type=str, choices=['csv', 'json'], default='csv')
+    parser.add_argument('--stream', help='Process data in chunks on a pool of workers', action='store_true')
+    parser.add_argument('--chunksize', help='Number of rows per chunk in stream mode', type=positive_int,
+                        default=1000)
+    parser.add_argument('--workers', help='Number of worker processes in stream mode', type=positive_int,
+                        default=os.cpu_count())
+    parser.add_argument('--resume', help='Resume interrupted stream mode dump from checkpoint',
+                        action='store_true')
+    parser.add_argument('--correct', help='Path to CSV, JSON Lines file or directory of correct samples '
+                                          'used in stream mode instead of correct submissions of data file',
+                        type=corpus_source)
+    parser.add_argument('--lazy-corpus', help='Read correct samples from disk on every search in stream mode',
+                        action='store_true')
     args = parser.parse_args()
 
-    correct = cut_data(args.data, status='correct')
-    wrong = cut_data(args.data, status='wrong', limit=args.limit)
+    if args.stream:
+        dump_stream(args.data, args.save, args.method, args.limit, args.format,
+                    args.chunksize, args.workers, args.resume, args.correct, args.lazy_corpus)
+    else:
+        data = pd.read_csv(args.data)
+        correct = cut_data(data, status='correct')
+        wrong = cut_data(data, status='wrong', limit=args.limit)
 
-    result = []
-    for source in tqdm(wrong):
-        matched = find_closest(source, correct)
-        patches = patch_with_sample(source, matched, args.method)
+        result = []
+        for source in tqdm(wrong):
+            result.append(dump_one(source, correct, args.method, args.format))
 
-        patches_data = None
         if args.format == 'csv':
-            patches_data = '\n'.join(map(str, patches))
+            pd.DataFrame(result).to_csv(args.save)
         elif args.format == 'json':
-            patches_data = list(map(methodcaller('to_dict'), patches))
-
-        result.append({
-            'code': source,
-            'matched': matched,
-            'feedback': patches_data
-        })
-
-    if args.format == 'csv':
-        pd.DataFrame(result).to_csv(args.save)
-    elif args.format == 'json':
-        with open(args.save, 'w') as f:
-            f.write(json.dumps(result))
+            with open(args.save, 'w') as f:
+                f.write(json.dumps(result))
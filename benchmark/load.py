@@ -0,0 +1,348 @@
+import asyncio
+import json
+import logging as log
+import os
+import random
+import socket
+import threading
+import time
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Process, Value
+from timeit import default_timer as timer
+from urllib.parse import urlparse
+
+import numpy as np
+
+from amorph import patch_with_closest, Method
+from amorph.aio import AsyncPatcher
+from amorph.ast.standin import StandInServer
+from amorph.profile import load_submissions
+from amorph.server import FeedbackService
+from benchmark.synth import synthetic_workload
+from benchmark.validators import existing_file, existing_place, method, positive_int
+
+log.basicConfig(level=log.INFO)
+
+PERCENTILES = [50, 95, 99, 99.9]
+APIS = ['sync', 'async', 'service']
+
+
+def _serve_stand_in(port, delay, jitter, error_rate):
+    StandInServer(port=port, delay=delay, jitter=jitter, error_rate=error_rate).serve_forever()
+
+
+def start_stand_in(delay: float = 0, jitter: float = 0, error_rate: float = 0):
+    """
+    Starts stand-in of AST API server in separate process, so its CPU time isn't counted as client's.
+    Server listens on port of default endpoint, so every entry point uses it
+    :param delay: Delay of every response in seconds
+    :param jitter: Max extra random delay in seconds
+    :param error_rate: Share of requests answered with HTTP 500
+    :return: Process of server
+    """
+    from amorph.ast.patch import DEFAULT_ENDPOINT
+
+    port = urlparse(DEFAULT_ENDPOINT).port
+    process = Process(target=_serve_stand_in, args=(port, delay, jitter, error_rate), daemon=True)
+    process.start()
+    # wait for server to accept connections
+    for _ in range(100):
+        try:
+            socket.create_connection(('localhost', port)).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError('Stand-in server has not started')
+
+
+def _cpu_time():
+    times = os.times()
+    return times.user + times.system
+
+
+# CPU time spent on calls by workers of pool, see `CountingPool`
+_worker_cpu = None
+
+
+def _init_worker(cpu):
+    global _worker_cpu
+    _worker_cpu = cpu
+
+
+def _counted(function, *args):
+    start = _cpu_time()
+    try:
+        return function(*args)
+    finally:
+        with _worker_cpu.get_lock():
+            _worker_cpu.value += _cpu_time() - start
+
+
+class CountingPool(ProcessPoolExecutor):
+    """
+    Process pool summing CPU time its workers spend on calls. CPU time of children is known only once
+    they are joined, so start of workers and anything done before measurement would be counted as well
+    """
+
+    def __init__(self, workers=None):
+        self.cpu = Value('d', 0.0)
+        super().__init__(workers, initializer=_init_worker, initargs=(self.cpu,))
+
+    def submit(self, function, *args):
+        return super().submit(_counted, function, *args)
+
+    def cpu_time(self):
+        with self.cpu.get_lock():
+            return self.cpu.value
+
+
+class Schedule(object):
+    """
+    Hands out requests to clients. With target rate requests are due at fixed intervals or
+    exponentially distributed ones, and latency is counted from the due time, so time spent
+    waiting for a free client isn't lost when the system can't keep up
+    """
+
+    def __init__(self, total: int, rate: float = None, poisson: bool = False, seed: int = 0):
+        self.total = total
+        due, rng = 0.0, random.Random(seed)
+        self.offsets = []
+        for _ in range(total):
+            self.offsets.append(due)
+            if rate:
+                due += rng.expovariate(rate) if poisson else 1 / rate
+        self.rate = rate
+        self.start = None
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        :return: Tuple of index of request and time it is due, None if requests are over
+        """
+        with self._lock:
+            if self._next >= self.total:
+                return None
+            idx, self._next = self._next, self._next + 1
+        return idx, self.start + self.offsets[idx] if self.rate else None
+
+
+class Recorder(object):
+    def __init__(self, total):
+        self.latencies = [None] * total
+        self.errors = Counter()
+
+    def record(self, idx, due, start, error=None):
+        if error is not None:
+            self.errors[type(error).__name__] += 1
+        else:
+            self.latencies[idx] = timer() - (due if due is not None else start)
+
+
+def _sync_client(schedule, recorder, call):
+    while True:
+        request = schedule.take()
+        if request is None:
+            return
+        idx, due = request
+        if due is not None and due > timer():
+            time.sleep(due - timer())
+        start = timer()
+        try:
+            call(idx)
+        except Exception as e:
+            recorder.record(idx, due, start, e)
+        else:
+            recorder.record(idx, due, start)
+
+
+async def _async_client(schedule, recorder, call):
+    while True:
+        request = schedule.take()
+        if request is None:
+            return
+        idx, due = request
+        if due is not None and due > timer():
+            await asyncio.sleep(due - timer())
+        start = timer()
+        try:
+            await call(idx)
+        except Exception as e:
+            recorder.record(idx, due, start, e)
+        else:
+            recorder.record(idx, due, start)
+
+
+def run_threads(clients, schedule, recorder, call):
+    threads = [threading.Thread(target=_sync_client, args=(schedule, recorder, call)) for _ in range(clients)]
+    schedule.start = timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+async def run_tasks(clients, schedule, recorder, call):
+    schedule.start = timer()
+    await asyncio.gather(*[_async_client(schedule, recorder, call) for _ in range(clients)])
+
+
+def run_load(api, wrong, correct, method, clients, requests, rate=None, poisson=False, workers=None,
+             candidates=1, timeout=None, warmup=10, seed=0):
+    """
+    Sends requests for patches of wrong codes from concurrent clients
+    :param api: `sync` for `patch_with_closest` on threads, `async` for `AsyncPatcher` on thread pool,
+                `service` for `FeedbackService` on process pool
+    :param wrong: List of codes to patch, taken in turn
+    :param correct: List of correct codes to search in
+    :param method: Patch method
+    :param clients: Count of concurrent clients
+    :param requests: Count of measured requests
+    :param rate: Target count of requests per second, clients send requests back to back if not given
+    :param poisson: Whether requests arrive at random intervals with target mean rate
+    :param workers: Count of workers of executor
+    :param candidates: Count of closest samples to choose the smallest patches from
+    :param timeout: Deadline of request in seconds for async and service APIs
+    :param warmup: Count of requests sent before measurement
+    :return: Dict of stats
+    """
+    service, executor, pool = None, None, None
+
+    if api == 'sync':
+        def call(idx):
+            return list(patch_with_closest(wrong[idx % len(wrong)], correct, method, candidates=candidates))
+    elif api == 'service':
+        pool = CountingPool(workers)
+        service = FeedbackService(pool, max_pending=max(clients, 1) * 2, timeout=timeout)
+        service.load('load', correct)
+
+        def call(idx):
+            return service.feedback('load', wrong[idx % len(wrong)], method, candidates)
+    else:
+        executor = ThreadPoolExecutor(workers)
+        patcher = AsyncPatcher(executor)
+
+        async def call(idx):
+            return await patcher.patch_with_closest(wrong[idx % len(wrong)], correct, method,
+                                                    candidates=candidates, timeout=timeout)
+
+    def run(count, schedule_rate, recorder):
+        schedule = Schedule(count, schedule_rate, poisson, seed)
+        if api == 'async':
+            asyncio.run(run_tasks(clients, schedule, recorder, call))
+        else:
+            run_threads(clients, schedule, recorder, call)
+
+    def cpu_time():
+        return _cpu_time() + (pool.cpu_time() if pool is not None else 0)
+
+    try:
+        # workers start and import engines during warm up
+        run(warmup, None, Recorder(warmup))
+
+        recorder = Recorder(requests)
+        cpu, start = cpu_time(), timer()
+        run(requests, rate, recorder)
+        duration = timer() - start
+        cpu = cpu_time() - cpu
+    finally:
+        if service is not None:
+            service.close()
+        if executor is not None:
+            executor.shutdown()
+
+    latencies = [latency for latency in recorder.latencies if latency is not None]
+    stats = {
+        'api': api,
+        'method': method.value,
+        'clients': clients,
+        'target_rate': rate,
+        'requests': requests,
+        'errors': dict(recorder.errors),
+        'duration': duration,
+        'throughput': len(latencies) / duration,
+        # busy cores of this process and of workers of process pool while they served measured requests
+        'cpu_time': cpu,
+        'cpu_cores': cpu / duration,
+    }
+    if latencies:
+        stats.update({'p{:g}'.format(p): float(value)
+                      for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))})
+        stats.update({'mean': float(np.mean(latencies)), 'max': max(latencies)})
+    return stats
+
+
+def format_row(stats):
+    latencies = ' '.join('{:>9.2f}'.format(stats['p{:g}'.format(p)] * 1000) if 'p{:g}'.format(p) in stats
+                         else '{:>9}'.format('-') for p in PERCENTILES)
+    return '{:<8} {:<7} {:>7} {} {:>10.1f} {:>6.2f} {:>7}'.format(
+        stats['api'], stats['method'], stats['clients'], latencies, stats['throughput'], stats['cpu_cores'],
+        sum(stats['errors'].values()))
+
+
+def format_header():
+    return '{:<8} {:<7} {:>7} {} {:>10} {:>6} {:>7}'.format(
+        'api', 'method', 'clients', ' '.join('{:>9}'.format('p{:g} ms'.format(p)) for p in PERCENTILES),
+        'req/s', 'cpu', 'errors')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('--data', help='Path to CSV file of submissions with code and status columns, '
+                                       'synthetic submissions if not given', type=existing_file)
+    parser.add_argument('--correct-limit', help='Number of correct submissions to search in', type=positive_int,
+                        default=1000)
+    parser.add_argument('--wrong-limit', help='Number of distinct wrong submissions to send', type=positive_int,
+                        default=200)
+    parser.add_argument('--api', help='Entry point to load, can be repeated', choices=APIS, action='append')
+    parser.add_argument('--method', help='Method to load, can be repeated', type=method, action='append')
+    parser.add_argument('--clients', help='Numbers of concurrent clients', type=positive_int, nargs='+',
+                        default=[1, 4, 16])
+    parser.add_argument('--requests', help='Number of measured requests per run', type=positive_int,
+                        default=500)
+    parser.add_argument('--rate', help='Target number of requests per second, back to back if not given',
+                        type=float)
+    parser.add_argument('--poisson', help='Send requests at random intervals with target mean rate',
+                        action='store_true')
+    parser.add_argument('--workers', help='Number of workers of executor', type=positive_int)
+    parser.add_argument('--candidates', help='Number of closest samples to choose the smallest patches from',
+                        type=positive_int, default=1)
+    parser.add_argument('--timeout', help='Deadline of request in seconds for async and service APIs',
+                        type=float)
+    parser.add_argument('--ast-delay', help='Delay of stand-in AST server responses in seconds', type=float,
+                        default=0.005)
+    parser.add_argument('--ast-jitter', help='Max extra random delay of stand-in AST server responses in seconds',
+                        type=float, default=0)
+    parser.add_argument('--ast-error-rate', help='Share of stand-in AST server responses with HTTP 500', type=float,
+                        default=0)
+    parser.add_argument('--seed', help='Random seed', type=int, default=0)
+    parser.add_argument('--save', help='Path to save JSON results in', type=existing_place)
+    args = parser.parse_args()
+
+    if args.data:
+        wrong, correct = load_submissions(args.data, args.wrong_limit, args.correct_limit)
+    else:
+        wrong, correct = synthetic_workload(random.Random(args.seed), args.correct_limit, args.wrong_limit)
+    methods = args.method or [Method.DIFF, Method.TOKENS]
+
+    stand_in = start_stand_in(args.ast_delay, args.ast_jitter, args.ast_error_rate) if Method.AST in methods else None
+    results = []
+    try:
+        print(format_header())
+        for api in args.api or ['sync']:
+            for patch_method in methods:
+                for clients in args.clients:
+                    stats = run_load(api, wrong, correct, patch_method, clients, args.requests, args.rate,
+                                     args.poisson, args.workers, args.candidates, args.timeout, seed=args.seed)
+                    results.append(stats)
+                    print(format_row(stats))
+    finally:
+        if stand_in is not None:
+            stand_in.terminate()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'correct': len(correct), 'wrong': len(wrong), 'results': results}, f, indent=2)
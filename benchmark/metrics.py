@@ -1,295 +1,276 @@
+import abc
+from collections import namedtuple
+
+import numpy as np
+
 from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from amorph.utils.apply import patch_bounds
 
+INSERT, DELETE, REPLACE = 0, 1, 2
 
-class Metric(object):
-    def update(self, patches):
-        raise NotImplementedError
+PATCH_TYPES = [(InsertPatch, INSERT), (DeletePatch, DELETE), (ReplacePatch, REPLACE)]
 
-    @property
-    def value(self):
-        raise NotImplementedError
+Columns = namedtuple('Columns', [
+    # per patch columns
+    'submission', 'type', 'deleted', 'inserted',
+    # per submission columns
+    'source_len', 'matched_len', 'search_time', 'patch_time'
+])
 
 
-class PatchCountMetric(Metric):
-    name = 'total count of patches'
+def patch_type(patch):
+    for cls, code in PATCH_TYPES:
+        if isinstance(patch, cls):
+            return code
+
+
+class PatchTable(object):
+    """Accumulates per patch and per submission measurements of a method"""
 
     def __init__(self):
-        self.total = 0
+        self.submission = []
+        self.type = []
+        self.deleted = []
+        self.inserted = []
+
+        self.source_len = []
+        self.matched_len = []
+        self.search_time = []
+        self.patch_time = []
+
+    def add(self, source, matched, patches, search_time=0, patch_time=0):
+        """
+        Extracts columns of patches computed for submission
+        :param source: Source code of submission
+        :param matched: Sample source code was patched with
+        :param patches: List of patches
+        :param search_time: Time spent on searching sample
+        :param patch_time: Time spent on computing patches
+        """
+        idx = len(self.source_len)
+        for patch in patches:
+            start, stop, text = patch_bounds(patch)
+            self.submission.append(idx)
+            self.type.append(patch_type(patch))
+            self.deleted.append(stop - start)
+            self.inserted.append(len(text))
+
+        self.source_len.append(len(source))
+        self.matched_len.append(len(matched))
+        self.search_time.append(search_time)
+        self.patch_time.append(patch_time)
+
+    def columns(self):
+        return Columns(
+            submission=np.array(self.submission, dtype=np.int64),
+            type=np.array(self.type, dtype=np.int8),
+            deleted=np.array(self.deleted, dtype=np.int64),
+            inserted=np.array(self.inserted, dtype=np.int64),
+            source_len=np.array(self.source_len, dtype=np.int64),
+            matched_len=np.array(self.matched_len, dtype=np.int64),
+            search_time=np.array(self.search_time, dtype=np.float64),
+            patch_time=np.array(self.patch_time, dtype=np.float64)
+        )
+
+
+Totals = namedtuple('Totals', ['patches', 'submissions', 'inserted', 'deleted', 'by_type'])
+
+
+def totals(columns: Columns):
+    """
+    Sums columns shared by metrics, so every column is aggregated once per report cell
+    :param columns: Columns of patch table or result store
+    :return: Totals with count of patches of every type in `by_type`, indexed by type code
+    """
+    return Totals(
+        patches=len(columns.submission),
+        submissions=len(columns.source_len),
+        inserted=int(columns.inserted.sum()),
+        deleted=int(columns.deleted.sum()),
+        by_type=np.bincount(columns.type, minlength=len(PATCH_TYPES))
+    )
+
+
+def ratio(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+
+class Metric(abc.ABC):
+    """Aggregate computed from columns of patch table and their totals"""
+
+    name = None
+
+    @staticmethod
+    @abc.abstractmethod
+    def compute(columns: Columns, totals: Totals):
+        pass
+
 
-    def update(self, patches):
-        self.total += len(patches)
+class PatchCountMetric(Metric):
+    name = 'total count of patches'
 
-    @property
-    def value(self):
-        return self.total
+    @staticmethod
+    def compute(columns, totals):
+        return totals.patches
 
 
 class SubmissionsCountMetric(Metric):
     name = 'count of submissions'
 
-    def __init__(self):
-        self.total = 0
-
-    def update(self, patches):
-        self.total += 1
-
-    @property
-    def value(self):
-        return self.total
+    @staticmethod
+    def compute(columns, totals):
+        return totals.submissions
 
 
 class AddOpsMetric(Metric):
     name = 'total count of additions'
 
-    def __init__(self):
-        self.total = 0
-
-    def update(self, patches):
-        for patch in patches:
-            if isinstance(patch, (InsertPatch, ReplacePatch)):
-                self.total += len(patch.piece)
-    
-    @property
-    def value(self):
-        return self.total
+    @staticmethod
+    def compute(columns, totals):
+        return totals.inserted
 
 
 class DeleteOpsMetric(Metric):
     name = 'total count of deletions'
 
-    def __init__(self):
-        self.total = 0
-
-    def update(self, patches):
-        for patch in patches:
-            if isinstance(patch, (DeletePatch, ReplacePatch)):
-                self.total += patch.end - patch.start
-
-    @property
-    def value(self):
-        return self.total
+    @staticmethod
+    def compute(columns, totals):
+        return totals.deleted
 
 
 class TotalOpsMetric(Metric):
     name = 'total count of corrections'
 
-    def __init__(self):
-        self.add = AddOpsMetric()
-        self.delete = DeleteOpsMetric()
-
-    def update(self, patches):
-        self.add.update(patches)
-        self.delete.update(patches)
-
-    @property
-    def value(self):
-        return self.add.value + self.delete.value
+    @staticmethod
+    def compute(columns, totals):
+        return totals.inserted + totals.deleted
 
 
 class AddOpsPerSubmission(Metric):
     name = 'count of additions per submission'
 
-    def __init__(self):
-        self.add = AddOpsMetric()
-        self.total = SubmissionsCountMetric()
-
-    def update(self, patches):
-        self.add.update(patches)
-        self.total.update(patches)
-
-    @property
-    def value(self):
-        return self.add.value / self.total.value
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.inserted, totals.submissions)
 
 
 class DeleteOpsPerSubmission(Metric):
     name = 'count of deletions per submission'
 
-    def __init__(self):
-        self.delete = DeleteOpsMetric()
-        self.total = SubmissionsCountMetric()
-
-    def update(self, patches):
-        self.delete.update(patches)
-        self.total.update(patches)
-
-    @property
-    def value(self):
-        return self.delete.value / self.total.value
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.deleted, totals.submissions)
 
 
 class TotalOpsPerSubmission(Metric):
     name = 'count of corrections per submission'
 
-    def __init__(self):
-        self.ops = TotalOpsMetric()
-        self.total = SubmissionsCountMetric()
-
-    def update(self, patches):
-        self.ops.update(patches)
-        self.total.update(patches)
-
-    @property
-    def value(self):
-        return self.ops.value / self.total.value
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.inserted + totals.deleted, totals.submissions)
 
 
 class PatchesPerSubmission(Metric):
     name = 'count of patches per submission'
 
-    def __init__(self):
-        self.patches = PatchCountMetric()
-        self.total = SubmissionsCountMetric()
-
-    def update(self, patches):
-        self.patches.update(patches)
-        self.total.update(patches)
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.patches, totals.submissions)
 
-    @property
-    def value(self):
-        return self.patches.value / self.total.value
 
+class InsertPatchesPerSubmission(Metric):
+    name = 'count of insertions per submission'
 
-class AddOpsPerPatch(Metric):
-    name = 'count of additions per patch'
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(int(totals.by_type[INSERT]), totals.submissions)
 
-    def __init__(self):
-        self.add = AddOpsMetric()
-        self.total = PatchCountMetric()
 
-    def update(self, patches):
-        self.add.update(patches)
-        self.total.update(patches)
+class DeletePatchesPerSubmission(Metric):
+    name = 'count of removals per submission'
 
-    @property
-    def value(self):
-        return self.add.value / self.total.value
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(int(totals.by_type[DELETE]), totals.submissions)
 
 
-class DeleteOpsPerPatch(Metric):
-    name = 'count of deletions per patch'
+class ReplacePatchesPerSubmission(Metric):
+    name = 'count of replacements per submission'
 
-    def __init__(self):
-        self.delete = DeleteOpsMetric()
-        self.total = PatchCountMetric()
-
-    def update(self, patches):
-        self.delete.update(patches)
-        self.total.update(patches)
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(int(totals.by_type[REPLACE]), totals.submissions)
 
-    @property
-    def value(self):
-        return self.delete.value / self.total.value
 
+class AddOpsPerPatch(Metric):
+    name = 'count of additions per patch'
 
-class TotalOpsPerPatch(Metric):
-    name = 'count of corrections per patch'
-
-    def __init__(self):
-        self.ops = TotalOpsMetric()
-        self.total = PatchCountMetric()
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.inserted, totals.patches)
 
-    def update(self, patches):
-        self.ops.update(patches)
-        self.total.update(patches)
 
-    @property
-    def value(self):
-        return self.ops.value / self.total.value
+class DeleteOpsPerPatch(Metric):
+    name = 'count of deletions per patch'
 
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.deleted, totals.patches)
 
-class TimeMetric(object):
-    def update_search(self, interval):
-        raise NotImplementedError
 
-    def update_patch(self, interval):
-        raise NotImplementedError
+class TotalOpsPerPatch(Metric):
+    name = 'count of corrections per patch'
 
-    @property
-    def value(self):
-        raise NotImplementedError
+    @staticmethod
+    def compute(columns, totals):
+        return ratio(totals.inserted + totals.deleted, totals.patches)
 
 
-class SearchTimeMetric(TimeMetric):
+class SearchTimeMetric(Metric):
     name = 'search time in sec.'
 
-    def __init__(self):
-        self.time = 0
-        self.total = 0
+    @staticmethod
+    def compute(columns, totals):
+        return float(columns.search_time.mean()) if totals.submissions else 0.0
 
-    def update_search(self, interval):
-        self.time += interval
-        self.total += 1
 
-    def update_patch(self, interval):
-        pass
-
-    @property
-    def value(self):
-        return self.time / self.total
-
-
-class PatchTimeMetric(TimeMetric):
+class PatchTimeMetric(Metric):
     name = 'patches generation time in sec.'
 
-    def __init__(self):
-        self.time = 0
-        self.total = 0
-
-    def update_search(self, interval):
-        pass
-
-    def update_patch(self, interval):
-        self.time += interval
-        self.total += 1
-
-    @property
-    def value(self):
-        return self.time / self.total
+    @staticmethod
+    def compute(columns, totals):
+        return float(columns.patch_time.mean()) if totals.submissions else 0.0
 
 
-class TotalTimeMetric(TimeMetric):
+class TotalTimeMetric(Metric):
     name = 'feedback generation time in sec.'
 
-    def __init__(self):
-        self.search = SearchTimeMetric()
-        self.patch = PatchTimeMetric()
-
-    def update_search(self, interval):
-        self.search.update_search(interval)
-        self.patch.update_search(interval)
-
-    def update_patch(self, interval):
-        self.search.update_patch(interval)
-        self.patch.update_patch(interval)
-
-    @property
-    def value(self):
-        return self.search.value + self.patch.value
+    @staticmethod
+    def compute(columns, totals):
+        return SearchTimeMetric.compute(columns, totals) + PatchTimeMetric.compute(columns, totals)
 
 
-class RelativeMetric(object):
-    def update_relative(self, source, matched, patches):
-        raise NotImplementedError
-
-    @property
-    def value(self):
-        raise NotImplementedError
-
-
-class TotalRatioPerSubmission(RelativeMetric):
+class TotalRatioPerSubmission(Metric):
     name = 'corrections ratio per submission'
 
-    def __init__(self):
-        self.total_ratio = 0
-        self.total = SubmissionsCountMetric()
-
-    def update_relative(self, source, matched, patches):
-        tmp = TotalOpsMetric()
-        tmp.update(patches)
-        self.total_ratio += tmp.value / (len(source) + len(matched))
-        self.total.update(patches)
-
-    @property
-    def value(self):
-        return self.total_ratio / self.total.value
+    @staticmethod
+    def compute(columns, totals):
+        if not totals.submissions:
+            return 0.0
+
+        ops = np.bincount(columns.submission,
+                          weights=columns.deleted + columns.inserted,
+                          minlength=totals.submissions)
+        lengths = columns.source_len + columns.matched_len
+        return float(np.mean(ops / np.maximum(lengths, 1)))
+
+
+def compute_metrics(metrics, columns: Columns):
+    """
+    Computes metrics from columns of measurements
+    :param metrics: List of metric classes
+    :param columns: Columns of patch table or result store
+    :return: Dict mapping metric name to its value
+    """
+    shared = totals(columns)
+    return {metric.name: metric.compute(columns, shared) for metric in metrics}
@@ -0,0 +1,252 @@
+import json
+import platform
+import random
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from bisect import bisect_left
+from timeit import default_timer as timer
+
+import numpy as np
+import pandas as pd
+
+from amorph import diff, tokens
+from amorph.diff.patch import Index
+from amorph.tokens.patch import get_tokens
+from amorph.utils import find_closest
+from benchmark.validators import existing_file, existing_place, positive_int
+
+PERCENTILES = [50, 95, 99]
+
+NAMES = ['a', 'b', 'n', 'i', 'x', 'res', 'line', 'total']
+STATEMENTS = [
+    '{0} = int(input())',
+    '{0} = {1} + {2}',
+    '{0} = {1} * {2} - 1',
+    '{0} += {1}',
+    'print({0})',
+    'print({0}, {1})',
+    'if {0} > {1}:',
+    'for {0} in range({1}):',
+    'while {0} < {1}:',
+    '{0} = [{1} for {1} in range({2})]',
+]
+
+
+def synthetic_code(rng, lines):
+    """
+    Generates syntactically valid python code of given length
+    :param rng: Random generator
+    :param lines: Count of lines
+    :return: Code
+    """
+    result = []
+    indent = 0
+    for _ in range(lines):
+        statement = rng.choice(STATEMENTS).format(*rng.sample(NAMES, 3))
+        result.append('    ' * indent + statement)
+        if statement.endswith(':'):
+            indent += 1
+        elif indent and rng.random() < 0.3:
+            indent -= 1
+    # close last block
+    if result[-1].endswith(':'):
+        result.append('    ' * indent + 'pass')
+    return '\n'.join(result) + '\n'
+
+
+def mutate(rng, code, count):
+    """
+    Applies random name substitutions to lines of code
+    :param rng: Random generator
+    :param code: Code to mutate
+    :param count: Count of mutations
+    :return: Mutated code
+    """
+    lines = code.split('\n')
+    filled = [idx for idx, line in enumerate(lines) if line.strip()]
+    for _ in range(count):
+        idx = rng.choice(filled)
+        words = lines[idx].split(' ')
+        # empty words are indentation
+        pos = rng.choice([pos for pos, word in enumerate(words) if word])
+        words[pos] = '{}{}'.format(rng.choice(NAMES), words[pos])
+        lines[idx] = ' '.join(words)
+    return '\n'.join(lines)
+
+
+class Case(object):
+    """Benchmarked function call with prepared arguments"""
+
+    def __init__(self, name, params, func, *args):
+        self.name = name
+        self.params = params
+        self.func = func
+        self.args = args
+
+    def run(self):
+        self.func(*self.args)
+
+
+def consume_patches(get_patches, source, sample):
+    for _ in get_patches(source, sample):
+        pass
+
+
+def map_all(index, positions):
+    for line, char in positions:
+        index.map(line, char)
+
+
+def to_dict_all(patches):
+    for patch in patches:
+        patch.to_dict()
+
+
+def build_cases(rng, lines, corpus_sizes, real=None):
+    """
+    Prepares benchmark cases
+    :param rng: Random generator
+    :param lines: List of code lengths in lines
+    :param corpus_sizes: List of corpus sizes for search
+    :param real: Optional list of real codes to use instead of synthetic ones, \
+                 ones closest to requested length are taken
+    :return: List of cases
+    """
+    by_lines = {}
+    for sample in real or []:
+        by_lines.setdefault(len(sample.splitlines()), []).append(sample)
+    counts = sorted(by_lines)
+
+    def code(length):
+        if not counts:
+            return synthetic_code(rng, length)
+        pos = bisect_left(counts, length)
+        nearest = min(counts[max(pos - 1, 0):pos + 1], key=lambda count: abs(count - length))
+        return rng.choice(by_lines[nearest])
+
+    cases = []
+    for length in lines:
+        source = code(length)
+        sample = mutate(rng, source, max(1, length // 5))
+        params = {'lines': len(source.splitlines()), 'chars': len(source)}
+
+        cases.append(Case('diff.get_patches', params, consume_patches, diff.get_patches, source, sample))
+        cases.append(Case('tokens.get_patches', dict(params, tokens=len(get_tokens(source))),
+                          consume_patches, tokens.get_patches, source, sample))
+
+        index = Index(source)
+        positions = [(line, 0) for line in range(len(index))]
+        cases.append(Case('Index.map', dict(params, calls=len(positions)), map_all, index, positions))
+
+        patches = list(diff.get_patches(source, sample)) * 10
+        cases.append(Case('Patch.to_dict', dict(params, patches=len(patches)), to_dict_all, patches))
+
+    for size in corpus_sizes:
+        source = code(lines[0])
+        corpus = [mutate(rng, source, rng.randint(1, 10)) for _ in range(size)]
+        params = {'lines': len(source.splitlines()), 'corpus': size}
+        cases.append(Case('find_closest', params, find_closest, source, corpus))
+
+    return cases
+
+
+def measure(case, repeat):
+    """
+    Measures time and memory of case
+    :param case: Case to measure
+    :param repeat: Count of timed runs
+    :return: Dict of stats
+    """
+    # warm up
+    case.run()
+
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        case.run()
+        times.append(timer() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # blocks allocated during the run and still alive after it, freed temporaries aren't seen by snapshots
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+    stats = {'p{}'.format(p): float(value) for p, value in zip(PERCENTILES, np.percentile(times, PERCENTILES))}
+    stats.update({
+        'mean': float(np.mean(times)),
+        'repeat': repeat,
+        'peak_bytes': peak,
+        'retained_blocks': retained_blocks
+    })
+    return stats
+
+
+def case_key(name, params):
+    return '{}[{}]'.format(name, ','.join('{}={}'.format(k, params[k]) for k in sorted(params)))
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints comparison of results with baseline
+    :return: Count of regressed cases
+    """
+    regressions = 0
+    print('{:<60} {:>12} {:>12} {:>8}'.format('case', 'base p50', 'new p50', 'ratio'))
+    for key, stats in sorted(results.items()):
+        if key not in baseline:
+            continue
+        base, new = baseline[key]['p50'], stats['p50']
+        ratio = new / base if base else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            regressions += 1
+            mark = ' !'
+        print('{:<60} {:>12.6f} {:>12.6f} {:>8.2f}{}'.format(key, base, new, ratio, mark))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('save', help='Path to save JSON results in', type=existing_place)
+    parser.add_argument('--data', help='Path to CSV data file to take real codes from', type=existing_file)
+    parser.add_argument('--lines', help='Code sizes in lines', type=positive_int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--corpus', help='Corpus sizes for search', type=positive_int, nargs='+',
+                        default=[100, 1000, 10000])
+    parser.add_argument('--repeat', help='Number of timed runs per case', type=positive_int, default=50)
+    parser.add_argument('--seed', help='Random seed', type=int, default=0)
+    parser.add_argument('--baseline', help='Path to JSON results to compare with', type=existing_file)
+    parser.add_argument('--threshold', help='Relative p50 slowdown treated as regression', type=float,
+                        default=0.1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    real = None
+    if args.data:
+        real = list(pd.read_csv(args.data).code.dropna())
+
+    results = {}
+    for case in build_cases(rng, args.lines, args.corpus, real):
+        stats = measure(case, args.repeat)
+        stats['name'] = case.name
+        stats['params'] = case.params
+        results[case_key(case.name, case.params)] = stats
+        print('{:<60} p50={:.6f} p95={:.6f} p99={:.6f}'.format(
+            case_key(case.name, case.params), stats['p50'], stats['p95'], stats['p99']))
+
+    with open(args.save, 'w') as f:
+        json.dump({
+            'python': sys.version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'results': results
+        }, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        sys.exit(1 if compare(results, baseline, args.threshold) else 0)
@@ -0,0 +1,246 @@
+import json
+import os
+import random
+from argparse import ArgumentParser
+from functools import partial
+from timeit import default_timer as timer
+
+import matplotlib.pyplot as plt
+import numpy as np
+from tqdm import tqdm
+
+from amorph import patch_with_sample, Method
+from amorph.corpus import approximate_size
+from amorph.metrics import string_similarity, prepare_metric
+from amorph.metrics.structure import StructureIndex
+from amorph.profile import load_submissions
+from amorph.utils import find_closest, ClusterIndex
+from benchmark.synth import synthetic_workload
+from benchmark.utils import format_filename
+from benchmark.validators import existing_dir, existing_file, method, positive_int
+
+MODES = ['exhaustive', 'timeout', 'cluster', 'structure']
+
+
+class Mode(object):
+    """Search mode with fixed parameters, built once per corpus"""
+
+    def __init__(self, name, param, value, build):
+        """
+        :param name: Name of mode, one of `MODES`
+        :param param: Name of parameter varied
+        :param value: Value of parameter
+        :param build: Function of corpus returning tuple of index builder, if any, and search function.
+                      Search function takes built index before source if builder is given
+        """
+        self.name = name
+        self.param = param
+        self.value = value
+        self.build = build
+
+
+def build_modes(modes, timeouts, probes, counts, metric=string_similarity, seed=0):
+    """
+    :return: List of modes, ones sharing an index are built once per corpus
+    """
+    result = []
+    if 'exhaustive' in modes:
+        result.append(Mode('exhaustive', None, None,
+                           lambda corpus: (None, lambda source: find_closest(source, corpus, metric))))
+    if 'timeout' in modes:
+        for timeout in timeouts:
+            result.append(Mode('timeout', 'timeout', timeout, lambda corpus, timeout=timeout: (
+                None, lambda source: find_closest(source, corpus, metric, timeout=timeout))))
+    if 'cluster' in modes:
+        def cluster(corpus):
+            return ClusterIndex.build(corpus, metric, seed=seed)
+        for count in probes:
+            result.append(Mode('cluster', 'probes', count, lambda corpus, count=count: (
+                cluster, lambda index, source: index.find_closest(source, count))))
+    if 'structure' in modes:
+        def structure(corpus):
+            return StructureIndex(corpus)
+        for count in counts:
+            result.append(Mode('structure', 'count', count, lambda corpus, count=count: (
+                structure, lambda index, source: index.find_closest(source, count, metric))))
+    return result
+
+
+class Truth(object):
+    """Exhaustive scores of corpus against query, computed once for all modes"""
+
+    def __init__(self, source, corpus, k, metric=string_similarity):
+        self.compare = prepare_metric(metric, source)
+        scores = [self.compare(sample) for sample in corpus]
+        best = max(range(len(scores)), key=scores.__getitem__)
+        # the first of equally close samples, as in `find_closest`
+        self.closest = corpus[best]
+        self.best = scores[best]
+        self.kth = sorted(scores, reverse=True)[min(k, len(scores)) - 1]
+
+
+def patch_size(source, sample, method):
+    return sum(patch.size for patch in patch_with_sample(source, sample, method))
+
+
+def evaluate(wrong, correct, sizes, modes, k=10, method=Method.DIFF, metric=string_similarity):
+    """
+    Searches closest samples for every wrong code with every mode and compares them with exhaustive search
+    :param wrong: List of codes to search for
+    :param correct: List of correct codes, prefixes of it are searched in
+    :param sizes: Sizes of corpus
+    :param modes: List of `Mode`
+    :param k: Size of exhaustive top to measure recall@k against
+    :param method: Patch method to measure patch size increase with
+    :return: List of dicts of stats, one per size and mode
+    """
+    results = []
+    for size in sizes:
+        corpus = correct[:size]
+        truths = [Truth(source, corpus, k, metric) for source in tqdm(wrong, desc='exhaustive {}'.format(size))]
+        best_sizes = [patch_size(source, truth.closest, method) for source, truth in zip(wrong, truths)]
+
+        indices = {}
+        for mode in modes:
+            builder, search = mode.build(corpus)
+            stats = {'size': size, 'mode': mode.name, 'param': mode.param, 'value': mode.value,
+                     'build_time': 0, 'index_bytes': 0}
+            if builder is not None:
+                if builder not in indices:
+                    start = timer()
+                    index = builder(corpus)
+                    build_time = timer() - start
+                    # samples are shared with corpus, only index structures are counted
+                    seen = set()
+                    approximate_size(corpus, seen)
+                    indices[builder] = index, build_time, approximate_size(index, seen)
+                index, stats['build_time'], stats['index_bytes'] = indices[builder]
+                search = partial(search, index)
+
+            latencies, hits, hits_k, gaps, increases = [], 0, 0, [], []
+            for source, truth, best_size in tqdm(list(zip(wrong, truths, best_sizes)), desc=label(stats)):
+                start = timer()
+                matched = search(source)
+                latencies.append(timer() - start)
+
+                score = truth.compare(matched) if matched is not None else None
+                if score is None:
+                    gaps.append(truth.best)
+                    continue
+                # ties with the closest sample are as good as the closest sample
+                hits += score >= truth.best
+                hits_k += score >= truth.kth
+                gaps.append(truth.best - score)
+                increases.append((patch_size(source, matched, method) - best_size) / max(best_size, 1))
+
+            stats.update({
+                'recall@1': hits / len(wrong),
+                'recall@k': hits_k / len(wrong),
+                'k': k,
+                'score_gap': float(np.mean(gaps)),
+                'patch_increase': float(np.mean(increases)) if increases else None,
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'mean': float(np.mean(latencies)),
+            })
+            results.append(stats)
+        mark_pareto([stats for stats in results if stats['size'] == size])
+    return results
+
+
+def mark_pareto(results):
+    """Marks results not beaten by any other one in both recall@1 and median latency"""
+    for stats in results:
+        stats['pareto'] = not any(
+            other['recall@1'] >= stats['recall@1'] and other['p50'] <= stats['p50'] and
+            (other['recall@1'] > stats['recall@1'] or other['p50'] < stats['p50'])
+            for other in results)
+
+
+def label(stats):
+    return '{}({}={})'.format(stats['mode'], stats['param'], stats['value']) if stats['param'] else stats['mode']
+
+
+def format_table(results):
+    lines = ['{:>8} {:<26} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9} {:>8} {:>9} {:>8}'.format(
+        'size', 'mode', 'recall@1', 'recall@k', 'score gap', 'patch +%', 'p50 ms', 'p95 ms', 'speedup',
+        'index MB', 'build s')]
+    exhaustive = {stats['size']: stats['p50'] for stats in results if stats['mode'] == 'exhaustive'}
+    for stats in results:
+        speedup = exhaustive[stats['size']] / stats['p50'] if stats['size'] in exhaustive and stats['p50'] else None
+        lines.append('{:>8} {:<26} {:>8.3f} {:>8.3f} {:>9.4f} {:>9} {:>9.3f} {:>9.3f} {:>8} {:>9.2f} {:>8.2f}{}'.format(
+            stats['size'], label(stats), stats['recall@1'], stats['recall@k'], stats['score_gap'],
+            '{:.1f}'.format(stats['patch_increase'] * 100) if stats['patch_increase'] is not None else '-',
+            stats['p50'] * 1000, stats['p95'] * 1000, '{:.1f}x'.format(speedup) if speedup else '-',
+            stats['index_bytes'] / 2 ** 20, stats['build_time'], ' *' if stats['pareto'] else ''))
+    return '\n'.join(lines)
+
+
+def plot(results, save_path):
+    """Saves recall@1 against median latency chart per corpus size, modes varying parameters are lines"""
+    for size in sorted({stats['size'] for stats in results}):
+        fig = plt.figure()
+        fig.suptitle('recall@1 against latency\n({} correct samples)'.format(size))
+
+        for mode in MODES:
+            points = sorted((stats['p50'] * 1000, stats['recall@1'], idx) for idx, stats in enumerate(results)
+                            if stats['size'] == size and stats['mode'] == mode)
+            if not points:
+                continue
+            x, y, rows = zip(*points)
+            rows = [results[idx] for idx in rows]
+            line, = plt.plot(x, y, '-o', label=mode)
+            for stats, px, py in zip(rows, x, y):
+                if stats['param']:
+                    plt.annotate(str(stats['value']), (px, py), textcoords='offset points', xytext=(4, 4),
+                                 fontsize=8, color=line.get_color())
+
+        front = sorted((stats['p50'] * 1000, stats['recall@1']) for stats in results
+                       if stats['size'] == size and stats['pareto'])
+        plt.step(*zip(*front), where='post', color='gray', linestyle=':', label='pareto front')
+
+        plt.xscale('log')
+        plt.xlabel('median latency, ms')
+        plt.ylabel('recall@1')
+        plt.legend()
+        plt.grid()
+        plt.savefig(os.path.join(save_path, format_filename('recall {}.png'.format(size))), bbox_inches='tight')
+        plt.close(fig)
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('save', help='Path to save results and charts into', type=existing_dir)
+    parser.add_argument('--data', help='Path to CSV file of submissions with code and status columns, '
+                                       'synthetic submissions if not given', type=existing_file)
+    parser.add_argument('--queries', help='Number of wrong submissions to search for', type=positive_int,
+                        default=100)
+    parser.add_argument('--sizes', help='Corpus sizes', type=positive_int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--mode', help='Search mode, can be repeated, all modes if not given', choices=MODES,
+                        action='append')
+    parser.add_argument('--timeouts', help='Timeouts of search in seconds', type=float, nargs='+',
+                        default=[0.001, 0.005, 0.02])
+    parser.add_argument('--probes', help='Numbers of clusters searched in', type=positive_int, nargs='+',
+                        default=[1, 2, 4, 8])
+    parser.add_argument('--counts', help='Numbers of structurally closest samples scored', type=positive_int,
+                        nargs='+', default=[10, 50, 200, 1000])
+    parser.add_argument('--k', help='Size of exhaustive top for recall@k', type=positive_int, default=10)
+    parser.add_argument('--method', help='Patch method to measure patch size increase with', type=method,
+                        default=Method.DIFF)
+    parser.add_argument('--seed', help='Random seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = sorted(args.sizes)
+    if args.data:
+        wrong, correct = load_submissions(args.data, args.queries, sizes[-1])
+    else:
+        wrong, correct = synthetic_workload(random.Random(args.seed), sizes[-1], args.queries)
+    sizes = [size for size in sizes if size <= len(correct)] or [len(correct)]
+
+    modes = build_modes(args.mode or MODES, args.timeouts, args.probes, args.counts, seed=args.seed)
+    results = evaluate(wrong, correct, sizes, modes, args.k, args.method)
+
+    print(format_table(results))
+    with open(os.path.join(args.save, 'recall.json'), 'w') as f:
+        json.dump({'queries': len(wrong), 'results': results}, f, indent=2)
+    plot(results, args.save)
@@ -1,5 +1,6 @@
 import os
 from argparse import ArgumentParser
+from itertools import islice
 from timeit import default_timer as timer
 
 import matplotlib.gridspec as gridspec
@@ -9,24 +10,134 @@ import seaborn as sns
 from tqdm import tqdm
 
 from amorph import patch_with_sample, Method
+from amorph.corpus import CsvSource
+from amorph.metrics import string_similarity
 from amorph.utils import find_closest
 from benchmark.metrics import (AddOpsPerSubmission, DeleteOpsPerSubmission, TotalOpsPerSubmission,
-                               PatchesPerSubmission, AddOpsPerPatch, DeleteOpsPerPatch, TotalOpsPerPatch,
+                               PatchesPerSubmission, InsertPatchesPerSubmission, DeletePatchesPerSubmission,
+                               ReplacePatchesPerSubmission, AddOpsPerPatch, DeleteOpsPerPatch, TotalOpsPerPatch,
                                TotalRatioPerSubmission, SearchTimeMetric, PatchTimeMetric, TotalTimeMetric,
-                               TimeMetric, RelativeMetric)
-from benchmark.utils import cut_data, format_lines, format_filename, float_zeros_width
-from benchmark.validators import csv_file, existing_dir, positive_int
+                               compute_metrics)
+from benchmark.store import ResultStore, corpus_meta
+from benchmark.utils import format_lines, format_filename, float_zeros_width
+from benchmark.validators import corpus_source, existing_dir, existing_file, method, positive_int
+
+
+class PrefixSearch(object):
+    """
+    Closest to source sample in growing prefix of samples. Samples are fed chunk by chunk,
+    closest sample of every chunk is compared with the closest one of the previous chunks
+    """
+
+    def __init__(self, source, metric=string_similarity):
+        """
+        :param source: Source code
+        :param metric: Two string arguments function measuring similarity between two codes
+        """
+        self.source = source
+        self.metric = metric
+        self.best_metric, self.closest = None, None
+        # time to search in the whole prefix fed so far
+        self.search_time = 0
+
+    def feed(self, samples):
+        start = timer()
+        candidate = find_closest(self.source, samples, self.metric)
+        if candidate is not None:
+            current_metric = self.metric(self.source, candidate)
+            if self.best_metric is None or current_metric > self.best_metric:
+                self.best_metric, self.closest = current_metric, candidate
+        self.search_time += timer() - start
 
 
 class Benchmarker(object):
     MAX_COL_LENGTH = 9
     MAX_NUM_LENGTH = 4
 
-    def __init__(self, correct_batches, metrics):
-        self.correct_batches = correct_batches
+    # max count of correct samples kept in memory at once
+    CHUNK_SIZE = 1000
+
+    def __init__(self, correct, batch_sizes, metrics):
+        """
+        :param correct: Iterable of correct samples, e.g. list or `amorph.corpus.Source`, \
+                        it's read once per measurement
+        :param batch_sizes: Sizes of prefixes of correct samples to search in
+        :param metrics: Metric classes to report, see `benchmark.metrics`
+        """
+        self.correct = correct
+        # nothing to patch with when no samples are used
+        self.batch_sizes = sorted(set(size for size in batch_sizes if size > 0))
         self.metrics = metrics
 
-    def report(self, wrong_batch, methods, save_path):
+    def _chunks(self, last):
+        """
+        Splits prefix of correct samples into chunks not crossing batch sizes
+        :param last: Size of prefix
+        :return: Generator of tuples in format (chunk, size of prefix read so far)
+        """
+        samples, seen = iter(self.correct), 0
+        for size in self.batch_sizes:
+            if size > last:
+                return
+            while seen < size:
+                chunk = list(islice(samples, min(self.CHUNK_SIZE, size - seen)))
+                if not chunk:
+                    return
+                seen += len(chunk)
+                yield chunk, seen
+
+    def measure(self, wrong_batch, methods, store):
+        """
+        Searches and patches every wrong sample, skipping cells already in store.
+        Correct samples are streamed once, all wrong samples are searched in every chunk of them
+        :param wrong_batch: List of wrong samples
+        :param methods: Patch methods
+        :param store: Result store, flushed after every batch size
+        """
+        todo = []
+        for source in wrong_batch:
+            missing = {size: [method for method in methods if not store.has(source, size, method)]
+                       for size in self.batch_sizes}
+            if any(missing.values()):
+                todo.append((PrefixSearch(source), missing, {}))
+        if not todo:
+            return
+        # larger prefixes than needed are not searched
+        last = max(size for _, missing, _ in todo for size, methods_todo in missing.items() if methods_todo)
+
+        progress = tqdm(total=last)
+        for chunk, seen in self._chunks(last):
+            for search, missing, _ in todo:
+                search.feed(chunk)
+            progress.update(len(chunk))
+            if seen not in self.batch_sizes:
+                continue
+
+            for search, missing, cache in todo:
+                matched = search.closest
+                for method in missing[seen]:
+                    # closest sample often stays the same for larger batch
+                    if method not in cache or cache[method][0] is not matched:
+                        start = timer()
+                        patches = list(patch_with_sample(search.source, matched, method))
+                        cache[method] = matched, patches, timer() - start
+                    _, patches, patch_time = cache[method]
+
+                    store.add(search.source, seen, method, matched, patches, search.search_time, patch_time)
+            store.flush()
+        progress.close()
+
+    def report(self, wrong_batch, methods, save_path, store=None):
+        """
+        Measures methods and plots metrics
+        :param wrong_batch: List of wrong samples
+        :param methods: Patch methods
+        :param save_path: Directory to save charts into
+        :param store: Result store to reuse measurements from, kept in memory if not given
+        """
+        store = store if store is not None else ResultStore()
+        self.measure(wrong_batch, methods, store)
+
         chart = {}
         for metric in self.metrics:
             chart[metric.name] = {method: [] for method in methods}
@@ -35,34 +146,12 @@ class Benchmarker(object):
         for method in methods:
             hmap[method] = {metric.name: [] for metric in self.metrics}
 
-        for batch in tqdm(self.correct_batches):
-            registry = {}
+        for size in self.batch_sizes:
             for method in methods:
-                registry[method] = [metric() for metric in self.metrics]
-
-            for source in wrong_batch:
-                start = timer()
-                matched = find_closest(source, batch)
-                search_time = timer() - start
-
-                for method in methods:
-                    start = timer()
-                    patches = list(patch_with_sample(source, matched, method))
-                    patch_time = timer() - start
-
-                    for metric in registry[method]:
-                        if isinstance(metric, TimeMetric):
-                            metric.update_search(search_time)
-                            metric.update_patch(patch_time)
-                        elif isinstance(metric, RelativeMetric):
-                            metric.update_relative(source, matched, patches)
-                        else:
-                            metric.update(patches)
-
-            for method, records in registry.items():
-                for record in records:
-                    chart[record.name][method].append((len(batch), record.value))
-                    hmap[method][record.name].append((len(batch), record.value))
+                columns = store.columns(wrong_batch, size, method)
+                for name, value in compute_metrics(self.metrics, columns).items():
+                    chart[name][method].append((size, value))
+                    hmap[method][name].append((size, value))
 
         for metric_type, data in chart.items():
             fig = plt.figure()
@@ -87,7 +176,7 @@ class Benchmarker(object):
             length = len(data)
 
             fig_width = int(1.3 * len(self.metrics))
-            fig_height = max(5, len(self.correct_batches))
+            fig_height = max(5, len(self.batch_sizes))
             fig = plt.figure(figsize=(fig_width, fig_height))
             fig.suptitle('{}\n({} wrong samples)'.format(method.value, len(wrong_batch)))
             grid = gridspec.GridSpec(1, length)
@@ -128,27 +217,44 @@ class Benchmarker(object):
 
 if __name__ == '__main__':
     parser = ArgumentParser()
-    parser.add_argument('data', help='Path to CSV data file', type=csv_file)
+    parser.add_argument('data', help='Path to CSV data file', type=existing_file)
     parser.add_argument('save', help='Path to save reports into', type=existing_dir)
     parser.add_argument('--limit', help='Number of samples to process', type=positive_int, default=10)
+    parser.add_argument('--correct', help='Path to CSV, JSON Lines file or directory of correct samples '
+                                          'used instead of correct submissions of data file',
+                        type=corpus_source)
+    parser.add_argument('--store', help='Directory to keep measurements in, only missing ones are computed '
+                                        'on the next run')
+    parser.add_argument('--method', help='Method to report, all methods if not given', type=method,
+                        action='append')
     args = parser.parse_args()
 
-    bench = Benchmarker([
-        cut_data(args.data, status='correct', limit=0.001),
-        cut_data(args.data, status='correct', limit=0.01),
-        cut_data(args.data, status='correct', limit=0.1),
-        cut_data(args.data, status='correct', limit=0.25),
-        cut_data(args.data, status='correct', limit=0.5),
-        cut_data(args.data, status='correct', limit=0.75),
-        cut_data(args.data, status='correct')
+    correct = args.correct or CsvSource(args.data, where={'status': 'correct'})
+    # sizes of batches depend on size of corpus, so it is read once before measurement
+    meta = corpus_meta(correct)
+    total = meta['correct']
+
+    bench = Benchmarker(correct, [
+        int(0.001 * total),
+        int(0.01 * total),
+        int(0.1 * total),
+        int(0.25 * total),
+        int(0.5 * total),
+        int(0.75 * total),
+        total
     ], [
         AddOpsPerSubmission, DeleteOpsPerSubmission, TotalOpsPerSubmission,
-        PatchesPerSubmission, TotalRatioPerSubmission,
+        PatchesPerSubmission, InsertPatchesPerSubmission, DeletePatchesPerSubmission, ReplacePatchesPerSubmission,
+        TotalRatioPerSubmission,
         AddOpsPerPatch, DeleteOpsPerPatch, TotalOpsPerPatch,
         SearchTimeMetric, PatchTimeMetric, TotalTimeMetric
     ])
+    store = ResultStore(args.store, meta) if args.store else None
     bench.report(
-        cut_data(args.data, status='wrong', limit=args.limit),
-        list(Method),
-        args.save
+        list(CsvSource(args.data, where={'status': 'wrong'}, limit=args.limit)),
+        args.method or list(Method),
+        args.save,
+        store
     )
+    if store is not None:
+        store.compact()
@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+import numpy as np
+
+from benchmark.validators import existing_file, existing_place, positive_int
+
+STATEMENTS = {
+    'import': 'import amorph',
+    'diff': 'from amorph import patch_with_sample, Method\n'
+            'list(patch_with_sample("a + b", "a * b", Method.DIFF))',
+    'tokens': 'from amorph import patch_with_sample, Method\n'
+              'list(patch_with_sample("a + b", "a * b", Method.TOKENS))',
+}
+
+
+def import_time(statement):
+    """
+    Runs statement in fresh interpreter
+    :return: Tuple in format (total import time in sec., count of imported modules)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            stderr=subprocess.PIPE, check=True)
+
+    # line format: "import time: self [us] | cumulative | imported package"
+    total, count = 0, 0
+    for line in result.stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        count += 1
+        # only top level imports contribute to total time
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return total / 10 ** 6, count
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('save', help='Path to save JSON results in', type=existing_place)
+    parser.add_argument('--repeat', help='Number of runs per statement', type=positive_int, default=20)
+    parser.add_argument('--baseline', help='Path to JSON results to compare with', type=existing_file)
+    parser.add_argument('--threshold', help='Relative slowdown treated as regression', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in STATEMENTS.items():
+        runs = [import_time(statement) for _ in range(args.repeat)]
+        times, counts = zip(*runs)
+        results[name] = {'median': float(np.median(times)), 'modules': max(counts)}
+        print('{:<10} {:.4f} sec. {} modules'.format(name, results[name]['median'], results[name]['modules']))
+
+    with open(args.save, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = 0
+        for name, stats in results.items():
+            if name in baseline and stats['median'] > baseline[name]['median'] * (1 + args.threshold):
+                regressions += 1
+                print('{} regressed: {:.4f} -> {:.4f} sec.'.format(name, baseline[name]['median'], stats['median']))
+        sys.exit(1 if regressions else 0)
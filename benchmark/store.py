@@ -0,0 +1,260 @@
+import json
+import os
+import shutil
+from hashlib import blake2b
+
+import numpy as np
+
+from benchmark.metrics import Columns, PatchTable
+
+# one row per (wrong sample, batch size, method) cell
+CELL_COLUMNS = [
+    ('sample', np.int64),
+    ('batch', np.int64),
+    ('method', np.str_),
+    ('matched', np.int64),
+    ('source_len', np.int64),
+    ('matched_len', np.int64),
+    ('search_time', np.float64),
+    ('patch_time', np.float64),
+]
+
+# one row per patch, cell is global row number of cell
+PATCH_COLUMNS = [
+    ('cell', np.int64),
+    ('type', np.int8),
+    ('deleted', np.int64),
+    ('inserted', np.int64),
+]
+
+
+def code_id(code):
+    """Stable id of code, so cells are found again in later runs"""
+    return int.from_bytes(blake2b(str(code).encode(), digest_size=8).digest(), 'little', signed=True)
+
+
+def corpus_hash(samples):
+    """Hash of content of corpus, so store isn't reused with another corpus of the same size"""
+    digest = blake2b(digest_size=16)
+    for sample in samples:
+        data = str(sample).encode()
+        # lengths keep boundaries of samples
+        digest.update(len(data).to_bytes(8, 'little'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def corpus_meta(samples):
+    """
+    Describes corpus of correct samples for store in one pass over it
+    :param samples: Iterable of samples
+    :return: Dict with count of samples and `corpus_hash` of them
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for sample in samples:
+            count += 1
+            yield sample
+
+    digest = corpus_hash(counted())
+    return {'correct': count, 'hash': digest}
+
+
+class ResultStore(object):
+    """
+    Columnar store of raw report measurements. Every flush appends chunk directory
+    with one .npy file per column, so finished cells survive interrupted runs
+    and metrics are computed again without searching and patching
+    """
+
+    META_FILE = 'meta.json'
+
+    MERGED_SUFFIX = '.merged'
+
+    def __init__(self, path=None, meta: dict = None):
+        """
+        :param path: Directory of store, measurements are kept in memory only if not given
+        :param meta: Description of run, e.g. size and `corpus_hash` of correct corpus. \
+                     Store filled in run with another description can't be reused
+        """
+        self.path = path
+        # columns are kept as lists of chunks and concatenated once they are read
+        self._cells = {name: [np.empty(0, dtype=dtype)] for name, dtype in CELL_COLUMNS}
+        self._patches = {name: [np.empty(0, dtype=dtype)] for name, dtype in PATCH_COLUMNS}
+        self._count = 0
+        # measurements recorded since the last flush and keys of their cells
+        self._pending = PatchTable()
+        self._pending_keys = []
+        self._chunks = 0
+        # latest row of every cell
+        self._rows = {}
+
+        if path is not None:
+            self._open(meta or {})
+
+    def _open(self, meta):
+        os.makedirs(self.path, exist_ok=True)
+        meta_path = os.path.join(self.path, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError('Store {} was filled in another run: {}'.format(self.path, stored))
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+
+        self._finish_compaction()
+        chunks = sorted(name for name in os.listdir(self.path) if name.isdigit())
+        for chunk in chunks:
+            chunk_path = os.path.join(self.path, chunk)
+            for columns, schema in [(self._cells, CELL_COLUMNS), (self._patches, PATCH_COLUMNS)]:
+                for name, _ in schema:
+                    columns[name].append(np.load(os.path.join(chunk_path, name + '.npy')))
+        self._chunks = int(chunks[-1]) + 1 if chunks else 0
+
+        cells = self.cells
+        self._count = len(cells['sample'])
+        for row, key in enumerate(zip(cells['sample'], cells['batch'], cells['method'])):
+            self._rows[self._key(*key)] = row
+
+    def _finish_compaction(self):
+        """Completes compaction interrupted after merged chunk was written"""
+        names = os.listdir(self.path)
+        for name in names:
+            if name.endswith('.tmp'):
+                shutil.rmtree(os.path.join(self.path, name))
+
+        merged = [name for name in names if name.endswith(self.MERGED_SUFFIX)]
+        if not merged:
+            return
+        merged, = merged
+        number = merged[:-len(self.MERGED_SUFFIX)]
+        # merged chunk supersedes every chunk written before it
+        for name in names:
+            if name.isdigit() and name < number:
+                shutil.rmtree(os.path.join(self.path, name))
+        os.rename(os.path.join(self.path, merged), os.path.join(self.path, number))
+
+    @staticmethod
+    def _consolidate(columns):
+        for name, chunks in columns.items():
+            if len(chunks) > 1:
+                columns[name] = [np.concatenate(chunks)]
+        return {name: chunks[0] for name, chunks in columns.items()}
+
+    @property
+    def cells(self):
+        """Dict of cell columns"""
+        return self._consolidate(self._cells)
+
+    @property
+    def patches(self):
+        """Dict of patch columns"""
+        return self._consolidate(self._patches)
+
+    @staticmethod
+    def _key(sample, batch, method):
+        return int(sample), int(batch), str(method)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def has(self, source, batch, method):
+        return self._key(code_id(source), batch, method.value) in self._rows
+
+    def add(self, source, batch, method, matched, patches, search_time=0, patch_time=0):
+        """
+        Records measurements of cell, they are written to disk on flush
+        :param source: Source code of wrong sample
+        :param batch: Size of prefix of correct samples searched in
+        :param method: Patch method
+        :param matched: Sample source code was patched with
+        :param patches: List of patches
+        :param search_time: Time spent on searching sample
+        :param patch_time: Time spent on computing patches
+        """
+        key = self._key(code_id(source), batch, method.value)
+        self._rows[key] = self._count + len(self._pending_keys)
+        self._pending_keys.append(key + (code_id(matched),))
+        self._pending.add(source, matched, patches, search_time, patch_time)
+
+    def flush(self):
+        """Moves recorded cells to columns and appends them to disk as new chunk"""
+        if not self._pending_keys:
+            return
+
+        measured = self._pending.columns()
+        sample, batch, method, matched = zip(*self._pending_keys)
+        chunk = {
+            'sample': np.array(sample, dtype=np.int64),
+            'batch': np.array(batch, dtype=np.int64),
+            'method': np.array(method, dtype=np.str_),
+            'matched': np.array(matched, dtype=np.int64),
+            'cell': measured.submission + self._count,
+        }
+        for name, _ in CELL_COLUMNS + PATCH_COLUMNS:
+            if name not in chunk:
+                chunk[name] = getattr(measured, name)
+
+        for columns, schema in [(self._cells, CELL_COLUMNS), (self._patches, PATCH_COLUMNS)]:
+            for name, _ in schema:
+                columns[name].append(chunk[name])
+        self._count += len(self._pending_keys)
+        self._pending, self._pending_keys = PatchTable(), []
+
+        if self.path is not None:
+            self._write(chunk)
+
+    def _write(self, chunk, suffix=''):
+        name = '{:06d}'.format(self._chunks)
+        temp_path = os.path.join(self.path, name + '.tmp')
+        os.makedirs(temp_path, exist_ok=True)
+        for column, values in chunk.items():
+            np.save(os.path.join(temp_path, column + '.npy'), values)
+        # chunk appears at once, so half-written one is never read
+        os.rename(temp_path, os.path.join(self.path, name + suffix))
+        self._chunks += 1
+
+    def compact(self):
+        """Merges chunks on disk into one"""
+        self.flush()
+        if self.path is None or sum(name.isdigit() for name in os.listdir(self.path)) <= 1:
+            return
+
+        # merged chunk isn't read until old chunks are removed,
+        # compaction interrupted after it's written is finished on open
+        self._write(dict(self.cells, **self.patches), self.MERGED_SUFFIX)
+        self._finish_compaction()
+
+    def columns(self, sources, batch, method):
+        """
+        Collects measurements of cells in the layout of `benchmark.metrics.PatchTable`
+        :param sources: Wrong samples, each one is a submission
+        :param batch: Size of prefix of correct samples
+        :param method: Patch method
+        :return: Columns, submissions missing in store are skipped
+        """
+        self.flush()
+        cells, patches = self.cells, self.patches
+        rows = [self._rows.get(self._key(code_id(source), batch, method.value)) for source in sources]
+        rows = np.array([row for row in rows if row is not None], dtype=np.int64)
+
+        # patches are appended along with their cells, so they are ordered by cell
+        starts = np.searchsorted(patches['cell'], rows, 'left')
+        stops = np.searchsorted(patches['cell'], rows, 'right')
+        indices = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)] +
+                                 [np.empty(0, dtype=np.int64)]).astype(np.int64)
+
+        return Columns(
+            submission=np.repeat(np.arange(len(rows)), stops - starts),
+            type=patches['type'][indices],
+            deleted=patches['deleted'][indices],
+            inserted=patches['inserted'][indices],
+            source_len=cells['source_len'][rows],
+            matched_len=cells['matched_len'][rows],
+            search_time=cells['search_time'][rows],
+            patch_time=cells['patch_time'][rows]
+        )
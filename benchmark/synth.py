@@ -0,0 +1,368 @@
+import ast
+import builtins
+import csv
+import io
+import json
+import keyword
+import logging as log
+import random
+import token
+import tokenize
+from argparse import ArgumentParser
+from timeit import default_timer as timer
+
+from amorph import patch_with_sample
+from amorph.utils.apply import patch_bounds
+from benchmark.micro import synthetic_code
+from benchmark.validators import corpus_source, existing_place, method, positive_int
+
+log.basicConfig(level=log.INFO)
+
+LEVELS = ['token', 'line', 'statement']
+
+NAMES = ['a', 'b', 'c', 'n', 'm', 'i', 'j', 'k', 'x', 'y', 's', 'res', 'ans', 'cnt', 'total', 'line', 'num',
+         'value', 'items', 'result']
+OPERATOR_GROUPS = [['+', '-', '*', '//', '%'], ['<', '>', '<=', '>=', '==', '!='], ['+=', '-=', '*=']]
+RESERVED = set(keyword.kwlist) | set(dir(builtins))
+
+
+def _line_starts(code):
+    starts = [0]
+    for line in code.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
+def _tokens(code):
+    """Tokens of code with char offsets, stops at the first tokenization error"""
+    starts = _line_starts(code)
+    result = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in (token.NAME, token.OP, token.NUMBER, token.STRING):
+                start = starts[tok.start[0] - 1] + tok.start[1]
+                end = starts[tok.end[0] - 1] + tok.end[1]
+                result.append((tok, start, end))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return result
+
+
+def _renamable_names(tree):
+    """
+    Names bound by program itself that can be renamed consistently. Imported names, names of
+    keyword arguments and names used in f-strings stay fixed, as some of their occurrences
+    aren't plain name tokens or refer to names defined elsewhere
+    """
+    bound, fixed = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                fixed.update(alias.name.split('.'))
+                if alias.asname:
+                    fixed.add(alias.asname)
+            if isinstance(node, ast.ImportFrom) and node.module:
+                fixed.update(node.module.split('.'))
+        elif isinstance(node, ast.keyword) and node.arg:
+            fixed.add(node.arg)
+        elif isinstance(node, ast.JoinedStr):
+            fixed.update(name.id for name in ast.walk(node) if isinstance(name, ast.Name))
+    return bound - fixed - RESERVED
+
+
+class Template(object):
+    """Correct program with identifiers to be renamed consistently in its variants"""
+
+    def __init__(self, code):
+        self.code = code
+        self.parts, self.slots = [], []
+
+        try:
+            renamable = _renamable_names(ast.parse(code))
+        except (SyntaxError, ValueError):
+            renamable = set()
+
+        pos, previous = 0, None
+        # other names of program, new names must not clash with them
+        self.taken = set()
+        for tok, start, end in _tokens(code):
+            if tok.type == token.NAME and tok.string not in renamable:
+                self.taken.add(tok.string)
+            # attributes are looked up on objects, not in scope of program
+            if tok.type == token.NAME and tok.string in renamable and (previous is None or previous.string != '.'):
+                self.parts.append(code[pos:start])
+                self.slots.append(tok.string)
+                pos = end
+            previous = tok
+        self.parts.append(code[pos:])
+        self.names = sorted(set(self.slots))
+
+    def variant(self, rng):
+        """
+        :param rng: Random generator
+        :return: Program with identifiers renamed and formatting noise added
+        """
+        pool = [name for name in NAMES if name not in RESERVED and name not in self.taken]
+        rng.shuffle(pool)
+        mapping = {name: pool[idx] if idx < len(pool) else '{}{}'.format(name, idx)
+                   for idx, name in enumerate(self.names)}
+        # renamed identifiers must not clash with each other and other names
+        if len(set(mapping.values())) != len(mapping) or set(mapping.values()) & self.taken:
+            mapping = {name: name for name in self.names}
+
+        result = [self.parts[0]]
+        for name, part in zip(self.slots, self.parts[1:]):
+            result.append(mapping[name])
+            result.append(part)
+        code = ''.join(result)
+
+        if rng.random() < 0.3:
+            code += '\n'
+        return code
+
+
+def _token_edit(rng, code):
+    tokens = [(tok, start, end) for tok, start, end in _tokens(code) if tok.type != token.STRING]
+    if not tokens:
+        return None
+    tok, start, end = rng.choice(tokens)
+
+    if tok.type == token.NAME and tok.string not in RESERVED:
+        return 'rename', start, end, rng.choice([name for name in NAMES if name != tok.string])
+    if tok.type == token.NUMBER:
+        return 'number', start, end, str(rng.choice([0, 1, 2, 10, 100]))
+    for group in OPERATOR_GROUPS:
+        if tok.string in group:
+            return 'operator', start, end, rng.choice([op for op in group if op != tok.string])
+    return 'delete_token', start, end, ''
+
+
+def _line_edit(rng, code):
+    lines = code.splitlines(keepends=True)
+    if not lines:
+        return None
+    starts = _line_starts(code)
+    idx = rng.randrange(len(lines))
+    line = lines[idx] if lines[idx].endswith('\n') else lines[idx] + '\n'
+
+    kind = rng.choice(['delete_line', 'duplicate_line', 'swap_lines', 'indent_line'])
+    if kind == 'delete_line':
+        return kind, starts[idx], starts[idx + 1], ''
+    if kind == 'duplicate_line':
+        return kind, starts[idx], starts[idx], line
+    if kind == 'swap_lines' and idx + 1 < len(lines):
+        following = lines[idx + 1] if lines[idx + 1].endswith('\n') else lines[idx + 1] + '\n'
+        return kind, starts[idx], starts[idx + 2], following + line
+    if line.startswith('    '):
+        return 'dedent_line', starts[idx], starts[idx] + 4, ''
+    return 'indent_line', starts[idx], starts[idx], '    '
+
+
+def _statement_edit(rng, code):
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    bodies = [getattr(node, field) for node in ast.walk(tree) for field in ('body', 'orelse')
+              if isinstance(getattr(node, field, None), list) and getattr(node, field)]
+    bodies = [body for body in bodies if isinstance(body[0], ast.stmt)]
+    if not bodies:
+        return None
+
+    starts = _line_starts(code)
+    body = rng.choice(bodies)
+    pos = rng.randrange(len(body))
+
+    def extent(statement):
+        return starts[statement.lineno - 1], starts[min(statement.end_lineno, len(starts) - 1)]
+
+    start, stop = extent(body[pos])
+    text = code[start:stop] if code[start:stop].endswith('\n') else code[start:stop] + '\n'
+
+    kind = rng.choice(['delete_statement', 'duplicate_statement', 'swap_statements'])
+    if kind == 'delete_statement' and len(body) > 1:
+        return kind, start, stop, ''
+    if kind == 'swap_statements' and pos + 1 < len(body):
+        next_start, next_stop = extent(body[pos + 1])
+        following = code[next_start:next_stop]
+        following = following if following.endswith('\n') else following + '\n'
+        return kind, start, next_stop, following + code[stop:next_start] + text
+    return 'duplicate_statement', start, start, text
+
+
+EDITS = {'token': _token_edit, 'line': _line_edit, 'statement': _statement_edit}
+
+
+def make_wrong(rng, code, count, levels):
+    """
+    Applies random edits to correct code
+    :param rng: Random generator
+    :param code: Correct code
+    :param count: Count of edits
+    :param levels: Levels of edits to choose from, see `LEVELS`
+    :return: Tuple of wrong code and list of edits as dicts, each one applied to result of the previous
+    """
+    edits = []
+    for _ in range(count):
+        for level in rng.sample(levels, len(levels)):
+            edit = EDITS[level](rng, code)
+            # edit may be impossible, e.g. for unparsable code, or change nothing
+            if edit is not None and code[edit[1]:edit[2]] != edit[3]:
+                break
+        else:
+            continue
+
+        kind, start, stop, text = edit
+        edits.append({'level': level, 'kind': kind, 'start': start, 'stop': stop, 'text': text,
+                      'removed': code[start:stop]})
+        code = code[:start] + text + code[stop:]
+    return code, edits
+
+
+def replay(code, edits):
+    """Applies recorded edits one after another"""
+    for edit in edits:
+        code = code[:edit['start']] + edit['text'] + code[edit['stop']:]
+    return code
+
+
+def generate(save, truth, templates, correct, wrong, edits, levels, seed):
+    """
+    Writes submissions CSV with `id`, `code` and `status` columns and ground truth JSON Lines
+    :param save: Path to CSV file
+    :param truth: Path to ground truth file, one line per wrong submission
+    :param templates: List of templates of correct programs
+    :param correct: Count of correct submissions
+    :param wrong: Count of wrong submissions
+    :param edits: Tuple of min and max count of edits per wrong submission
+    :param levels: Levels of edits
+    :param seed: Random seed
+    """
+    rng = random.Random(seed)
+    start = timer()
+    with open(save, 'w', newline='') as f, open(truth, 'w') as t:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'code', 'status'])
+
+        # wrong submissions are spread among correct ones as in real dumps
+        total = correct + wrong
+        wrong_left = wrong
+        for idx in range(total):
+            template = rng.randrange(len(templates))
+            code = templates[template].variant(rng)
+
+            if rng.random() < wrong_left / (total - idx):
+                wrong_left -= 1
+                wrong_code, applied = make_wrong(rng, code, rng.randint(*edits), levels)
+                writer.writerow([idx, wrong_code, 'wrong'])
+                t.write(json.dumps({
+                    'id': idx,
+                    'template': template,
+                    'origin': code,
+                    'edits': applied,
+                    'fix_size': sum(len(edit['text']) + len(edit['removed']) for edit in applied)
+                }) + '\n')
+            else:
+                writer.writerow([idx, code, 'correct'])
+
+            if (idx + 1) % 100000 == 0:
+                log.info('{} submissions written, {:.0f} per second'.format(idx + 1, (idx + 1) / (timer() - start)))
+
+
+def synthetic_workload(rng, correct: int, wrong: int, templates: int = 20):
+    """
+    Generates submissions of one problem in memory
+    :param rng: Random generator
+    :param correct: Count of correct submissions
+    :param wrong: Count of wrong submissions
+    :param templates: Count of synthetic programs submissions are derived from
+    :return: Tuple of lists of wrong and correct codes
+    """
+    templates = [Template(synthetic_code(rng, rng.randint(5, 30))) for _ in range(templates)]
+    correct_codes = [rng.choice(templates).variant(rng) for _ in range(correct)]
+    wrong_codes = [make_wrong(rng, rng.choice(templates).variant(rng), rng.randint(1, 3), LEVELS)[0]
+                   for _ in range(wrong)]
+    return wrong_codes, correct_codes
+
+
+def check_minimality(truth, methods, limit=None):
+    """
+    Compares size of patches turning wrong submissions back into their origins with size of ground truth edits
+    :param truth: Path to ground truth file
+    :param methods: List of methods to check
+    :param limit: Max count of submissions to check
+    :return: Dict of method name to dict of median ratio of sizes, share of patches not larger than truth
+             and count of failures, e.g. of unparsable submissions for tokens method
+    """
+    ratios = {method: [] for method in methods}
+    failures = {method: 0 for method in methods}
+    with open(truth) as f:
+        for idx, line in enumerate(f):
+            if limit is not None and idx >= limit:
+                break
+            row = json.loads(line)
+            if not row['fix_size']:
+                continue
+            wrong = replay(row['origin'], row['edits'])
+            for method in methods:
+                try:
+                    patches = list(patch_with_sample(wrong, row['origin'], method))
+                except Exception:
+                    failures[method] += 1
+                    continue
+                size = sum(stop - start + len(text) for start, stop, text in map(patch_bounds, patches))
+                ratios[method].append(size / row['fix_size'])
+
+    result = {}
+    for method, values in ratios.items():
+        values.sort()
+        result[method.name] = {
+            'median_ratio': values[len(values) // 2] if values else None,
+            'not_larger': sum(value <= 1 for value in values) / len(values) if values else None,
+            'failures': failures[method],
+        }
+    return result
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser()
+    parser.add_argument('save', help='Path to save submissions CSV in', type=existing_place)
+    parser.add_argument('--truth', help='Path to save ground truth JSON Lines in, <save>.truth.jsonl by default',
+                        type=existing_place)
+    parser.add_argument('--seeds', help='Path to CSV, JSON Lines file or directory of correct programs '
+                                        'to derive submissions from, synthetic programs if not given',
+                        type=corpus_source)
+    parser.add_argument('--correct', help='Number of correct submissions', type=positive_int, default=100000)
+    parser.add_argument('--wrong', help='Number of wrong submissions', type=positive_int, default=1000)
+    parser.add_argument('--edits', help='Min and max number of edits per wrong submission', type=positive_int,
+                        nargs=2, default=[1, 3])
+    parser.add_argument('--levels', help='Levels of edits', nargs='+', choices=LEVELS, default=LEVELS)
+    parser.add_argument('--seed', help='Random seed', type=int, default=0)
+    parser.add_argument('--check', help='Method to check patch minimality against ground truth with, can be repeated',
+                        type=method, action='append', default=[])
+    parser.add_argument('--check-limit', help='Number of wrong submissions to check', type=positive_int, default=1000)
+    args = parser.parse_args()
+
+    if args.seeds:
+        seeds = list(args.seeds)
+    else:
+        rng = random.Random(args.seed)
+        seeds = [synthetic_code(rng, rng.randint(5, 30)) for _ in range(50)]
+    templates = [Template(code) for code in seeds]
+
+    truth = args.truth or args.save + '.truth.jsonl'
+    generate(args.save, truth, templates, args.correct, args.wrong, sorted(args.edits), args.levels, args.seed)
+
+    if args.check:
+        for name, stats in check_minimality(truth, args.check, args.check_limit).items():
+            log.info('{}: median patch to truth size ratio {}, {} of patches are not larger than truth, '
+                     '{} failures'.format(name, stats['median_ratio'], stats['not_larger'], stats['failures']))
@@ -0,0 +1,37 @@
+import unittest
+
+from amorph.models import DeletePatch, InsertPatch, ReplacePatch
+from benchmark.metrics import (PatchTable, PatchCountMetric, TotalOpsMetric, InsertPatchesPerSubmission,
+                               DeletePatchesPerSubmission, ReplacePatchesPerSubmission, TotalOpsPerPatch,
+                               TotalRatioPerSubmission, TotalTimeMetric, compute_metrics)
+
+METRICS = [PatchCountMetric, TotalOpsMetric, InsertPatchesPerSubmission, DeletePatchesPerSubmission,
+           ReplacePatchesPerSubmission, TotalOpsPerPatch, TotalRatioPerSubmission, TotalTimeMetric]
+
+
+class TestMetrics(unittest.TestCase):
+    def test_compute(self):
+        table = PatchTable()
+        table.add('a + b', 'a * b', [ReplacePatch(2, 3, '*')], search_time=1, patch_time=0.5)
+        table.add('a + b + c', 'a + b * c', [DeletePatch(6, 7), InsertPatch(6, '*')], search_time=2, patch_time=1)
+
+        metrics = compute_metrics(METRICS, table.columns())
+        self.assertEqual(metrics[PatchCountMetric.name], 3)
+        self.assertEqual(metrics[TotalOpsMetric.name], 4)
+        self.assertEqual(metrics[InsertPatchesPerSubmission.name], 0.5)
+        self.assertEqual(metrics[DeletePatchesPerSubmission.name], 0.5)
+        self.assertEqual(metrics[ReplacePatchesPerSubmission.name], 0.5)
+        self.assertAlmostEqual(metrics[TotalOpsPerPatch.name], 4 / 3)
+        self.assertAlmostEqual(metrics[TotalRatioPerSubmission.name], (2 / 10 + 2 / 18) / 2)
+        self.assertEqual(metrics[TotalTimeMetric.name], 2.25)
+
+    def test_empty(self):
+        metrics = compute_metrics(METRICS, PatchTable().columns())
+
+        self.assertEqual(metrics[PatchCountMetric.name], 0)
+        self.assertEqual(metrics[InsertPatchesPerSubmission.name], 0.0)
+        self.assertEqual(metrics[TotalTimeMetric.name], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
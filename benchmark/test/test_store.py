@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from amorph import patch_with_sample, Method
+from benchmark.store import ResultStore, corpus_hash, corpus_meta
+
+CORRECT = ['a + b', '(a + b) * c', 'a + b * c']
+WRONG = ['a + b + c', 'a - b', '(a - b) * c']
+
+
+def fill(store, sources, batch=2, method=Method.DIFF):
+    for source in sources:
+        patches = list(patch_with_sample(source, CORRECT[0], method))
+        store.add(source, batch, method, CORRECT[0], patches, search_time=0.5, patch_time=0.25)
+        # every source is a chunk of its own
+        store.flush()
+
+
+def chunks(path):
+    return sorted(name for name in os.listdir(path) if name != ResultStore.META_FILE)
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'store')
+        self.meta = corpus_meta(CORRECT)
+
+    def assertSameColumns(self, first, second):
+        for name in first._fields:
+            np.testing.assert_array_equal(getattr(first, name), getattr(second, name), name)
+
+    def test_reopen(self):
+        store = ResultStore(self.path, self.meta)
+        fill(store, WRONG)
+        expected = store.columns(WRONG, 2, Method.DIFF)
+        self.assertEqual(len(chunks(self.path)), len(WRONG))
+        self.assertEqual(list(expected.search_time), [0.5] * len(WRONG))
+
+        reopened = ResultStore(self.path, self.meta)
+        self.assertEqual(len(reopened), len(WRONG))
+        self.assertTrue(all(reopened.has(source, 2, Method.DIFF) for source in WRONG))
+        self.assertFalse(reopened.has(WRONG[0], 3, Method.DIFF))
+        self.assertSameColumns(reopened.columns(WRONG, 2, Method.DIFF), expected)
+
+        # cells of later runs are appended after the stored ones
+        fill(reopened, WRONG[:1], batch=3)
+        self.assertEqual(len(ResultStore(self.path, self.meta)), len(WRONG) + 1)
+
+    def test_missing_cells(self):
+        store = ResultStore()
+        fill(store, WRONG[:2])
+
+        columns = store.columns(WRONG, 2, Method.DIFF)
+        self.assertEqual(len(columns.source_len), 2)
+        self.assertEqual(set(columns.submission), {0, 1})
+
+    def test_compact(self):
+        store = ResultStore(self.path, self.meta)
+        fill(store, WRONG)
+        expected = store.columns(WRONG, 2, Method.DIFF)
+
+        store.compact()
+        self.assertEqual(len(chunks(self.path)), 1)
+        self.assertSameColumns(ResultStore(self.path, self.meta).columns(WRONG, 2, Method.DIFF), expected)
+
+    def test_interrupted_compaction(self):
+        store = ResultStore(self.path, self.meta)
+        fill(store, WRONG)
+        expected = store.columns(WRONG, 2, Method.DIFF)
+
+        # compaction crashed after merged chunk was written, along with half-written chunk
+        store._write(dict(store.cells, **store.patches), ResultStore.MERGED_SUFFIX)
+        os.makedirs(os.path.join(self.path, '000009.tmp'))
+        self.assertEqual(len(chunks(self.path)), len(WRONG) + 2)
+
+        reopened = ResultStore(self.path, self.meta)
+        self.assertEqual(chunks(self.path), ['{:06d}'.format(len(WRONG))])
+        self.assertEqual(len(reopened), len(WRONG))
+        self.assertSameColumns(reopened.columns(WRONG, 2, Method.DIFF), expected)
+
+    def test_other_corpus(self):
+        ResultStore(self.path, self.meta)
+
+        # corpus of the same size with other samples
+        other = CORRECT[:-1] + ['a * b']
+        self.assertEqual(corpus_meta(other)['correct'], self.meta['correct'])
+        with self.assertRaises(ValueError):
+            ResultStore(self.path, corpus_meta(other))
+
+    def test_corpus_hash(self):
+        self.assertEqual(corpus_hash(CORRECT), corpus_hash(iter(CORRECT)))
+        # boundaries of samples are part of hash
+        self.assertNotEqual(corpus_hash(['ab', 'c']), corpus_hash(['a', 'bc']))
+
+
+if __name__ == '__main__':
+    unittest.main()
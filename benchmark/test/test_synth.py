@@ -0,0 +1,118 @@
+import ast
+import csv
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from amorph import Method
+from benchmark.micro import synthetic_code
+from benchmark.synth import LEVELS, Template, check_minimality, generate, make_wrong, replay
+
+SEEDS = [
+    'import math\nfrom sys import stdin\nx = math.sqrt(int(stdin.readline()))\nprint(x)\n',
+    'import os.path as p\nprint(p.join("a", "b"))\n',
+    'def f(x=1, y=2):\n    return x + y\nprint(f(y=3), f(1), f"{f()}")\n',
+    'class Point:\n    def __init__(self, x):\n        self.x = x\n\npoint = Point(x=1)\nprint(point.x)\n',
+    'n = int(input())\ntry:\n    res = [i * i for i in range(n) if i % 2]\nexcept ValueError as e:\n    res = e\n'
+    'print(*res, sep=" ")\n',
+    'def g(values, key=None):\n    return sorted(values, key=key)\n\nprint(g([3, 1], key=lambda v: -v))\n',
+]
+
+
+def free_and_imported_names(code):
+    tree = ast.parse(code)
+    bound = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load)}
+    bound |= {node.arg for node in ast.walk(tree) if isinstance(node, ast.arg)}
+    bound |= {node.name for node in ast.walk(tree)
+              if isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.ExceptHandler))}
+    free = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} - bound
+    imported = {(alias.name, alias.asname) for node in ast.walk(tree) if isinstance(node, (ast.Import, ast.ImportFrom))
+                for alias in node.names}
+    keywords = {node.arg for node in ast.walk(tree) if isinstance(node, ast.keyword)}
+    return free, imported, keywords
+
+
+class TestTemplate(unittest.TestCase):
+    def test_variants(self):
+        rng = random.Random(0)
+        seeds = SEEDS + [synthetic_code(rng, rng.randint(5, 30)) for _ in range(20)]
+
+        for code in seeds:
+            template = Template(code)
+            expected = free_and_imported_names(code)
+            for _ in range(20):
+                variant = template.variant(rng)
+                self.assertEqual(free_and_imported_names(variant), expected, variant)
+
+    def test_renames_consistently(self):
+        for seed in range(10):
+            function = ast.parse(Template(SEEDS[2]).variant(random.Random(seed))).body[0]
+
+            # parameters with defaults are renamed along with their uses, keyword argument `y` is kept
+            params = [arg.arg for arg in function.args.args]
+            self.assertEqual([function.body[0].value.left.id, function.body[0].value.right.id], params)
+            self.assertEqual(params[1], 'y')
+
+        self.assertEqual(Template(SEEDS[0]).variant(random.Random(1)).split('\n')[:2],
+                         ['import math', 'from sys import stdin'])
+
+
+class TestGroundTruth(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.save = os.path.join(self.tmp.name, 'data.csv')
+        self.truth = os.path.join(self.tmp.name, 'data.truth.jsonl')
+
+    def test_make_wrong(self):
+        rng = random.Random(0)
+        for code in SEEDS:
+            wrong, edits = make_wrong(rng, code, 3, LEVELS)
+
+            self.assertEqual(replay(code, edits), wrong)
+            self.assertLessEqual(len(edits), 3)
+            for edit in edits:
+                self.assertIn(edit['level'], LEVELS)
+                self.assertNotEqual(edit['removed'], edit['text'])
+            if edits:
+                self.assertNotEqual(wrong, code)
+
+    def test_generate(self):
+        generate(self.save, self.truth, [Template(code) for code in SEEDS], 30, 20, (1, 3), LEVELS, 0)
+
+        with open(self.save, newline='') as f:
+            rows = {int(row['id']): row for row in csv.DictReader(f)}
+        with open(self.truth) as f:
+            truth = [json.loads(line) for line in f]
+
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(len(truth), 20)
+        self.assertEqual(sum(row['status'] == 'wrong' for row in rows.values()), 20)
+        for row in truth:
+            # recorded edits reproduce written wrong code from its origin
+            self.assertEqual(rows[row['id']]['status'], 'wrong')
+            self.assertEqual(replay(row['origin'], row['edits']), rows[row['id']]['code'])
+            self.assertEqual(row['fix_size'], sum(len(edit['text']) + len(edit['removed']) for edit in row['edits']))
+
+    def test_check_minimality(self):
+        origin = 'n = int(input())\nprint(n)\nprint(n * 2)\n'
+        edits = [{'level': 'line', 'kind': 'delete_line', 'start': 17, 'stop': 26, 'text': '', 'removed': 'print(n)\n'}]
+        with open(self.truth, 'w') as f:
+            f.write(json.dumps({'id': 0, 'template': 0, 'origin': origin, 'edits': edits, 'fix_size': 9}) + '\n')
+            # nothing to fix
+            f.write(json.dumps({'id': 1, 'template': 0, 'origin': origin, 'edits': [], 'fix_size': 0}) + '\n')
+
+        # the only patch inserts deleted line back
+        self.assertEqual(check_minimality(self.truth, [Method.DIFF]),
+                         {'DIFF': {'median_ratio': 1.0, 'not_larger': 1.0, 'failures': 0}})
+
+        generate(self.save, self.truth, [Template(code) for code in SEEDS], 0, 20, (1, 3), LEVELS, 0)
+        result = check_minimality(self.truth, [Method.DIFF], limit=10)['DIFF']
+        self.assertEqual(result['failures'], 0)
+        self.assertGreater(result['median_ratio'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
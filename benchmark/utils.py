@@ -3,7 +3,7 @@ from re import search
 
 
 def cut_data(df, status, limit=None):
-    data = df[df.status == status].code.as_matrix()
+    data = df[df.status == status].code.values
 
     if isinstance(limit, float):
         limit = int(limit * len(data))
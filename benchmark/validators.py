@@ -4,6 +4,7 @@ from argparse import ArgumentError
 import pandas as pd
 
 from amorph import Method
+from amorph.corpus import open_source
 
 
 def csv_file(path):
@@ -13,6 +14,12 @@ def csv_file(path):
         raise ArgumentError(str(e))
 
 
+def existing_file(path):
+    if not os.path.isfile(path):
+        raise ArgumentError('file does not exist')
+    return path
+
+
 def positive_int(x):
     try:
         x = int(x)
@@ -40,3 +47,10 @@ def existing_dir(path):
 def existing_place(path):
     existing_dir(os.path.split(path)[0])
     return path
+
+
+def corpus_source(path):
+    try:
+        return open_source(path)
+    except Exception as e:
+        raise ArgumentError(str(e))
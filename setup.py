@@ -9,5 +9,6 @@ setup(
     author='konstantin.charkin <93kostya@gmail.com>, Nikita Lapkov <nikita.lapkov@stepik.org>',
     url='https://github.com/StepicOrg/amorph',
     install_requires=['schema', 'requests', 'asttokens'],
+    extras_require={'structure': ['numpy']},
     keywords=['transform', 'refactor', 'restructure', 'code'],
 )